@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+SportTeams Backend Load Test
+Replays the requests of backend_test.py as a weighted scenario mix with a
+number of virtual users, to size the Laravel fleet for peak load.
+
+Virtual users start one by one over the ramp-up period, and each logs in
+with its own session. Laravel rejects an access token that is used again
+within 60 seconds (TokenService::performSecurityChecks), so a request that
+gets a 401 is sent once more after a token refresh, as the frontend does;
+its latency includes the refresh, and the report counts these as "reauth".
+Without --rps each user sends its next request as soon as the previous one
+returned (closed model). With --rps the users take turns at a fixed global
+schedule (open model), and latency is measured from the scheduled send time,
+so a stalled backend shows up as latency instead of fewer requests.
+
+By default the requests go straight to Laravel (`php artisan serve` on port
+8002), which is what sizing the Laravel fleet needs. Through the proxy
+(--target proxy) one login from one address measures mostly the proxy: its
+rate limiter answers 429 after a few requests, and the response cache and
+request coalescing answer many reads without reaching Laravel.
+
+Per endpoint the run reports throughput, error rate and p50/p95/p99/max
+latency. A run whose error rate is above --max-error-rate fails, because its
+latencies then mostly measure how fast requests are rejected. Latency histograms can be written in HdrHistogram's percentile
+distribution format (.hgrm), which the HdrHistogram plotter reads.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from itertools import count
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import requests
+
+from backend_test import (
+    TokenProvider,
+    action_type_response_payload,
+    condition_template_payload,
+    condition_test_response_payload,
+    player_payload,
+    skills_assessment_response_payload,
+)
+
+# Laravel itself and the proxy in front of it (server.py)
+TARGETS = {
+    "laravel": "http://localhost:8002/api/v1",
+    "proxy": "http://localhost:8001/api/v1",
+}
+DEFAULT_BASE_URL = TARGETS["laravel"]
+DEFAULT_CREDENTIALS = {"email": "admin@sportteams.nl", "password": "admin123"}
+DEFAULT_MAX_ERROR_RATE = 5.0
+
+
+class Scenario(NamedTuple):
+    """One request of the mix; path and payload are built per request"""
+    name: str
+    weight: float
+    method: str
+    path: Callable[["LoadContext"], str]
+    payload: Optional[Callable[["LoadContext"], Dict[str, Any]]] = None
+    needs_team: bool = False
+
+
+class LoadContext:
+    """State shared by the virtual users"""
+
+    def __init__(self, team_id: Optional[int] = None):
+        self.team_id = team_id
+        self._unique = count(int(time.time() * 1000))
+
+    def unique_id(self) -> int:
+        """A different number for every created player or template"""
+        return next(self._unique)
+
+
+# Signup peak: mostly form submissions and the reads around them
+SCENARIOS = [
+    Scenario("GET /forms/active", 20, "GET", lambda ctx: "/forms/active"),
+    Scenario("GET /forms/templates", 10, "GET", lambda ctx: "/forms/templates"),
+    Scenario("GET /forms/statistics", 5, "GET", lambda ctx: "/forms/statistics"),
+    Scenario("GET /forms/responses", 5, "GET", lambda ctx: "/forms/responses"),
+    Scenario("POST /forms/responses (action type)", 15, "POST", lambda ctx: "/forms/responses",
+             lambda ctx: action_type_response_payload()),
+    Scenario("POST /forms/responses (condition test)", 15, "POST", lambda ctx: "/forms/responses",
+             lambda ctx: condition_test_response_payload()),
+    Scenario("POST /forms/responses (skills assessment)", 10, "POST", lambda ctx: "/forms/responses",
+             lambda ctx: skills_assessment_response_payload()),
+    Scenario("GET /team-admin/teams", 10, "GET", lambda ctx: "/team-admin/teams"),
+    Scenario("GET /team-admin/teams/{id}/players", 10, "GET",
+             lambda ctx: f"/team-admin/teams/{ctx.team_id}/players", needs_team=True),
+    Scenario("POST /team-admin/players", 0, "POST", lambda ctx: "/team-admin/players",
+             lambda ctx: player_payload(ctx.team_id, ctx.unique_id()), needs_team=True),
+    Scenario("POST /forms/templates", 0, "POST", lambda ctx: "/forms/templates",
+             lambda ctx: condition_template_payload(ctx.unique_id())),
+]
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram in microseconds, after HdrHistogram
+
+    Values up to 1024 are exact, larger ones are kept with a relative error
+    below 0.2%, in memory that grows with the number of distinct buckets.
+    """
+
+    SUB_BUCKETS = 1024
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.max = 0
+        self.sum = 0
+        self.sum_squares = 0
+
+    @classmethod
+    def bucket(cls, value: int) -> int:
+        if value < cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BUCKETS.bit_length() + 1
+        half = cls.SUB_BUCKETS // 2
+        return cls.SUB_BUCKETS + (shift - 1) * half + (value >> shift) - half
+
+    @classmethod
+    def highest_equivalent(cls, bucket: int) -> int:
+        """Largest value that falls in a bucket"""
+        if bucket < cls.SUB_BUCKETS:
+            return bucket
+        half = cls.SUB_BUCKETS // 2
+        shift, offset = divmod(bucket - cls.SUB_BUCKETS, half)
+        shift += 1
+        return ((offset + half + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        value = max(0, int(seconds * 1_000_000))
+        bucket = self.bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        self.max = max(self.max, value)
+        self.sum += value
+        self.sum_squares += value * value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for bucket, bucket_count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + bucket_count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        self.sum_squares += other.sum_squares
+
+    def value_at(self, percentile: float) -> int:
+        """Microseconds at or below which the given percentage of values fall"""
+        if not self.total:
+            return 0
+        target = max(1, math.ceil(percentile / 100 * self.total))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self.highest_equivalent(bucket), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    def stddev(self) -> float:
+        if not self.total:
+            return 0.0
+        return math.sqrt(max(0.0, self.sum_squares / self.total - self.mean() ** 2))
+
+    def percentile_distribution(self, ticks_per_half_distance: int = 5) -> str:
+        """The histogram as HdrHistogram's outputPercentileDistribution text, in milliseconds"""
+        lines = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}", ""]
+        buckets = sorted(self.counts)
+        cumulative = []
+        seen = 0
+        for bucket in buckets:
+            seen += self.counts[bucket]
+            cumulative.append(seen)
+
+        percentile = 0.0
+        index = 0
+        while self.total:
+            target = max(1, math.ceil(percentile / 100 * self.total))
+            while cumulative[index] < target:
+                index += 1
+            value = min(self.highest_equivalent(buckets[index]), self.max) / 1000
+            fraction = cumulative[index] / self.total
+            if fraction >= 1.0:
+                lines.append(f"{value:12.3f} {1.0:14.12f} {cumulative[index]:10d}")
+                break
+            lines.append(f"{value:12.3f} {fraction:14.12f} {cumulative[index]:10d} {1 / (1 - fraction):14.2f}")
+            # Ticks get closer together towards the tail, as in HdrHistogram
+            ticks = ticks_per_half_distance * 2 ** (int(math.log2(100 / (100 - percentile))) + 1)
+            percentile = max(percentile + 100 / ticks, fraction * 100)
+
+        lines.append(f"#[Mean    = {self.mean() / 1000:12.3f}, StdDeviation   = {self.stddev() / 1000:12.3f}]")
+        lines.append(f"#[Max     = {self.max / 1000:12.3f}, Total count    = {self.total:12d}]")
+        lines.append(f"#[Buckets = {len(buckets):12d}, SubBuckets     = {self.SUB_BUCKETS:12d}]")
+        return "\n".join(lines) + "\n"
+
+
+class EndpointStats:
+    """Latencies and outcomes of one scenario"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.reauths = 0
+        self.status_codes: Dict[str, int] = {}
+
+    def record(self, seconds: float, status: str, ok: bool, reauth: bool = False) -> None:
+        self.histogram.record(seconds)
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+        if reauth:
+            self.reauths += 1
+        self.status_codes[status] = self.status_codes.get(status, 0) + 1
+
+    def error_rate(self) -> float:
+        return self.errors / self.requests * 100 if self.requests else 0.0
+
+    def merge(self, other: "EndpointStats") -> None:
+        self.histogram.merge(other.histogram)
+        self.requests += other.requests
+        self.errors += other.errors
+        self.reauths += other.reauths
+        for status, status_count in other.status_codes.items():
+            self.status_codes[status] = self.status_codes.get(status, 0) + status_count
+
+    def summary(self, seconds: float) -> Dict[str, Any]:
+        histogram = self.histogram
+        return {
+            "requests": self.requests,
+            "throughput_rps": round(self.requests / seconds, 2) if seconds > 0 else 0,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate(), 2),
+            "reauths": self.reauths,
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "latency_ms": {
+                "p50": histogram.value_at(50) / 1000,
+                "p95": histogram.value_at(95) / 1000,
+                "p99": histogram.value_at(99) / 1000,
+                "max": histogram.max / 1000,
+                "mean": round(histogram.mean() / 1000, 3),
+            },
+        }
+
+
+class Pacer:
+    """Global send schedule for a target request rate
+
+    During ramp-up the rate grows with the share of users that have started.
+    """
+
+    def __init__(self, rps: float, users: int, start: float):
+        self.rps = rps
+        self.users = users
+        self.started_users = 0
+        self.next_slot = start
+        self._lock = threading.Lock()
+
+    def join(self) -> None:
+        with self._lock:
+            self.started_users += 1
+            # Nobody claimed the slots while no user was running
+            self.next_slot = max(self.next_slot, time.perf_counter())
+
+    def claim(self) -> float:
+        """The next send time; callers sleep until then"""
+        with self._lock:
+            slot = self.next_slot
+            self.next_slot += self.users / (self.rps * self.started_users)
+            return slot
+
+
+class LoadTest:
+    def __init__(self, scenarios: List[Scenario], users: int, duration: float, ramp_up: float = 0.0,
+                 rps: Optional[float] = None, base_url: str = DEFAULT_BASE_URL, timeout: float = 10.0,
+                 credentials: Optional[Dict[str, str]] = None, seed: Optional[int] = None):
+        self.scenarios = [scenario for scenario in scenarios if scenario.weight > 0]
+        self.users = max(1, users)
+        self.duration = duration
+        self.ramp_up = ramp_up
+        self.rps = rps
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.credentials = credentials or DEFAULT_CREDENTIALS
+        self.seed = seed
+        self.context = LoadContext()
+        self.results: List[Dict[str, EndpointStats]] = []
+        self.elapsed = 0.0
+        self._results_lock = threading.Lock()
+
+    def setup(self) -> None:
+        """Check the credentials and find a team for the team scenarios"""
+        session = requests.Session()
+        tokens = self.login(session)
+
+        if any(scenario.needs_team for scenario in self.scenarios):
+            response = session.get(f"{self.base_url}/team-admin/teams", headers=self.headers(tokens),
+                                   timeout=self.timeout)
+            teams = response.json().get('data', {}).get('teams', []) if response.status_code == 200 else []
+            if teams:
+                self.context.team_id = teams[0]['id']
+            else:
+                skipped = [scenario.name for scenario in self.scenarios if scenario.needs_team]
+                print(f"⚠️  No managed teams, leaving out: {', '.join(skipped)}")
+                self.scenarios = [scenario for scenario in self.scenarios if not scenario.needs_team]
+        if not self.scenarios:
+            raise RuntimeError("No scenarios with a weight above 0")
+
+    def login(self, session: requests.Session) -> TokenProvider:
+        """Tokens of a new login; every virtual user has its own"""
+        tokens = TokenProvider(self.base_url)
+        if not tokens.login(session, self.credentials):
+            raise RuntimeError(f"Login to {self.base_url} as {self.credentials['email']} failed")
+        return tokens
+
+    def headers(self, tokens: TokenProvider) -> Dict[str, str]:
+        return {
+            'Authorization': f'Bearer {tokens.access_token}',
+            'Content-Type': 'application/json'
+        }
+
+    def run(self) -> Dict[str, EndpointStats]:
+        self.setup()
+        started = time.perf_counter()
+        deadline = started + self.ramp_up + self.duration
+        pacer = Pacer(self.rps, self.users, started) if self.rps else None
+        threads = []
+        for user in range(self.users):
+            delay = self.ramp_up * user / self.users
+            thread = threading.Thread(target=self.virtual_user, args=(user, started + delay, deadline, pacer),
+                                      name=f"vu-{user}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - started
+
+        totals: Dict[str, EndpointStats] = {scenario.name: EndpointStats() for scenario in self.scenarios}
+        for stats in self.results:
+            for name, endpoint in stats.items():
+                totals[name].merge(endpoint)
+        return totals
+
+    def virtual_user(self, user: int, start_at: float, deadline: float, pacer: Optional[Pacer]) -> None:
+        """Send requests of the mix until the deadline; stats stay thread-local until the end"""
+        rng = random.Random(None if self.seed is None else self.seed + user)
+        session = requests.Session()
+        stats: Dict[str, EndpointStats] = {scenario.name: EndpointStats() for scenario in self.scenarios}
+        weights = [scenario.weight for scenario in self.scenarios]
+        time.sleep(max(0.0, start_at - time.perf_counter()))
+        tokens = TokenProvider(self.base_url)
+        tokens.login(session, self.credentials)
+        if pacer:
+            pacer.join()
+
+        while True:
+            scheduled = pacer.claim() if pacer else time.perf_counter()
+            if scheduled >= deadline:
+                break
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+            scenario = rng.choices(self.scenarios, weights)[0]
+            if not pacer:
+                scheduled = time.perf_counter()
+            reauth = False
+            try:
+                tokens.ensure(session)
+                url = f"{self.base_url}{scenario.path(self.context)}"
+                payload = scenario.payload(self.context) if scenario.payload else None
+                response = session.request(scenario.method, url, json=payload, headers=self.headers(tokens),
+                                           timeout=self.timeout)
+                if response.status_code == 401:
+                    # Reused or expired token: refresh, or log in again, and send once more
+                    reauth = True
+                    if tokens.refresh(session) or tokens.login(session, self.credentials):
+                        response = session.request(scenario.method, url, json=payload, headers=self.headers(tokens),
+                                                   timeout=self.timeout)
+                status, ok = str(response.status_code), response.status_code < 400
+            except requests.exceptions.RequestException as e:
+                status, ok = type(e).__name__, False
+            stats[scenario.name].record(time.perf_counter() - scheduled, status, ok, reauth)
+
+        with self._results_lock:
+            self.results.append(stats)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Weights from "GET /forms/active=30,POST /team-admin/players=5"; names match a scenario prefix"""
+    weights = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, weight = item.rsplit("=", 1)
+            weights[name.strip()] = float(weight)
+    return weights
+
+
+def apply_mix(scenarios: List[Scenario], weights: Dict[str, float]) -> List[Scenario]:
+    mixed = []
+    for scenario in scenarios:
+        matches = [name for name in weights if scenario.name.startswith(name)]
+        # The most specific name wins, so "POST /forms/responses (skills" overrides "POST /forms/responses"
+        mixed.append(scenario._replace(weight=weights[max(matches, key=len)]) if matches else scenario)
+    unknown = [name for name in weights if not any(s.name.startswith(name) for s in scenarios)]
+    if unknown:
+        raise ValueError(f"Unknown scenarios in mix: {', '.join(unknown)}")
+    return mixed
+
+
+def print_report(totals: Dict[str, EndpointStats], elapsed: float) -> Dict[str, Any]:
+    overall = EndpointStats()
+    for endpoint in totals.values():
+        overall.merge(endpoint)
+
+    print("=" * 110)
+    print(f"{'Endpoint':<44} {'Reqs':>7} {'RPS':>8} {'Err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>9}")
+    print("-" * 110)
+    report = {}
+    for name, endpoint in list(totals.items()) + [("TOTAL", overall)]:
+        summary = endpoint.summary(elapsed)
+        report[name] = summary
+        latency = summary["latency_ms"]
+        if name == "TOTAL":
+            print("-" * 110)
+        print(f"{name:<44} {summary['requests']:>7} {summary['throughput_rps']:>8.1f} "
+              f"{summary['error_rate']:>6.2f} {latency['p50']:>8.1f} {latency['p95']:>8.1f} "
+              f"{latency['p99']:>8.1f} {latency['max']:>9.1f}")
+    print("=" * 110)
+    print("Latencies in ms")
+    if overall.reauths:
+        print(f"🔑 {overall.reauths} requests got a 401 and were sent again after a token refresh")
+    return report
+
+
+def histogram_filename(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name).strip("_").lower() + ".hgrm"
+
+
+def main():
+    """Load test execution"""
+    parser = argparse.ArgumentParser(description="SportTeams backend load test")
+    parser.add_argument("--users", type=int, default=10, help="virtual users (default: 10)")
+    parser.add_argument("--duration", type=float, default=60, help="seconds at full load, after ramp-up (default: 60)")
+    parser.add_argument("--ramp-up", type=float, default=10, help="seconds over which users start (default: 10)")
+    parser.add_argument("--rps", type=float, help="target requests per second over all users (default: as fast as possible)")
+    parser.add_argument("--mix", default="", help='scenario weights, e.g. "GET /forms/active=30,POST /team-admin/players=5"')
+    parser.add_argument("--target", choices=sorted(TARGETS), default="laravel",
+                        help="laravel: measure Laravel directly (default), proxy: measure through server.py")
+    parser.add_argument("--base-url", help="API base URL, instead of the --target default")
+    parser.add_argument("--timeout", type=float, default=10, help="request timeout in seconds (default: 10)")
+    parser.add_argument("--seed", type=int, help="random seed for a repeatable request sequence")
+    parser.add_argument("--max-error-rate", type=float, default=DEFAULT_MAX_ERROR_RATE,
+                        help=f"fail when more than this percentage of requests fail (default: {DEFAULT_MAX_ERROR_RATE:g})")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--hdr-dir", help="write a .hgrm latency distribution per endpoint to this directory")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and their default weights")
+    args = parser.parse_args()
+
+    if args.list:
+        for scenario in SCENARIOS:
+            print(f"{scenario.weight:>6g}  {scenario.name}")
+        return
+
+    try:
+        scenarios = apply_mix(SCENARIOS, parse_mix(args.mix))
+    except ValueError as e:
+        parser.error(str(e))
+    base_url = args.base_url or TARGETS[args.target]
+    test = LoadTest(scenarios, args.users, args.duration, args.ramp_up, args.rps, base_url,
+                    args.timeout, seed=args.seed)
+    print("🚀 Starting SportTeams Backend Load Test")
+    print(f"🔗 Testing API at: {test.base_url}")
+    if args.target == "proxy" and not args.base_url:
+        print("⚠️  Through the proxy: rate limiting, the response cache and coalescing apply, "
+              "so this does not measure Laravel capacity")
+    print(f"👥 {test.users} users, {args.ramp_up:g}s ramp-up, {args.duration:g}s at full load, "
+          f"{f'{args.rps:g} requests/s' if args.rps else 'unpaced'}")
+    try:
+        totals = test.run()
+    except (RuntimeError, requests.exceptions.RequestException) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    report = print_report(totals, test.elapsed)
+    error_rate = report["TOTAL"]["error_rate"]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "target": None if args.base_url else args.target,
+                "base_url": test.base_url,
+                "users": test.users,
+                "ramp_up_seconds": args.ramp_up,
+                "duration_seconds": args.duration,
+                "target_rps": args.rps,
+                "elapsed_seconds": round(test.elapsed, 3),
+                "mix": {scenario.name: scenario.weight for scenario in test.scenarios},
+                "endpoints": report,
+            }, f, indent=2)
+        print(f"📄 Report written to {args.output}")
+    if args.hdr_dir:
+        os.makedirs(args.hdr_dir, exist_ok=True)
+        for name, endpoint in totals.items():
+            with open(os.path.join(args.hdr_dir, histogram_filename(name)), "w", encoding="utf-8") as f:
+                f.write(endpoint.histogram.percentile_distribution())
+        print(f"📈 Latency histograms written to {args.hdr_dir}")
+    if error_rate > args.max_error_rate:
+        print(f"❌ Error rate {error_rate:.2f}% is above {args.max_error_rate:g}%: the latencies above mostly "
+              f"measure rejected requests, not capacity (see status_codes in --output)")
+        sys.exit(1)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,331 @@ Tests the new Forms API system implementation
 """
 
 import requests
+import argparse
 import json
+import os
+import re
+import threading
 import time
 import sys
-from typing import Dict, Any, Optional
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# Request payloads, also replayed by the load test (backend_load.py)
+
+def player_payload(team_id: int, unique_id: int) -> Dict[str, Any]:
+    """New player for POST /team-admin/players"""
+    return {
+        "team_id": team_id,
+        "name": f"Test Player {unique_id}",
+        "email": f"testplayer{unique_id}@sportteams.nl",
+        "birth_date": "1995-06-15",
+        "position": "Forward",
+        "jersey_number": 10
+    }
+
+
+def condition_template_payload(unique_id: int) -> Dict[str, Any]:
+    """Condition test form template for POST /forms/templates"""
+    return {
+        "name": f"Test Condition Form {unique_id}",
+        "type": "condition_test",
+        "description": "Test condition assessment form for API testing",
+        "fields_config": {
+            "test_type": {
+                "type": "select",
+                "label": "Test Type",
+                "options": ["30-15 IFT", "Yo-Yo Test", "Cooper Test"],
+                "required": True
+            },
+            "test_date": {
+                "type": "date",
+                "label": "Test Date",
+                "required": True
+            },
+            "results": {
+                "type": "number",
+                "label": "Test Results",
+                "required": True
+            }
+        },
+        "is_active": True
+    }
+
+
+def action_type_response_payload() -> Dict[str, Any]:
+    """Action Type Test submission for POST /forms/responses"""
+    return {
+        "form_template_id": 2,  # Action Type Test template
+        "player_id": 1,  # Admin user as test player
+        "team_id": 1,    # Assuming there's a team with ID 1
+        "responses": {
+            "player_name": "Test Speler",
+            "team": "Test Team",
+            "at_category": "Motorische testen A",
+            "test_date": "2025-01-15",
+            "linker_rechter_voorkeur": "Rechts",
+            "duwen_trekken_voorkeur": "Duwen",
+            "roteren_lineair": "Lineair",
+            "starthouding": "Hoog",
+            "snelheid_kracht": "Snelheid",
+            "individueel_groep": "Individueel",
+            "stap_sprong": "Sprong",
+            "enkele_meerdere_sprongen": "Enkele",
+            "explosief_gecontroleerd": "Explosief",
+            "balans_beweging": "Beweging"
+        }
+    }
+
+
+def condition_test_response_payload() -> Dict[str, Any]:
+    """MSFT Condition Test submission for POST /forms/responses"""
+    return {
+        "form_template_id": 1,  # Condition Test template
+        "player_id": 1,  # Admin user as test player
+        "team_id": 1,    # Assuming there's a team with ID 1
+        "responses": {
+            "player_name": "Test Speler",
+            "team": "Test Team",
+            "condition_test": "MSFT 20m beeptest",
+            "test_date": "2025-01-15",
+            "leeftijd": 25,
+            "geslacht": "M",
+            "level_behaald_niveau": "12.5",
+            "aantal_shuttles": 85,
+            "totaal_afstand_m": 1700,
+            "geschatte_vo2max": 52.5,
+            "classificatie": "Goed",
+            "opmerkingen": "Goede prestatie, consistent tempo"
+        }
+    }
+
+
+def skills_assessment_response_payload() -> Dict[str, Any]:
+    """Skills Assessment submission for POST /forms/responses"""
+    return {
+        "form_template_id": 3,  # Skills Assessment template
+        "player_id": 1,  # Admin user as test player
+        "team_id": 1,    # Assuming there's a team with ID 1
+        "responses": {
+            "player_name": "Test Speler",
+            "team": "Test Team",
+            "assessment_date": "2025-01-15",
+            "balbeheersing": 8,
+            "pasnauwkeurigheid": 7,
+            "schieten": 6,
+            "aanvallen": 8,
+            "verdedigen": 7,
+            "fysieke_conditie": 8,
+            "spelinzicht": 9,
+            "teamwork": 8,
+            "houding_attitude": 9,
+            "overall_score": 8,
+            "sterke_punten": "Uitstekend spelinzicht en teamwork. Goede balbeheersing.",
+            "verbeterpunten": "Schieten kan verbeterd worden. Meer focus op afwerking.",
+            "coach_notities": "Veelbelovende speler met goede instelling. Blijven werken aan technische vaardigheden."
+        }
+    }
+
+
+# Numeric path segments become {id}, so /team-admin/teams/3/players and
+# /team-admin/teams/7/players share one budget
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(method: str, url: str, base_url: str) -> str:
+    """"GET /team-admin/teams/{id}/players" for a request URL"""
+    path = urlsplit(url).path
+    prefix = urlsplit(base_url).path.rstrip("/")
+    if prefix and path.startswith(prefix):
+        path = path[len(prefix):]
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, -(-len(ordered) * percent // 100) - 1))]
+
+
+def compare_with_baseline(endpoints: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+                          tolerance: float, min_slack_ms: float) -> List[Dict[str, Any]]:
+    """Median latency per endpoint against its budget
+
+    The budget is the baseline's "budget_ms" when it sets one, otherwise its
+    p50_ms plus `tolerance` (a fraction, or the endpoint's own "tolerance"),
+    and at least `min_slack_ms` above it so very fast endpoints do not flap.
+    """
+    comparisons = []
+    for endpoint, current in sorted(endpoints.items()):
+        stored = baseline.get("endpoints", {}).get(endpoint)
+        if stored is None:
+            comparisons.append({"endpoint": endpoint, "p50_ms": current["p50_ms"], "status": "new"})
+            continue
+        if "budget_ms" in stored:
+            budget = stored["budget_ms"]
+        else:
+            allowed = stored["p50_ms"] * (1 + stored.get("tolerance", tolerance))
+            budget = max(allowed, stored["p50_ms"] + min_slack_ms)
+        comparisons.append({
+            "endpoint": endpoint,
+            "p50_ms": current["p50_ms"],
+            "baseline_p50_ms": stored.get("p50_ms"),
+            "budget_ms": round(budget, 3),
+            "status": "regressed" if current["p50_ms"] > budget else "ok",
+        })
+    return comparisons
+
+
+def baseline_from(summary: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """A baseline of this run's timings; explicit budgets and tolerances of `previous` are kept"""
+    previous_endpoints = (previous or {}).get("endpoints", {})
+    endpoints = {}
+    for endpoint, stats in sorted(summary["endpoints"].items()):
+        entry = {"p50_ms": stats["p50_ms"], "p95_ms": stats["p95_ms"]}
+        for key in ("budget_ms", "tolerance"):
+            if key in previous_endpoints.get(endpoint, {}):
+                entry[key] = previous_endpoints[endpoint][key]
+        endpoints[endpoint] = entry
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "endpoints": endpoints,
+        "tests": {test["name"]: test["seconds"] for test in summary["tests"]},
+    }
+
+
+def write_junit(path: str, suite_name: str, summary: Dict[str, Any],
+                comparisons: Optional[List[Dict[str, Any]]] = None):
+    """JUnit XML: one testcase per test and, with a baseline, one per endpoint budget"""
+    root = ET.Element("testsuites")
+    suite = ET.SubElement(root, "testsuite", {
+        "name": suite_name,
+        "tests": str(len(summary["tests"])),
+        "failures": str(summary["failed"] - summary["skipped"]),
+        "skipped": str(summary["skipped"]),
+        "time": f"{summary['wall_clock_seconds']:.3f}",
+    })
+    for test in summary["tests"]:
+        case = ET.SubElement(suite, "testcase", {
+            "classname": suite_name, "name": test["name"], "time": f"{test['seconds']:.3f}"
+        })
+        if test["status"] == "failed":
+            ET.SubElement(case, "failure", {"message": test["message"]})
+        elif test["status"] == "skipped":
+            ET.SubElement(case, "skipped", {"message": test["message"]})
+
+    if comparisons is not None:
+        performance = ET.SubElement(root, "testsuite", {
+            "name": f"{suite_name}.performance",
+            "tests": str(len(comparisons)),
+            "failures": str(sum(1 for c in comparisons if c["status"] == "regressed")),
+        })
+        for comparison in comparisons:
+            case = ET.SubElement(performance, "testcase", {
+                "classname": f"{suite_name}.performance",
+                "name": comparison["endpoint"],
+                "time": f"{comparison['p50_ms'] / 1000:.3f}",
+            })
+            if comparison["status"] == "regressed":
+                ET.SubElement(case, "failure", {
+                    "message": f"p50 {comparison['p50_ms']:.1f} ms exceeds budget {comparison['budget_ms']:.1f} ms"
+                })
+
+    ET.indent(root)
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+class GraphTest(NamedTuple):
+    """A test and the tests it depends on"""
+    name: str
+    func: Callable[[], bool]
+    requires: Tuple[str, ...] = ()  # must have passed, otherwise this test is skipped
+    after: Tuple[str, ...] = ()     # must have finished (passed or not)
+    exclusive: bool = False         # runs alone, e.g. because it replaces or revokes tokens
+
+
+class TokenProvider:
+    """Access and refresh token of one thread or virtual user
+
+    Laravel rejects an access token that is used again within 60 seconds
+    (TokenService::performSecurityChecks), and refresh tokens are rotated,
+    so tokens cannot be shared between threads. The token is refreshed
+    shortly before it expires, and by refresh() when a request got a 401.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.access_token = None
+        self.refresh_token = None
+        self.expires_at = None
+        self._lock = threading.Lock()
+
+    def update(self, access_token: str, refresh_token: str, expires_in: Optional[int] = None):
+        with self._lock:
+            self.access_token = access_token
+            self.refresh_token = refresh_token
+            self.expires_at = time.time() + expires_in if expires_in else None
+
+    def clear(self):
+        with self._lock:
+            self.access_token = None
+            self.refresh_token = None
+            self.expires_at = None
+
+    def login(self, session: requests.Session, credentials: Dict[str, str]) -> bool:
+        """Log in with `credentials`; True when tokens were received"""
+        with self._lock:
+            return self._request_tokens(session, "auth/login", credentials)
+
+    def ensure(self, session: requests.Session) -> bool:
+        """True when a usable access token is available, refreshing it if it is about to expire"""
+        with self._lock:
+            if not self.access_token or not self.refresh_token:
+                return False
+            if self.expires_at is None or time.time() < self.expires_at - 60:
+                return True
+            return self._request_tokens(session, "auth/refresh", {"refresh_token": self.refresh_token})
+
+    def refresh(self, session: requests.Session, rejected: Optional[str] = None) -> bool:
+        """Replace the access token after a 401; a no-op when `rejected` was already replaced"""
+        with self._lock:
+            if not self.refresh_token:
+                return False
+            if rejected is not None and rejected != self.access_token:
+                return True
+            return self._request_tokens(session, "auth/refresh", {"refresh_token": self.refresh_token})
+
+    def _request_tokens(self, session: requests.Session, path: str, payload: Dict[str, str]) -> bool:
+        try:
+            response = session.post(f"{self.base_url}/{path}", json=payload, timeout=10)
+            data = response.json() if response.status_code == 200 else {}
+        except (requests.exceptions.RequestException, ValueError):
+            return False
+        if data.get('status') != 'success' or 'tokens' not in data:
+            return False
+        self.access_token = data['tokens']['access_token']
+        self.refresh_token = data['tokens']['refresh_token']
+        expires_in = data['tokens'].get('expires_in')
+        self.expires_at = time.time() + expires_in if expires_in else None
+        return True
+
 
 class SportTeamsBackendTester:
     def __init__(self):
         # Use the correct backend URL - Laravel is running on port 8001
         self.base_url = "http://localhost:8001/api/v1"
-        self.session = requests.Session()
-        self.access_token = None
-        self.refresh_token = None
+        self.logged_in = False  # set by the login test; other threads then log in themselves
         self.test_results = []
+        self.test_durations = {}
+        self.request_log = []  # one entry per HTTP request: test, endpoint, status, ms
         self.created_form_template_id = None
+        self._local = threading.local()
+        self._output_lock = threading.Lock()
         
         # Test credentials from the review request
         self.test_credentials = {
@@ -26,53 +337,102 @@ class SportTeamsBackendTester:
             "password": "admin123"
         }
         
+    @property
+    def session(self) -> requests.Session:
+        """One requests.Session per thread, since sessions are not thread-safe"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.hooks["response"].append(self._record_request)
+            session.hooks["response"].append(self._reauthorize)
+        return session
+
+    @property
+    def tokens(self) -> TokenProvider:
+        """This thread's tokens, since Laravel does not accept one token from several threads"""
+        tokens = getattr(self._local, "tokens", None)
+        if tokens is None:
+            tokens = self._local.tokens = TokenProvider(self.base_url)
+        if self.logged_in and not tokens.access_token:
+            tokens.login(self.session, self.test_credentials)
+        return tokens
+
+    def _reauthorize(self, response: requests.Response, *args, **kwargs):
+        """Response hook: a 401 for this thread's token is retried once with a refreshed token
+
+        Only a harness token that was rejected as reused or expired is
+        retried; a test that sends a bad token on purpose still sees the 401.
+        """
+        if response.status_code != 401 or getattr(self._local, "reauthorizing", False):
+            return response
+        sent = response.request.headers.get('Authorization', '')
+        tokens = self.tokens
+        if not tokens.access_token or sent != f'Bearer {tokens.access_token}':
+            return response
+        self._local.reauthorizing = True
+        try:
+            if not tokens.refresh(self.session, rejected=tokens.access_token):
+                return response
+            retry = response.request.copy()
+            retry.headers['Authorization'] = f'Bearer {tokens.access_token}'
+            return self.session.send(retry, **kwargs)
+        finally:
+            self._local.reauthorizing = False
+
+    def _record_request(self, response: requests.Response, *args, **kwargs):
+        """Response hook: time to response headers of every request, per endpoint"""
+        entry = {
+            "test": getattr(self._local, "test", None),
+            "endpoint": endpoint_label(response.request.method, response.request.url, self.base_url),
+            "status": response.status_code,
+            "ms": round(response.elapsed.total_seconds() * 1000, 3),
+        }
+        with self._output_lock:
+            self.request_log.append(entry)
+
+    def endpoint_stats(self) -> Dict[str, Dict[str, Any]]:
+        timings = {}
+        for entry in self.request_log:
+            timings.setdefault(entry["endpoint"], []).append(entry["ms"])
+        return {
+            endpoint: {
+                "requests": len(values),
+                "p50_ms": percentile(values, 50),
+                "p95_ms": percentile(values, 95),
+                "max_ms": max(values),
+            }
+            for endpoint, values in sorted(timings.items())
+        }
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.tokens.access_token
+
+    @property
+    def refresh_token(self) -> Optional[str]:
+        return self.tokens.refresh_token
+
     def ensure_valid_token(self) -> bool:
         """Ensure we have a valid access token, refresh if needed"""
-        if not self.access_token or not self.refresh_token:
-            return False
-            
-        try:
-            # Test current token
-            headers = {'Authorization': f'Bearer {self.access_token}'}
-            response = self.session.get(f"{self.base_url}/auth/me", headers=headers, timeout=5)
-            
-            if response.status_code == 200:
-                return True  # Token is still valid
-            
-            # Token expired, try to refresh
-            if self.refresh_token:
-                refresh_response = self.session.post(
-                    f"{self.base_url}/auth/refresh",
-                    json={"refresh_token": self.refresh_token},
-                    timeout=10
-                )
-                
-                if refresh_response.status_code == 200:
-                    data = refresh_response.json()
-                    if data.get('status') == 'success' and 'tokens' in data:
-                        self.access_token = data['tokens']['access_token']
-                        self.refresh_token = data['tokens']['refresh_token']
-                        return True
-            
-            return False
-            
-        except:
-            return False
+        return self.tokens.ensure(self.session)
         
     def log_result(self, test_name: str, success: bool, message: str, details: Dict = None):
         """Log test result"""
         result = {
             "test": test_name,
+            "graph_test": getattr(self._local, "test", None) or test_name,
             "success": success,
             "message": message,
             "details": details or {}
         }
-        self.test_results.append(result)
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status}: {test_name} - {message}")
-        if details:
-            print(f"   Details: {json.dumps(details, indent=2)}")
-        print()
+        # Concurrent tests must not interleave their output
+        with self._output_lock:
+            self.test_results.append(result)
+            print(f"{status}: {test_name} - {message}")
+            if details:
+                print(f"   Details: {json.dumps(details, indent=2)}")
+            print()
 
     def test_basic_connection(self) -> bool:
         """Test basic connection to the test endpoint"""
@@ -179,8 +539,12 @@ class SportTeamsBackendTester:
             if response.status_code == 200:
                 data = response.json()
                 if data.get('status') == 'success' and 'tokens' in data:
-                    self.access_token = data['tokens']['access_token']
-                    self.refresh_token = data['tokens']['refresh_token']
+                    self.tokens.update(
+                        data['tokens']['access_token'],
+                        data['tokens']['refresh_token'],
+                        data['tokens'].get('expires_in')
+                    )
+                    self.logged_in = True
                     
                     self.log_result(
                         "Authentication Login Test",
@@ -374,8 +738,11 @@ class SportTeamsBackendTester:
                 if data.get('status') == 'success' and 'tokens' in data:
                     # Update tokens
                     old_access_token = self.access_token
-                    self.access_token = data['tokens']['access_token']
-                    self.refresh_token = data['tokens']['refresh_token']
+                    self.tokens.update(
+                        data['tokens']['access_token'],
+                        data['tokens']['refresh_token'],
+                        data['tokens'].get('expires_in')
+                    )
                     
                     self.log_result(
                         "Token Refresh Test",
@@ -511,8 +878,8 @@ class SportTeamsBackendTester:
                     )
                     
                     # Clear tokens
-                    self.access_token = None
-                    self.refresh_token = None
+                    self.tokens.clear()
+                    self.logged_in = False
                     return True
                 else:
                     self.log_result(
@@ -826,17 +1193,9 @@ class SportTeamsBackendTester:
             
             # Test creating a new player
             test_team_id = teams[0]['id']
-            import time
             unique_id = int(time.time())
             
-            player_data = {
-                "team_id": test_team_id,
-                "name": f"Test Player {unique_id}",
-                "email": f"testplayer{unique_id}@sportteams.nl",
-                "birth_date": "1995-06-15",
-                "position": "Forward",
-                "jersey_number": 10
-            }
+            player_data = player_payload(test_team_id, unique_id)
             
             response = self.session.post(
                 f"{self.base_url}/team-admin/players",
@@ -1058,30 +1417,7 @@ class SportTeamsBackendTester:
             
             # Create a condition test form template
             unique_id = int(time.time())
-            template_data = {
-                "name": f"Test Condition Form {unique_id}",
-                "type": "condition_test",
-                "description": "Test condition assessment form for API testing",
-                "fields_config": {
-                    "test_type": {
-                        "type": "select",
-                        "label": "Test Type",
-                        "options": ["30-15 IFT", "Yo-Yo Test", "Cooper Test"],
-                        "required": True
-                    },
-                    "test_date": {
-                        "type": "date",
-                        "label": "Test Date",
-                        "required": True
-                    },
-                    "results": {
-                        "type": "number",
-                        "label": "Test Results",
-                        "required": True
-                    }
-                },
-                "is_active": True
-            }
+            template_data = condition_template_payload(unique_id)
             
             response = self.session.post(
                 f"{self.base_url}/forms/templates",
@@ -1391,27 +1727,7 @@ class SportTeamsBackendTester:
             }
             
             # Use the existing Action Type Test template (ID 2 from active forms)
-            response_data = {
-                "form_template_id": 2,  # Action Type Test template
-                "player_id": 1,  # Admin user as test player
-                "team_id": 1,    # Assuming there's a team with ID 1
-                "responses": {
-                    "player_name": "Test Speler",
-                    "team": "Test Team",
-                    "at_category": "Motorische testen A",
-                    "test_date": "2025-01-15",
-                    "linker_rechter_voorkeur": "Rechts",
-                    "duwen_trekken_voorkeur": "Duwen",
-                    "roteren_lineair": "Lineair",
-                    "starthouding": "Hoog",
-                    "snelheid_kracht": "Snelheid",
-                    "individueel_groep": "Individueel",
-                    "stap_sprong": "Sprong",
-                    "enkele_meerdere_sprongen": "Enkele",
-                    "explosief_gecontroleerd": "Explosief",
-                    "balans_beweging": "Beweging"
-                }
-            }
+            response_data = action_type_response_payload()
             
             response = self.session.post(
                 f"{self.base_url}/forms/responses",
@@ -1491,25 +1807,7 @@ class SportTeamsBackendTester:
             }
             
             # Use the existing Condition Test template (ID 1 from active forms)
-            response_data = {
-                "form_template_id": 1,  # Condition Test template
-                "player_id": 1,  # Admin user as test player
-                "team_id": 1,    # Assuming there's a team with ID 1
-                "responses": {
-                    "player_name": "Test Speler",
-                    "team": "Test Team",
-                    "condition_test": "MSFT 20m beeptest",
-                    "test_date": "2025-01-15",
-                    "leeftijd": 25,
-                    "geslacht": "M",
-                    "level_behaald_niveau": "12.5",
-                    "aantal_shuttles": 85,
-                    "totaal_afstand_m": 1700,
-                    "geschatte_vo2max": 52.5,
-                    "classificatie": "Goed",
-                    "opmerkingen": "Goede prestatie, consistent tempo"
-                }
-            }
+            response_data = condition_test_response_payload()
             
             response = self.session.post(
                 f"{self.base_url}/forms/responses",
@@ -1589,29 +1887,7 @@ class SportTeamsBackendTester:
             }
             
             # Use the existing Skills Assessment template (ID 3 from active forms)
-            response_data = {
-                "form_template_id": 3,  # Skills Assessment template
-                "player_id": 1,  # Admin user as test player
-                "team_id": 1,    # Assuming there's a team with ID 1
-                "responses": {
-                    "player_name": "Test Speler",
-                    "team": "Test Team",
-                    "assessment_date": "2025-01-15",
-                    "balbeheersing": 8,
-                    "pasnauwkeurigheid": 7,
-                    "schieten": 6,
-                    "aanvallen": 8,
-                    "verdedigen": 7,
-                    "fysieke_conditie": 8,
-                    "spelinzicht": 9,
-                    "teamwork": 8,
-                    "houding_attitude": 9,
-                    "overall_score": 8,
-                    "sterke_punten": "Uitstekend spelinzicht en teamwork. Goede balbeheersing.",
-                    "verbeterpunten": "Schieten kan verbeterd worden. Meer focus op afwerking.",
-                    "coach_notities": "Veelbelovende speler met goede instelling. Blijven werken aan technische vaardigheden."
-                }
-            }
+            response_data = skills_assessment_response_payload()
             
             response = self.session.post(
                 f"{self.base_url}/forms/responses",
@@ -1801,128 +2077,258 @@ class SportTeamsBackendTester:
             )
             return False
 
-    def run_forms_system_tests(self) -> Dict[str, Any]:
-        """Run comprehensive forms system tests based on review request"""
-        print("🚀 Starting SportTeams Forms System Comprehensive Tests")
-        print(f"🔗 Testing API at: {self.base_url}")
-        print("=" * 60)
-        
-        # Test sequence for Forms System based on review request
-        tests = [
-            ("Basic Connection", self.test_basic_connection),
-            ("Database Connection", self.test_database_connection),
-            ("Authentication Login", self.test_authentication_login),
-            ("JWT Token Validation", self.test_jwt_token_validation),
-            ("Database Tables Verification", self.test_database_tables_verification),
-            ("Forms Templates Get All", self.test_forms_templates_get_all),
-            ("Forms Active Get", self.test_forms_active_get),
-            ("Action Type Test Form Submission", self.test_forms_responses_submit_action_type),
-            ("MSFT Condition Test Form Submission", self.test_forms_responses_submit_condition_test),
-            ("Skills Assessment Form Submission", self.test_forms_responses_submit_skills_assessment),
-            ("Forms Responses Get All", self.test_forms_responses_get_all),
-            ("Forms Statistics Get", self.test_forms_statistics_get),
-        ]
-        
-        passed = 0
-        failed = 0
+    def run_test_graph(self, tests: List[GraphTest], workers: int = 8) -> Dict[str, Any]:
+        """Run tests concurrently as soon as the tests they depend on have finished
+
+        With workers=1 the tests run one after another in the order given.
+        """
+        names = {test.name for test in tests}
+        for test in tests:
+            unknown = [name for name in test.requires + test.after if name not in names]
+            if unknown:
+                raise ValueError(f"{test.name} depends on unknown tests: {', '.join(unknown)}")
         
-        for test_name, test_func in tests:
-            try:
-                print(f"🧪 Running: {test_name}")
-                result = test_func()
-                if result:
-                    passed += 1
-                else:
-                    failed += 1
-                    
-                # Add small delay between tests to avoid token issues
-                time.sleep(0.5)
-                    
-            except Exception as e:
-                print(f"❌ EXCEPTION in {test_name}: {str(e)}")
-                failed += 1
-                self.log_result(test_name, False, f"Exception: {str(e)}", {"exception": str(e)})
+        outcome = {}  # test name -> True (passed), False (failed) or None (skipped)
+        pending = list(tests)
+        running = {}
+        started = time.perf_counter()
         
-        print("=" * 60)
-        print("📊 FORMS SYSTEM TEST SUMMARY")
-        print(f"✅ Passed: {passed}")
-        print(f"❌ Failed: {failed}")
-        print(f"📈 Success Rate: {(passed / (passed + failed) * 100):.1f}%")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while pending or running:
+                # Start every test whose dependencies have finished; an exclusive
+                # test waits for the running ones and nothing starts next to it
+                for test in list(pending):
+                    if any(t.exclusive for t in running.values()):
+                        break
+                    if not all(name in outcome for name in test.requires + test.after):
+                        continue
+                    failed = [name for name in test.requires if outcome[name] is not True]
+                    if failed:
+                        pending.remove(test)
+                        outcome[test.name] = None
+                        self.log_result(test.name, False, f"Skipped: {', '.join(failed)} did not pass", {})
+                        continue
+                    if test.exclusive and running:
+                        break
+                    pending.remove(test)
+                    running[pool.submit(self._run_timed, test)] = test
+                    if test.exclusive:
+                        break
+                
+                if not running:
+                    if pending:
+                        raise ValueError(f"Circular test dependencies: {', '.join(t.name for t in pending)}")
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    outcome[running.pop(future).name] = future.result()
         
+        wall_clock = time.perf_counter() - started
+        summed = sum(self.test_durations.get(test.name, 0.0) for test in tests)
+        passed = sum(1 for result in outcome.values() if result is True)
+        skipped = sum(1 for result in outcome.values() if result is None)
+        failed = len(outcome) - passed
+        statuses = {True: "passed", False: "failed", None: "skipped"}
         return {
-            "total_tests": passed + failed,
+            "total_tests": len(tests),
             "passed": passed,
             "failed": failed,
-            "success_rate": passed / (passed + failed) * 100 if (passed + failed) > 0 else 0,
+            "skipped": skipped,
+            "success_rate": passed / len(tests) * 100 if tests else 0,
+            "workers": workers,
+            "wall_clock_seconds": round(wall_clock, 3),
+            "summed_test_seconds": round(summed, 3),
+            "speedup": round(summed / wall_clock, 2) if wall_clock > 0 else 0,
+            "durations": {test.name: round(self.test_durations.get(test.name, 0.0), 3) for test in tests},
+            "tests": [
+                {
+                    "name": test.name,
+                    "status": statuses[outcome.get(test.name)],
+                    "seconds": round(self.test_durations.get(test.name, 0.0), 3),
+                    "message": "; ".join(r["message"] for r in self.test_results
+                                         if r["graph_test"] == test.name and not r["success"]),
+                }
+                for test in tests
+            ],
+            "endpoints": self.endpoint_stats(),
+            "requests": self.request_log,
             "results": self.test_results
         }
 
-    def run_all_tests(self) -> Dict[str, Any]:
-        """Run all backend tests for Forms API system"""
-        print("🚀 Starting SportTeams Laravel Backend API Tests - Forms API System")
-        print(f"🔗 Testing API at: {self.base_url}")
+    def _run_timed(self, test: GraphTest) -> bool:
+        """Run one test, recording its duration; an exception counts as a failure"""
+        self._local.test = test.name
+        started = time.perf_counter()
+        try:
+            return bool(test.func())
+        except Exception as e:
+            self.log_result(test.name, False, f"Exception: {str(e)}", {"exception": str(e)})
+            return False
+        finally:
+            self.test_durations[test.name] = time.perf_counter() - started
+            self._local.test = None
+
+    def print_summary(self, title: str, summary: Dict[str, Any]):
         print("=" * 60)
-        
-        # Test sequence for Forms API
-        tests = [
-            ("Basic Connection", self.test_basic_connection),
-            ("Database Connection", self.test_database_connection),
-            ("CORS Configuration", self.test_cors_configuration),
-            ("Authentication Login", self.test_authentication_login),
-            ("JWT Token Validation", self.test_jwt_token_validation),
-            ("Security Middleware", self.test_security_middleware),
-            ("Token Refresh", self.test_token_refresh),
-            ("Database Tables Verification", self.test_database_tables_verification),
-            ("Forms Templates Get All", self.test_forms_templates_get_all),
-            ("Forms Templates Create", self.test_forms_templates_create),
-            ("Forms Active Get", self.test_forms_active_get),
-            ("Forms Template Toggle Active", self.test_forms_template_toggle_active),
-            ("Forms Statistics Get", self.test_forms_statistics_get),
-            ("Forms Responses Submit", self.test_forms_responses_submit),
-            ("Forms Responses Get All", self.test_forms_responses_get_all),
-            ("Logout Functionality", self.test_logout_functionality),
+        print(f"📊 {title}")
+        print(f"✅ Passed: {summary['passed']}")
+        print(f"❌ Failed: {summary['failed']}" + (f" ({summary['skipped']} skipped)" if summary['skipped'] else ""))
+        print(f"📈 Success Rate: {summary['success_rate']:.1f}%")
+        print(f"⏱️  Wall clock: {summary['wall_clock_seconds']:.2f}s, summed test time: "
+              f"{summary['summed_test_seconds']:.2f}s, speedup: {summary['speedup']:.2f}x "
+              f"({summary['workers']} workers)")
+
+    def forms_system_tests(self) -> List[GraphTest]:
+        """Forms system tests based on review request"""
+        login = ("Authentication Login",)
+        submissions = (
+            "Action Type Test Form Submission",
+            "MSFT Condition Test Form Submission",
+            "Skills Assessment Form Submission",
+        )
+        return [
+            GraphTest("Basic Connection", self.test_basic_connection),
+            GraphTest("Database Connection", self.test_database_connection),
+            GraphTest("Authentication Login", self.test_authentication_login),
+            GraphTest("JWT Token Validation", self.test_jwt_token_validation, requires=login),
+            GraphTest("Database Tables Verification", self.test_database_tables_verification),
+            GraphTest("Forms Templates Get All", self.test_forms_templates_get_all, requires=login),
+            GraphTest("Forms Active Get", self.test_forms_active_get, requires=login),
+            GraphTest(submissions[0], self.test_forms_responses_submit_action_type, requires=login),
+            GraphTest(submissions[1], self.test_forms_responses_submit_condition_test, requires=login),
+            GraphTest(submissions[2], self.test_forms_responses_submit_skills_assessment, requires=login),
+            # Reads that should see the submissions above
+            GraphTest("Forms Responses Get All", self.test_forms_responses_get_all, requires=login, after=submissions),
+            GraphTest("Forms Statistics Get", self.test_forms_statistics_get, requires=login, after=submissions),
         ]
+
+    def all_tests(self) -> List[GraphTest]:
+        """Every backend test: login, then token-dependent reads and writes, then token changes"""
+        login = ("Authentication Login",)
+        submissions = (
+            "Action Type Test Form Submission",
+            "MSFT Condition Test Form Submission",
+            "Skills Assessment Form Submission",
+        )
+        team_admin = (
+            "Team Admin Get Managed Teams", "Team Admin Get Team Players", "Team Admin Create Player",
+            "Team Admin Audit Log",
+        )
+        token_users = (
+            "JWT Token Validation", "Forms Templates Get All", "Forms Templates Create", "Forms Active Get",
+            "Forms Template Toggle Active", "Forms Statistics Get", *submissions, "Forms Responses Get All",
+            *team_admin,
+        )
+        return [
+            GraphTest("Basic Connection", self.test_basic_connection),
+            GraphTest("Database Connection", self.test_database_connection),
+            GraphTest("CORS Configuration", self.test_cors_configuration),
+            GraphTest("Authentication Login", self.test_authentication_login),
+            GraphTest("JWT Token Validation", self.test_jwt_token_validation, requires=login),
+            GraphTest("Security Middleware", self.test_security_middleware),
+            GraphTest("Database Tables Verification", self.test_database_tables_verification),
+            GraphTest("Team Admin Database Schema", self.test_team_admin_database_schema, requires=login),
+            GraphTest(team_admin[0], self.test_team_admin_get_managed_teams, requires=login),
+            GraphTest(team_admin[1], self.test_team_admin_get_team_players, requires=login),
+            GraphTest(team_admin[2], self.test_team_admin_create_player, requires=login),
+            GraphTest(team_admin[3], self.test_team_admin_audit_log, requires=login, after=(team_admin[2],)),
+            GraphTest("Forms Templates Get All", self.test_forms_templates_get_all, requires=login),
+            GraphTest("Forms Templates Create", self.test_forms_templates_create, requires=login),
+            GraphTest("Forms Template Toggle Active", self.test_forms_template_toggle_active,
+                      requires=("Forms Templates Create",)),
+            GraphTest("Forms Active Get", self.test_forms_active_get, requires=login,
+                      after=("Forms Template Toggle Active",)),
+            GraphTest(submissions[0], self.test_forms_responses_submit_action_type, requires=login),
+            GraphTest(submissions[1], self.test_forms_responses_submit_condition_test, requires=login),
+            GraphTest(submissions[2], self.test_forms_responses_submit_skills_assessment, requires=login),
+            GraphTest("Forms Responses Get All", self.test_forms_responses_get_all, requires=login, after=submissions),
+            GraphTest("Forms Statistics Get", self.test_forms_statistics_get, requires=login,
+                      after=(*submissions, "Forms Template Toggle Active")),
+            # Refresh and logout replace or revoke the tokens of their thread
+            GraphTest("Token Refresh", self.test_token_refresh, requires=login, after=token_users, exclusive=True),
+            GraphTest("Logout Functionality", self.test_logout_functionality, requires=login,
+                      after=("Token Refresh",), exclusive=True),
+        ]
+
+    def run_forms_system_tests(self, workers: int = 8) -> Dict[str, Any]:
+        """Run comprehensive forms system tests based on review request"""
+        print("🚀 Starting SportTeams Forms System Comprehensive Tests")
+        print(f"🔗 Testing API at: {self.base_url}")
+        print("=" * 60)
         
-        passed = 0
-        failed = 0
-        
-        for test_name, test_func in tests:
-            try:
-                if test_func():
-                    passed += 1
-                else:
-                    failed += 1
-            except Exception as e:
-                self.log_result(
-                    test_name,
-                    False,
-                    f"Test execution error: {str(e)}",
-                    {"error_type": type(e).__name__}
-                )
-                failed += 1
-        
-        # Summary
+        summary = self.run_test_graph(self.forms_system_tests(), workers)
+        self.print_summary("FORMS SYSTEM TEST SUMMARY", summary)
+        return summary
+
+    def run_all_tests(self, workers: int = 8) -> Dict[str, Any]:
+        """Run all backend tests for Forms API system"""
+        print("🚀 Starting SportTeams Laravel Backend API Tests - Forms API System")
+        print(f"🔗 Testing API at: {self.base_url}")
         print("=" * 60)
-        print(f"📊 FORMS API TEST SUMMARY")
-        print(f"✅ Passed: {passed}")
-        print(f"❌ Failed: {failed}")
-        print(f"📈 Success Rate: {(passed/(passed+failed)*100):.1f}%")
         
-        return {
-            "total_tests": len(tests),
-            "passed": passed,
-            "failed": failed,
-            "success_rate": passed/(passed+failed)*100 if (passed+failed) > 0 else 0,
-            "results": self.test_results
-        }
+        summary = self.run_test_graph(self.all_tests(), workers)
+        self.print_summary("FORMS API TEST SUMMARY", summary)
+        return summary
 
 def main():
     """Main test execution"""
+    parser = argparse.ArgumentParser(description="SportTeams backend API tests")
+    parser.add_argument("--suite", choices=["forms", "all"], default="forms",
+                        help="forms: the forms system tests (default), all: every test")
+    parser.add_argument("--workers", type=int, default=8, help="tests run concurrently (default: 8)")
+    parser.add_argument("--sequential", action="store_true", help="run one test at a time, in order")
+    parser.add_argument("--json", metavar="PATH", help="write results, test and request timings as JSON")
+    parser.add_argument("--junit", metavar="PATH", help="write results as JUnit XML")
+    parser.add_argument("--baseline", metavar="PATH", help="fail when an endpoint is slower than its budget in this file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline median, as a fraction (default: 0.25)")
+    parser.add_argument("--min-slack-ms", type=float, default=20.0,
+                        help="budgets are at least this much above the baseline median (default: 20)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write this run's timings as a new baseline")
+    args = parser.parse_args()
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    
     tester = SportTeamsBackendTester()
-    results = tester.run_forms_system_tests()  # Use the comprehensive forms system test
+    workers = 1 if args.sequential else args.workers
+    if args.suite == "all":
+        results = tester.run_all_tests(workers)
+    else:
+        results = tester.run_forms_system_tests(workers)  # Use the comprehensive forms system test
+    
+    comparisons = None
+    regressions = []
+    if baseline is not None:
+        comparisons = compare_with_baseline(results["endpoints"], baseline, args.tolerance, args.min_slack_ms)
+        regressions = [c for c in comparisons if c["status"] == "regressed"]
+        print(f"⏱️  Endpoints within budget: {sum(1 for c in comparisons if c['status'] == 'ok')}, "
+              f"regressed: {len(regressions)}, not in baseline: "
+              f"{sum(1 for c in comparisons if c['status'] == 'new')}")
+        for regression in regressions:
+            # A baseline entry may set only budget_ms
+            stored = regression['baseline_p50_ms']
+            print(f"   ❌ {regression['endpoint']}: p50 {regression['p50_ms']:.1f} ms, "
+                  f"budget {regression['budget_ms']:.1f} ms" + (f" (baseline {stored:.1f} ms)" if stored is not None else ""))
+        results["performance"] = comparisons
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.junit:
+        write_junit(args.junit, f"backend_test.{args.suite}", results, comparisons)
+    if args.save_baseline:
+        previous = baseline
+        if previous is None and os.path.exists(args.save_baseline):
+            with open(args.save_baseline, encoding="utf-8") as f:
+                previous = json.load(f)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline_from(results, previous), f, indent=2)
     
     # Exit with appropriate code
-    sys.exit(0 if results["failed"] == 0 else 1)
+    sys.exit(0 if results["failed"] == 0 and not regressions else 1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
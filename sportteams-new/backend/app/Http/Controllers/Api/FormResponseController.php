@@ -10,53 +10,36 @@
 use App\Models\SkillAssessment;
 use App\Models\User;
 use App\Models\Team;
+use Illuminate\Database\Eloquent\Builder;
 use Illuminate\Http\Request;
 use Illuminate\Http\JsonResponse;
+use Illuminate\Support\Carbon;
 use Illuminate\Support\Facades\Auth;
 use Illuminate\Support\Facades\Validator;
 use Illuminate\Support\Facades\DB;
+use Symfony\Component\HttpFoundation\StreamedResponse;
 
 class FormResponseController extends Controller
 {
+    /**
+     * Rows loaded (and flushed to the client) per export query
+     */
+    private const EXPORT_CHUNK_SIZE = 500;
+
+    private const EXPORT_CSV_COLUMNS = [
+        'id', 'form_template_id', 'form_template', 'player_id', 'player', 'team_id', 'team',
+        'submitted_by', 'submitted_at', 'responses',
+    ];
+
     /**
      * Display a listing of form responses
      */
     public function index(Request $request): JsonResponse
     {
-        $query = FormResponse::with(['template', 'player', 'team', 'submittedBy']);
-
-        // Role-based filtering
-        $userRole = $request->get('user_role');
-        $userId = $request->get('user_id');
-        
-        if ($userRole === 'admin') {
-            // Admins can see all responses
-        } elseif ($userRole === 'team_admin') {
-            // Team admins can only see responses from their teams
-            // For now, we'll allow all since we don't have team admin relationships set up
-        } elseif ($userRole === 'coach') {
-            // Coaches can see responses for teams they coach
-        } else {
-            // Players can only see their own responses
-            $query->where('player_id', $userId);
-        }
-
-        // Filter by form template if specified
-        if ($request->has('form_template_id')) {
-            $query->where('form_template_id', $request->form_template_id);
-        }
-
-        // Filter by player if specified
-        if ($request->has('player_id') && $userRole !== 'player') {
-            $query->where('player_id', $request->player_id);
-        }
-
-        // Filter by team if specified
-        if ($request->has('team_id') && $userRole === 'admin') {
-            $query->where('team_id', $request->team_id);
-        }
-
-        $responses = $query->orderBy('submitted_at', 'desc')->paginate(15);
+        $responses = $this->filteredQuery($request)
+            ->with(['template', 'player', 'team', 'submittedBy'])
+            ->orderBy('submitted_at', 'desc')
+            ->paginate(15);
 
         return response()->json([
             'status' => 'success',
@@ -64,11 +47,91 @@ public function index(Request $request): JsonResponse
         ]);
     }
 
+    /**
+     * Stream all matching form responses as NDJSON or CSV
+     *
+     * Uses the same filters as index(), but walks the table with a keyset
+     * cursor (newest id first) instead of pages, so memory stays constant
+     * and the first rows are sent before the last ones are read.
+     */
+    public function export(Request $request): JsonResponse|StreamedResponse
+    {
+        $format = $request->query('format', 'ndjson');
+        if (!in_array($format, ['ndjson', 'csv'], true)) {
+            return response()->json([
+                'status' => 'error',
+                'message' => 'Format must be ndjson or csv'
+            ], 400);
+        }
+
+        $responses = $this->filteredQuery($request)
+            ->with(['template', 'player', 'team', 'submittedBy'])
+            ->lazyByIdDesc(self::EXPORT_CHUNK_SIZE);
+
+        $headers = [
+            'Content-Type' => $format === 'csv' ? 'text/csv; charset=UTF-8' : 'application/x-ndjson',
+            'Content-Disposition' => 'attachment; filename="form-responses.' . $format . '"',
+            'Cache-Control' => 'no-store',
+            'X-Accel-Buffering' => 'no',
+        ];
+
+        return response()->stream(function () use ($responses, $format) {
+            $out = fopen('php://output', 'w');
+            if ($format === 'csv') {
+                fputcsv($out, self::EXPORT_CSV_COLUMNS);
+            }
+
+            $written = 0;
+            foreach ($responses as $response) {
+                if ($format === 'csv') {
+                    fputcsv($out, [
+                        $response->id,
+                        $response->form_template_id,
+                        $response->template?->name,
+                        $response->player_id,
+                        $response->player?->name,
+                        $response->team_id,
+                        $response->team?->name,
+                        $response->submitted_by,
+                        $response->submitted_at?->toIso8601String(),
+                        json_encode($response->responses),
+                    ]);
+                } else {
+                    fwrite($out, $response->toJson() . "\n");
+                }
+
+                // Send every chunk as soon as it is written
+                if (++$written % self::EXPORT_CHUNK_SIZE === 0) {
+                    fflush($out);
+                    flush();
+                }
+            }
+
+            fclose($out);
+        }, 200, $headers);
+    }
+
     /**
      * Store a newly created form response
      */
     public function store(Request $request): JsonResponse
     {
+        // A repeated submission (e.g. a proxy journal replay) returns the stored response.
+        // Keys are scoped to the submitter, so another user's key never matches.
+        $idempotencyKey = $request->get('user_id') ? $request->header('Idempotency-Key') : null;
+        if ($idempotencyKey) {
+            $existing = FormResponse::where('submitted_by', $request->get('user_id'))
+                ->where('idempotency_key', $idempotencyKey)
+                ->first();
+            if ($existing) {
+                return response()->json([
+                    'status' => 'success',
+                    'data' => $existing->load(['template', 'player', 'team', 'submittedBy']),
+                    'message' => 'Form already submitted'
+                ], 200);
+            }
+        }
+
         $validator = Validator::make($request->all(), [
             'form_template_id' => 'required|exists:form_templates,id',
             'player_id' => 'required|exists:users,id',
@@ -97,12 +160,13 @@ public function store(Request $request): JsonResponse
 
             // Create form response
             $formResponse = FormResponse::create([
+                'idempotency_key' => $idempotencyKey ?: null,
                 'form_template_id' => $request->form_template_id,
                 'player_id' => $request->player_id,
                 'team_id' => $request->team_id,
                 'responses' => $request->responses,
                 'submitted_by' => $request->get('user_id'),
-                'submitted_at' => now(),
+                'submitted_at' => $this->submittedAt($request),
             ]);
 
             // Create specific test record based on form type
@@ -327,6 +391,71 @@ private function updateSpecificTestRecord(FormResponse $response, array $respons
         }
     }
 
+    /**
+     * Submission time; journal replays from the proxy carry the original one,
+     * which is only trusted when it matches the proxy's signed claims
+     */
+    private function submittedAt(Request $request): Carbon
+    {
+        $now = now();
+        $original = $request->header('X-SportTeams-Submitted-At');
+        if (!$original || !ctype_digit($original)) {
+            return $now;
+        }
+
+        // Clients can set the header themselves; the signed claim cannot be forged
+        $claims = $request->attributes->get('proxy_claims');
+        if (!is_array($claims) || !isset($claims['proxy_submitted_at'])
+            || (string) $claims['proxy_submitted_at'] !== $original) {
+            return $now;
+        }
+
+        // Never in the future (that would extend the 24 hour edit window), at most a week back
+        $submittedAt = Carbon::createFromTimestamp((int) $original);
+        return $submittedAt->between($now->copy()->subWeek(), $now) ? $submittedAt : $now;
+    }
+
+    /**
+     * Responses visible to the caller, narrowed by the request filters
+     */
+    private function filteredQuery(Request $request): Builder
+    {
+        $query = FormResponse::query();
+
+        // Role-based filtering
+        $userRole = $request->get('user_role');
+        $userId = $request->get('user_id');
+        
+        if ($userRole === 'admin') {
+            // Admins can see all responses
+        } elseif ($userRole === 'team_admin') {
+            // Team admins can only see responses from their teams
+            // For now, we'll allow all since we don't have team admin relationships set up
+        } elseif ($userRole === 'coach') {
+            // Coaches can see responses for teams they coach
+        } else {
+            // Players can only see their own responses
+            $query->where('player_id', $userId);
+        }
+
+        // Filter by form template if specified
+        if ($request->has('form_template_id')) {
+            $query->where('form_template_id', $request->form_template_id);
+        }
+
+        // Filter by player if specified
+        if ($request->has('player_id') && $userRole !== 'player') {
+            $query->where('player_id', $request->player_id);
+        }
+
+        // Filter by team if specified
+        if ($request->has('team_id') && $userRole === 'admin') {
+            $query->where('team_id', $request->team_id);
+        }
+
+        return $query;
+    }
+
     /**
      * Check if user can view response
      */
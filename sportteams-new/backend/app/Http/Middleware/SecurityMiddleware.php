@@ -29,11 +29,23 @@ public function handle(Request $request, Closure $next)
             return response()->json(['error' => 'Missing authorization token'], 401);
         }
         
-        $payload = $this->tokenService->validateToken($token);
+        // The proxy may already have validated the token; its signed claims
+        // header lets us skip decryption and signature verification
+        $proxyClaims = $request->header('X-SportTeams-Claims');
+        $payload = $proxyClaims
+            ? $this->tokenService->validateProxyClaims(
+                $token,
+                $proxyClaims,
+                (string) $request->header('X-SportTeams-Claims-Signature')
+            )
+            : $this->tokenService->validateToken($token);
         if (!$payload) {
             return response()->json(['error' => 'Invalid or expired token'], 401);
         }
         
+        // Signed proxy claims may vouch for proxy-only headers (see FormResponseController)
+        $request->attributes->set('proxy_claims', $proxyClaims ? $payload : null);
+        
         // Add user info to request
         $request->merge([
             'user_id' => $payload['user_id'],
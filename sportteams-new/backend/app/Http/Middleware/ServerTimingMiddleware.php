@@ -0,0 +1,28 @@
+<?php
+
+namespace App\Http\Middleware;
+
+use Closure;
+use Illuminate\Http\Request;
+use Symfony\Component\HttpFoundation\Response;
+
+class ServerTimingMiddleware
+{
+    /**
+     * Report the time Laravel spent on the request as Server-Timing "app",
+     * which the proxy records as the "laravel" span of the request trace.
+     *
+     * @param  \Illuminate\Http\Request  $request
+     * @param  \Closure(\Illuminate\Http\Request): (\Symfony\Component\HttpFoundation\Response)  $next
+     */
+    public function handle(Request $request, Closure $next): Response
+    {
+        $response = $next($request);
+
+        $started = defined('LARAVEL_START') ? LARAVEL_START : $request->server('REQUEST_TIME_FLOAT', microtime(true));
+        $duration = (microtime(true) - $started) * 1000;
+        $response->headers->set('Server-Timing', sprintf('app;dur=%.1f;desc="Laravel"', $duration), false);
+
+        return $response;
+    }
+}
@@ -12,6 +12,7 @@ class FormResponse extends Model
     use HasFactory;
 
     protected $fillable = [
+        'idempotency_key',
         'form_template_id',
         'player_id',
         'team_id',
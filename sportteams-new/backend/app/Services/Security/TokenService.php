@@ -75,6 +75,43 @@ public function validateToken(string $encryptedToken): ?array
         }
     }
     
+    /**
+     * Accept claims that the proxy already decrypted and verified.
+     * The claims header is signed with the signing key and bound to the
+     * exact token, so only the revocation and replay checks remain.
+     */
+    public function validateProxyClaims(string $encryptedToken, string $encodedClaims, string $signature): ?array
+    {
+        try {
+            $message = 'proxy-claims.' . $encodedClaims . '.' . hash('sha256', $encryptedToken);
+            $expected = hash_hmac('sha256', $message, $this->signingKey);
+            if (!$this->signingKey || !hash_equals($expected, $signature)) {
+                throw new \Exception('Invalid proxy claims signature');
+            }
+            
+            $claims = json_decode(base64_decode($encodedClaims, true) ?: '', false);
+            if (!is_object($claims) || !isset($claims->jti, $claims->exp) || $claims->exp <= time()) {
+                throw new \Exception('Invalid or expired proxy claims');
+            }
+            
+            if ($this->isTokenRevoked($claims->jti)) {
+                throw new \Exception('Token has been revoked');
+            }
+            
+            // Sub-requests of one proxy batch share a single use of the token
+            $this->performSecurityChecks($claims, isset($claims->proxy_batch) ? (string) $claims->proxy_batch : null);
+            
+            return (array)$claims;
+            
+        } catch (\Exception $e) {
+            Log::warning('Proxy claims validation failed', [
+                'error' => $e->getMessage(),
+                'token_preview' => substr($encryptedToken, 0, 20) . '...'
+            ]);
+            return null;
+        }
+    }
+    
     public function createRefreshToken(int $userId): string
     {
         $refreshPayload = [
@@ -201,14 +238,17 @@ private function revokeRefreshToken(string $refreshToken): void
         }
     }
     
-    private function performSecurityChecks(object $payload): void
+    private function performSecurityChecks(object $payload, ?string $batch = null): void
     {
-        // Check for token reuse (replay attack)
+        // Check for token reuse (replay attack); the sub-requests of one
+        // signed proxy batch count as a single use
         $fingerprintKey = "token_fp:" . $payload->jti;
-        if ($this->redis->has($fingerprintKey)) {
+        $use = $batch !== null ? 'batch:' . $batch : 'used';
+        $previous = $this->redis->get($fingerprintKey);
+        if ($previous !== null && ($batch === null || !hash_equals((string) $previous, $use))) {
             throw new \Exception('Token reuse detected');
         }
-        $this->redis->put($fingerprintKey, 'used', 60); // 1 minute window
+        $this->redis->put($fingerprintKey, $use, 60); // 1 minute window
         
         // Validate audience and issuer
         if ($payload->aud !== env('APP_URL') || $payload->iss !== env('APP_URL')) {
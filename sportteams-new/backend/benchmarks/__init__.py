@@ -0,0 +1,10 @@
+"""
+Benchmarks for the SportTeams proxy (server.py), runnable without Laravel
+
+  upstream.py        stand-in for the Laravel API with canned payloads
+  proxy_overhead.py  direct vs proxied throughput and latency
+
+Run from the backend directory:
+
+  python -m benchmarks.proxy_overhead --sizes 256,4096,65536 --concurrency 1,16,64
+"""
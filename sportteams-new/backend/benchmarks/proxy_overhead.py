@@ -0,0 +1,291 @@
+"""
+Proxy overhead: the same requests sent straight to the upstream and through server.py
+Starts the stand-in upstream (benchmarks/upstream.py) and the proxy pointed at
+it, then runs every combination of path, response size and concurrency
+against both. The difference is what the proxy costs per request.
+
+The proxy runs with its production defaults, except for the features that
+would make the two sides incomparable or need a real deployment: edge auth
+(needs the JWT keys), rate limiting, the response cache and request
+coalescing (both would answer without the upstream). --proxy-env turns any
+of them back on. Clients ask for identity encoding unless --accept-encoding
+says otherwise, so compression is only measured when asked for.
+
+Results are printed as a table and written as JSON for regression tracking:
+
+  python -m benchmarks.proxy_overhead --output results.json
+  python -m benchmarks.proxy_overhead --paths "GET /api/v1/forms/active" --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Features off unless --proxy-env enables them again
+PROXY_ENV = {
+    "PROXY_EDGE_AUTH": "0",
+    "PROXY_RATE_LIMIT_ENABLED": "0",
+    "PROXY_CACHE_ENABLED": "0",
+    "PROXY_COALESCE_ENABLED": "0",
+    "PROXY_STATIC_ENABLED": "0",
+}
+
+DEFAULT_PATHS = ["GET /api/v1/forms/templates", "POST /api/v1/forms/responses"]
+
+# Request body of the POST paths, a form submission as sent by the frontend
+SUBMISSION = json.dumps({
+    "form_template_id": 2,
+    "player_id": 1,
+    "team_id": 1,
+    "responses": {"player_name": "Test Speler", "team": "Test Team", "test_date": "2025-01-15",
+                  "snelheid_kracht": "Snelheid", "explosief_gecontroleerd": "Explosief"},
+}).encode("utf-8")
+
+
+class Case(NamedTuple):
+    target: str  # "direct" or "proxy"
+    method: str
+    path: str
+    size: int
+    concurrency: int
+
+
+def percentile(ordered: List[float], percent: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def run_case(client: httpx.AsyncClient, base_url: str, case: Case, duration: float, warmup: float,
+                   latency_ms: float, accept_encoding: str) -> Dict[str, Any]:
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    url = f"{base_url}{case.path}?size={case.size}&latency_ms={latency_ms:g}"
+    headers = {"accept-encoding": accept_encoding, "authorization": "Bearer bench-access-token"}
+    body = SUBMISSION if case.method != "GET" else None
+    if body is not None:
+        headers["content-type"] = "application/json"
+    latencies: List[float] = []
+    errors = 0
+    received = 0
+    measuring = False
+
+    async def worker(deadline: float) -> None:
+        nonlocal errors, received
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.request(case.method, url, content=body, headers=headers)
+                ok = response.status_code < 400
+                size = len(response.content)
+            except httpx.HTTPError:
+                ok, size = False, 0
+            if not measuring:
+                continue
+            latencies.append(time.perf_counter() - started)
+            received += size
+            if not ok:
+                errors += 1
+
+    if warmup > 0:
+        await asyncio.gather(*(worker(time.perf_counter() + warmup) for _ in range(case.concurrency)))
+    measuring = True
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(started + duration) for _ in range(case.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        **case._asdict(),
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "bytes_per_response": received // len(latencies) if latencies else 0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+            "p50": round(percentile(ordered, 50) * 1000, 3),
+            "p90": round(percentile(ordered, 90) * 1000, 3),
+            "p99": round(percentile(ordered, 99) * 1000, 3),
+            "max": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        },
+    }
+
+
+async def run_matrix(targets: Dict[str, str], paths: List[str], sizes: List[int], concurrencies: List[int],
+                     duration: float, warmup: float, latency_ms: float, accept_encoding: str) -> List[Dict[str, Any]]:
+    results = []
+    for spec in paths:
+        method, _, path = spec.strip().partition(" ")
+        for size in sizes:
+            for concurrency in concurrencies:
+                for target, base_url in targets.items():
+                    case = Case(target, method.upper(), path.strip(), size, concurrency)
+                    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+                    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+                        result = await run_case(client, base_url, case, duration, warmup, latency_ms,
+                                                accept_encoding)
+                    results.append(result)
+                    latency = result["latency_ms"]
+                    print(f"{target:<7} {case.method:<5} {case.path:<34} {size:>8} {concurrency:>5} "
+                          f"{result['rps']:>9.1f} {latency['p50']:>8.2f} {latency['p99']:>8.2f} "
+                          f"{result['errors']:>6}", flush=True)
+    return results
+
+
+def overhead(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Proxy against direct for every case measured on both"""
+    direct = {(r["method"], r["path"], r["size"], r["concurrency"]): r for r in results if r["target"] == "direct"}
+    rows = []
+    for proxied in results:
+        if proxied["target"] != "proxy":
+            continue
+        key = (proxied["method"], proxied["path"], proxied["size"], proxied["concurrency"])
+        baseline = direct.get(key)
+        if baseline is None:
+            continue
+        rows.append({
+            "method": key[0], "path": key[1], "size": key[2], "concurrency": key[3],
+            "p50_added_ms": round(proxied["latency_ms"]["p50"] - baseline["latency_ms"]["p50"], 3),
+            "p99_added_ms": round(proxied["latency_ms"]["p99"] - baseline["latency_ms"]["p99"], 3),
+            "throughput_ratio": round(proxied["rps"] / baseline["rps"], 3) if baseline["rps"] else None,
+        })
+    return rows
+
+
+def start(command: List[str], env: Dict[str, str], health_url: str, timeout: float = 20.0) -> subprocess.Popen:
+    """Start a server process and wait until it answers"""
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **env},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(command)} exited: {process.stderr.read().decode(errors='replace')[-2000:]}")
+        try:
+            if httpx.get(health_url, timeout=1.0).status_code < 500:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{' '.join(command)} did not answer {health_url} within {timeout:g}s")
+
+
+def stop(process: Optional[subprocess.Popen]) -> None:
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=35)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proxy overhead benchmark against a local stand-in upstream")
+    parser.add_argument("--paths", default=",".join(DEFAULT_PATHS),
+                        help=f'comma separated "METHOD /path" (default: {",".join(DEFAULT_PATHS)})')
+    parser.add_argument("--sizes", type=parse_ints, default=[256, 4096, 65536], help="response sizes in bytes")
+    parser.add_argument("--concurrency", type=parse_ints, default=[1, 16, 64], help="requests in flight")
+    parser.add_argument("--duration", type=float, default=3.0, help="measured seconds per case (default: 3)")
+    parser.add_argument("--warmup", type=float, default=0.5, help="unmeasured seconds per case (default: 0.5)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="upstream think time per request")
+    parser.add_argument("--accept-encoding", default="identity", help="Accept-Encoding sent by the clients")
+    parser.add_argument("--proxy-workers", type=int, default=1, help="proxy worker processes (default: 1)")
+    parser.add_argument("--proxy-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra proxy setting, e.g. PROXY_CACHE_ENABLED=1 (repeatable)")
+    parser.add_argument("--upstream-port", type=int, default=18002)
+    parser.add_argument("--proxy-port", type=int, default=18001)
+    parser.add_argument("--upstream-url", help="benchmark an upstream that is already running instead")
+    parser.add_argument("--proxy-url", help="benchmark a proxy that is already running instead")
+    parser.add_argument("--targets", default="direct,proxy", help="direct, proxy or both (default)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    upstream_url = args.upstream_url or f"http://127.0.0.1:{args.upstream_port}"
+    proxy_url = args.proxy_url or f"http://127.0.0.1:{args.proxy_port}"
+    proxy_env = {**PROXY_ENV, "LARAVEL_BACKEND_URL": upstream_url, "PROXY_HOST": "127.0.0.1",
+                 "PROXY_PORT": str(args.proxy_port)}
+    for item in args.proxy_env:
+        name, _, value = item.partition("=")
+        proxy_env[name.strip()] = value
+    targets = {name: url for name, url in (("direct", upstream_url), ("proxy", proxy_url))
+               if name in args.targets.split(",")}
+
+    upstream = proxy = None
+    try:
+        if not args.upstream_url:
+            upstream = start([sys.executable, "-m", "uvicorn", "benchmarks.upstream:app", "--host", "127.0.0.1",
+                              "--port", str(args.upstream_port), "--log-level", "warning"],
+                             {}, f"{upstream_url}/api/v1/test")
+        if "proxy" in targets and not args.proxy_url:
+            proxy = start([sys.executable, "server.py", "--workers", str(args.proxy_workers)],
+                          proxy_env, f"{proxy_url}/api/v1/test")
+
+        print(f"{'target':<7} {'meth':<5} {'path':<34} {'size':>8} {'conc':>5} {'rps':>9} "
+              f"{'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        results = asyncio.run(run_matrix(targets, args.paths.split(","), args.sizes, args.concurrency,
+                                         args.duration, args.warmup, args.latency_ms, args.accept_encoding))
+    finally:
+        stop(proxy)
+        stop(upstream)
+
+    comparison = overhead(results)
+    if comparison:
+        print()
+        print(f"{'meth':<5} {'path':<34} {'size':>8} {'conc':>5} {'+p50 ms':>8} {'+p99 ms':>8} {'rps ratio':>9}")
+        for row in comparison:
+            ratio = f"{row['throughput_ratio']:.3f}" if row["throughput_ratio"] is not None else "-"
+            print(f"{row['method']:<5} {row['path']:<34} {row['size']:>8} {row['concurrency']:>5} "
+                  f"{row['p50_added_ms']:>8.2f} {row['p99_added_ms']:>8.2f} {ratio:>9}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "benchmark": "proxy_overhead",
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "commit": git_commit(),
+                "machine": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpus": os.cpu_count(),
+                },
+                "settings": {
+                    "duration": args.duration,
+                    "warmup": args.warmup,
+                    "upstream_latency_ms": args.latency_ms,
+                    "accept_encoding": args.accept_encoding,
+                    "proxy_workers": args.proxy_workers,
+                    "proxy_env": {name: value for name, value in proxy_env.items() if name.startswith("PROXY_")},
+                },
+                "results": results,
+                "overhead": comparison,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
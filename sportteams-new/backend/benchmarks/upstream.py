@@ -0,0 +1,109 @@
+"""
+Local stand-in for the Laravel API
+Answers the routes of routes/api.php that the proxy benchmarks use with
+canned JSON shaped like Laravel's, without PHP or Postgres.
+
+Every request can set the size of its response body and the time the
+"application" takes through query parameters, so one upstream serves the
+whole benchmark matrix:
+
+  ?size=4096        response body of about 4096 bytes (default BENCH_SIZE)
+  ?latency_ms=20    answer after 20 ms (default BENCH_LATENCY_MS)
+
+Responses carry `Server-Timing: app;dur=...` like Laravel's, so the proxy's
+tracing does its usual work.
+
+  python -m uvicorn benchmarks.upstream:app --port 8002
+"""
+
+import asyncio
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+DEFAULT_SIZE = int(os.environ.get("BENCH_SIZE", "1024"))
+DEFAULT_LATENCY_MS = float(os.environ.get("BENCH_LATENCY_MS", "0"))
+MAX_SIZE = 16 * 1024 * 1024
+
+# One item per resource; lists are padded with copies up to the requested size
+ITEMS: Dict[str, Dict[str, Any]] = {
+    "test": {"message": "SportTeams API is working", "version": "1.0.0"},
+    "user": {"id": 1, "name": "Admin", "email": "admin@sportteams.nl", "role": "admin"},
+    "template": {
+        "id": 1, "name": "Condition Test", "type": "condition_test", "is_active": True,
+        "description": "Condition assessment form",
+        "fields_config": {"test_type": {"type": "select", "label": "Test Type",
+                                        "options": ["30-15 IFT", "Yo-Yo Test", "Cooper Test"], "required": True}},
+    },
+    "response": {
+        "id": 1, "form_template_id": 2, "player_id": 1, "team_id": 1, "submitted_at": "2025-01-15T10:00:00Z",
+        "responses": {"player_name": "Test Speler", "team": "Test Team", "test_date": "2025-01-15",
+                      "snelheid_kracht": "Snelheid", "explosief_gecontroleerd": "Explosief"},
+    },
+    "statistics": {"template_id": 1, "responses": 120, "players": 40, "last_submitted_at": "2025-01-15T10:00:00Z"},
+    "team": {"id": 1, "name": "Test Team", "club": "SportTeams", "season": "2025", "players_count": 18},
+    "player": {"id": 1, "name": "Test Speler", "email": "speler@sportteams.nl", "position": "Forward",
+               "jersey_number": 10, "birth_date": "1995-06-15"},
+    "audit": {"id": 1, "action": "player_created", "user_id": 1, "created_at": "2025-01-15T10:00:00Z"},
+}
+
+TOKENS = {"access_token": "bench-access-token", "refresh_token": "bench-refresh-token",
+          "token_type": "Bearer", "expires_in": 3600}
+
+
+@lru_cache(maxsize=256)
+def payload(kind: str, size: int, status: str = "success") -> bytes:
+    """Laravel style JSON body of about `size` bytes listing `kind` items"""
+    item = json.dumps(ITEMS[kind], separators=(",", ":"))
+    envelope = json.dumps({"status": status, "data": "@"}, separators=(",", ":"))
+    count = max(1, (size - len(envelope)) // (len(item) + 1))
+    body = envelope.replace('"@"', "[" + ",".join([item] * count) + "]")
+    return body.encode("utf-8")
+
+
+def endpoint(kind: str, status_code: int = 200):
+    async def handle(request: Request) -> Response:
+        params = request.query_params
+        size = min(int(params.get("size", DEFAULT_SIZE)), MAX_SIZE)
+        latency_ms = float(params.get("latency_ms", DEFAULT_LATENCY_MS))
+        await request.body()
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+        return Response(payload(kind, size), status_code=status_code, media_type="application/json",
+                        headers={"server-timing": f"app;dur={latency_ms:.1f}"})
+    return handle
+
+
+async def login(request: Request) -> Response:
+    await request.body()
+    body = {"status": "success", "user": ITEMS["user"], "tokens": TOKENS}
+    return Response(json.dumps(body), media_type="application/json")
+
+
+app = Starlette(routes=[
+    Route("/api/v1/test", endpoint("test")),
+    Route("/api/v1/auth/login", login, methods=["POST"]),
+    Route("/api/v1/auth/refresh", login, methods=["POST"]),
+    Route("/api/v1/auth/me", endpoint("user")),
+    Route("/api/v1/auth/logout", endpoint("test"), methods=["POST"]),
+    Route("/api/v1/team-admin/teams", endpoint("team")),
+    Route("/api/v1/team-admin/teams/{id}/players", endpoint("player")),
+    Route("/api/v1/team-admin/players", endpoint("player", 201), methods=["POST"]),
+    Route("/api/v1/team-admin/players/{id}", endpoint("player"), methods=["PUT"]),
+    Route("/api/v1/team-admin/audit-log", endpoint("audit")),
+    Route("/api/v1/forms/templates", endpoint("template")),
+    Route("/api/v1/forms/templates", endpoint("template", 201), methods=["POST"]),
+    Route("/api/v1/forms/templates/{id}", endpoint("template"), methods=["GET", "PUT", "DELETE"]),
+    Route("/api/v1/forms/templates/{id}/toggle-active", endpoint("template"), methods=["POST"]),
+    Route("/api/v1/forms/statistics", endpoint("statistics")),
+    Route("/api/v1/forms/active", endpoint("template")),
+    Route("/api/v1/forms/responses", endpoint("response")),
+    Route("/api/v1/forms/responses", endpoint("response", 201), methods=["POST"]),
+    Route("/api/v1/forms/responses/{id}", endpoint("response"), methods=["GET", "PUT", "DELETE"]),
+])
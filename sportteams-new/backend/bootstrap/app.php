@@ -14,6 +14,7 @@
     ->withMiddleware(function (Middleware $middleware): void {
         $middleware->api(prepend: [
             \Illuminate\Http\Middleware\HandleCors::class,
+            \App\Http\Middleware\ServerTimingMiddleware::class,
         ]);
         
         // Register custom middleware
@@ -0,0 +1,32 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        Schema::table('form_responses', function (Blueprint $table) {
+            // Set from the Idempotency-Key header, e.g. by proxy journal replays;
+            // unique per submitter, since keys come from clients
+            $table->string('idempotency_key', 64)->nullable()->after('id');
+            $table->unique(['submitted_by', 'idempotency_key']);
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::table('form_responses', function (Blueprint $table) {
+            $table->dropUnique(['submitted_by', 'idempotency_key']);
+            $table->dropColumn('idempotency_key');
+        });
+    }
+};
@@ -0,0 +1,155 @@
+"""
+SportTeams proxy building blocks used by server.py
+"""
+
+from .admission import PRIORITY_CLASSES, AdmissionController, AdmissionRejected
+from .asgi import ProxyApp, raw_response, raw_streaming_response
+from .auth import (
+    BATCH_CLAIM,
+    CLAIMS_HEADER,
+    CLAIMS_SIGNATURE_HEADER,
+    SCOPE_HEADERS,
+    SUBMITTED_AT_CLAIM,
+    ClaimScope,
+    TokenError,
+    TokenValidator,
+    bearer_token,
+    token_hash,
+)
+from .balancer import (
+    BALANCERS,
+    Balancer,
+    EwmaBalancer,
+    LeastOutstandingBalancer,
+    RoundRobinBalancer,
+    Target,
+    TargetGroup,
+    make_balancer,
+    origin_of,
+)
+from .batch import BATCH_SCOPE_KEY, BatchError, BatchItem, BatchRunner, capture, parse_batch
+from .breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from .cache import CacheEntry, ResponseCache, request_key
+from .coalesce import SingleFlight
+from .compression import ResponseCompressor, negotiate
+from .health import HealthProber, ProbeResult
+from .headers import HOP_BY_HOP_HEADERS, TRUSTED_PROXY_HEADERS, request_headers, response_headers
+from .invalidation import INVALIDATE_HEADER, CacheTags, TagVersions, expand_tags
+from .journal import SUBMITTED_AT_HEADER, JournalConflict, JournalEntry, WriteJournal, scoped_id
+from .metrics import Counter, Gauge, Histogram, MetricsSpool, ProxyMetrics, Registry, method_label
+from .pool import BufferedResponse, UpstreamPool
+from .ratelimit import (
+    RateLimitResult,
+    TokenBucketLimiter,
+    client_address,
+    parse_networks,
+    retry_after_header,
+)
+from .retry import RETRY_STATUS_CODES, LatencyWindow, RetryBudget, RetryPolicy
+from .routes import API_ROUTES, RouteMatch, RouteTable
+from .static import StaticSite, precompress
+from .supervisor import Supervisor, current_worker, default_workers
+from .tracing import (
+    TRACE_ID_HEADER,
+    TRACEPARENT_HEADER,
+    RequestTrace,
+    Span,
+    Tracer,
+    current_trace,
+    laravel_duration,
+    parse_traceparent,
+)
+
+__all__ = [
+    "API_ROUTES",
+    "AdmissionController",
+    "AdmissionRejected",
+    "BALANCERS",
+    "BATCH_CLAIM",
+    "BATCH_SCOPE_KEY",
+    "Balancer",
+    "BatchError",
+    "BatchItem",
+    "BatchRunner",
+    "BufferedResponse",
+    "CLAIMS_HEADER",
+    "CLAIMS_SIGNATURE_HEADER",
+    "CLOSED",
+    "CacheEntry",
+    "CacheTags",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ClaimScope",
+    "Counter",
+    "EwmaBalancer",
+    "Gauge",
+    "HALF_OPEN",
+    "HOP_BY_HOP_HEADERS",
+    "HealthProber",
+    "Histogram",
+    "INVALIDATE_HEADER",
+    "JournalConflict",
+    "JournalEntry",
+    "LatencyWindow",
+    "LeastOutstandingBalancer",
+    "MetricsSpool",
+    "OPEN",
+    "PRIORITY_CLASSES",
+    "ProbeResult",
+    "ProxyApp",
+    "ProxyMetrics",
+    "RETRY_STATUS_CODES",
+    "RateLimitResult",
+    "Registry",
+    "RequestTrace",
+    "ResponseCache",
+    "ResponseCompressor",
+    "RetryBudget",
+    "RetryPolicy",
+    "RoundRobinBalancer",
+    "RouteMatch",
+    "RouteTable",
+    "SCOPE_HEADERS",
+    "SUBMITTED_AT_CLAIM",
+    "SUBMITTED_AT_HEADER",
+    "SingleFlight",
+    "Span",
+    "StaticSite",
+    "Supervisor",
+    "TRACEPARENT_HEADER",
+    "TRACE_ID_HEADER",
+    "TRUSTED_PROXY_HEADERS",
+    "TagVersions",
+    "Target",
+    "TargetGroup",
+    "TokenBucketLimiter",
+    "TokenError",
+    "TokenValidator",
+    "Tracer",
+    "UpstreamPool",
+    "WriteJournal",
+    "bearer_token",
+    "capture",
+    "client_address",
+    "current_trace",
+    "current_worker",
+    "default_workers",
+    "expand_tags",
+    "laravel_duration",
+    "make_balancer",
+    "method_label",
+    "negotiate",
+    "origin_of",
+    "parse_batch",
+    "parse_networks",
+    "parse_traceparent",
+    "precompress",
+    "raw_response",
+    "raw_streaming_response",
+    "request_headers",
+    "request_key",
+    "response_headers",
+    "retry_after_header",
+    "scoped_id",
+    "token_hash",
+]
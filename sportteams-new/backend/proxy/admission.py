@@ -0,0 +1,164 @@
+"""
+Admission control in front of the Laravel workers
+At most `limit` upstream calls run at once. Further calls wait in a bounded
+queue ordered by priority class, then by arrival. Auth and health calls
+therefore jump ahead of heavy statistics and response pages.
+
+When the queue is full, an arriving call either displaces the newest call of
+a lower class or is rejected itself. A call that waits longer than
+`queue_timeout` is rejected too. Both answer 503 with Retry-After, so
+latency stays bounded instead of growing with the backlog.
+
+A slot is held until Laravel has answered: the headers for streamed
+responses, the whole body for buffered ones.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Lower value = served first
+PRIORITY_CLASSES = {"critical": 0, "high": 1, "normal": 2, "low": 3}
+
+
+class AdmissionRejected(Exception):
+    """The call was shed instead of queued (answered with 503)"""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Request shed by admission control ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "sequence", "future", "enqueued_at")
+
+    def __init__(self, priority: int, sequence: int, future: "asyncio.Future[None]"):
+        self.priority = priority
+        self.sequence = sequence
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded priority queue"""
+
+    def __init__(self, limit: int = 16, queue_size: int = 64, queue_timeout: float = 5.0,
+                 observe_wait: Optional[Callable[[str, float], None]] = None):
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self.observe_wait = observe_wait
+        self.in_flight = 0
+        self._queue: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._names = {value: name for name, value in PRIORITY_CLASSES.items()}
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "displaced": 0, "timeout": 0}
+
+    async def run(self, priority: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Start `call()` once a slot is held and await it; raises AdmissionRejected when shed
+
+        `call` is a factory, so a shed request never creates its upstream call.
+        """
+        await self.acquire(priority)
+        try:
+            return await call()
+        finally:
+            self.release()
+
+    async def acquire(self, priority: str) -> None:
+        level = PRIORITY_CLASSES.get(priority, PRIORITY_CLASSES["normal"])
+        # Slots are handed straight to waiters on release, so a free slot means nobody is queued
+        if self.in_flight < self.limit:
+            self.in_flight += 1
+            self.admitted += 1
+            self._observe(level, 0.0)
+            return
+        waiter = self._enqueue(level)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.rejected["timeout"] += 1
+            raise AdmissionRejected("timeout", self.retry_after)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        self._observe(level, time.monotonic() - waiter.enqueued_at)
+
+    def release(self) -> None:
+        """Free a slot and hand it to the best waiter"""
+        while self._queue:
+            waiter = heapq.heappop(self._queue)
+            if not waiter.future.done():
+                self.admitted += 1
+                waiter.future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._queue if not waiter.future.done())
+
+    @property
+    def retry_after(self) -> float:
+        # Rough time to drain the queue at the current concurrency
+        return max(1.0, self.queue_timeout * self.queued / max(1, self.queue_size))
+
+    def queue_depths(self) -> Dict[str, int]:
+        depths = {name: 0 for name in PRIORITY_CLASSES}
+        for waiter in self._queue:
+            if not waiter.future.done():
+                depths[self._names[waiter.priority]] += 1
+        return depths
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "queued": self.queue_depths(),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+    def _enqueue(self, level: int) -> _Waiter:
+        if self.queued >= self.queue_size:
+            victim = self._newest_below(level)
+            if victim is None:
+                self.rejected["queue_full"] += 1
+                raise AdmissionRejected("queue_full", self.retry_after)
+            self.rejected["displaced"] += 1
+            victim.future.set_exception(AdmissionRejected("displaced", self.retry_after))
+        waiter = _Waiter(level, next(self._sequence), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+        return waiter
+
+    def _newest_below(self, level: int) -> Optional[_Waiter]:
+        """The most recently queued waiter of the lowest class below `level`"""
+        candidates: List[Tuple[int, int, _Waiter]] = [
+            (waiter.priority, waiter.sequence, waiter) for waiter in self._queue
+            if waiter.priority > level and not waiter.future.done()
+        ]
+        return max(candidates)[2] if candidates else None
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Stop waiting; a slot granted in the meantime is passed on"""
+        if waiter.future.done():
+            if not waiter.future.cancelled() and waiter.future.exception() is None:
+                self.release()
+            return
+        waiter.future.cancel()
+
+    def _observe(self, level: int, seconds: float) -> None:
+        if self.observe_wait is not None:
+            self.observe_wait(self._names[level], seconds)
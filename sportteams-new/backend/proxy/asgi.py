@@ -0,0 +1,60 @@
+"""
+Raw ASGI entry point for proxied requests
+Proxied paths never reach FastAPI: there is no router, no dependency
+resolution and no BaseHTTPMiddleware task and memory stream per request.
+Headers stay as ASGI byte pairs from the client socket to httpx and back;
+only the proxy's own endpoints go through the wrapped FastAPI app.
+"""
+
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+RawHeaders = List[Tuple[bytes, bytes]]
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class ProxyApp:
+    """Send HTTP requests to `handler` unless their path is served by `app`
+
+    Lifespan and websocket scopes always go to `app`, so it can be wrapped
+    around (or mounted in place of) an existing FastAPI application. With a
+    `static` app, only paths under `upstream_prefixes` are proxied and all
+    other paths are served by `static`.
+    """
+
+    def __init__(self, handler: Handler, app: ASGIApp, local_paths: Iterable[str] = (),
+                 static: Optional[ASGIApp] = None, upstream_prefixes: Iterable[str] = ("/api/",)):
+        self.handler = handler
+        self.app = app
+        self.local_paths = frozenset(local_paths)
+        self.static = static
+        self.upstream_prefixes = tuple(upstream_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.local_paths:
+            await self.app(scope, receive, send)
+            return
+        if self.static is not None and not scope["path"].startswith(self.upstream_prefixes):
+            await self.static(scope, receive, send)
+            return
+        response = await self.handler(Request(scope, receive))
+        await response(scope, receive, send)
+
+
+def raw_response(status_code: int, headers: RawHeaders, body: bytes) -> Response:
+    """Buffered response from raw header pairs; content-length is set from the body"""
+    response = Response(content=body, status_code=status_code)
+    response.raw_headers[:0] = [(name, value) for name, value in headers if name != b"content-length"]
+    return response
+
+
+def raw_streaming_response(status_code: int, headers: RawHeaders, chunks: AsyncIterator[bytes],
+                           background: Optional[BackgroundTask] = None) -> StreamingResponse:
+    """Streamed response from raw header pairs, passed on unchanged"""
+    response = StreamingResponse(chunks, status_code=status_code, background=background)
+    response.raw_headers = headers
+    return response
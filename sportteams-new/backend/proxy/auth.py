@@ -0,0 +1,206 @@
+"""
+Edge validation of SportTeams access tokens
+Mirrors App\\Services\\Security\\TokenService: a token is
+base64(iv[16] + tag[16] + AES-256-GCM ciphertext) of an HS256 JWT, or the
+base64 of the bare JWT when no encryption key is configured. Validated
+claims are cached by token hash until the token expires, so repeat calls
+skip the decryption and signature work.
+
+Revocation lives in Laravel's cache store, which the proxy cannot see;
+valid tokens therefore still reach Laravel, together with the validated
+claims in a header that is signed with the shared signing key, so
+SecurityMiddleware can skip the crypto and only do the revocation check.
+
+AES-GCM needs the optional `cryptography` package; without it the
+validator reports itself unavailable when an encryption key is set.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # pragma: no cover - optional dependency
+    AESGCM = None
+
+# Headers carrying the validated claims to Laravel; always stripped from
+# clients through headers.TRUSTED_PROXY_HEADERS
+CLAIMS_HEADER = "x-sportteams-claims"
+CLAIMS_SIGNATURE_HEADER = "x-sportteams-claims-signature"
+
+# Domain separation for the claims signature, matches TokenService::validateProxyClaims
+CLAIMS_SIGNATURE_PREFIX = b"proxy-claims."
+
+# Signed claim naming the batch a sub-request belongs to; Laravel counts all
+# sub-requests of one batch as a single use of the token
+BATCH_CLAIM = "proxy_batch"
+
+# Signed claim with the original submission time of a journal replay; Laravel
+# only honours the submitted-at header when it matches this claim
+SUBMITTED_AT_CLAIM = "proxy_submitted_at"
+
+
+class TokenError(Exception):
+    """The token is malformed, has a bad signature or is expired"""
+
+
+def _b64url_decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenValidator:
+    """Validate tokens and cache the outcome per token hash"""
+
+    def __init__(self, signing_key: bytes, encryption_key: Optional[bytes] = None,
+                 audience: Optional[str] = None, cache_size: int = 10000,
+                 negative_ttl: float = 30.0, leeway: float = 0.0):
+        self.signing_key = signing_key
+        self.encryption_key = encryption_key or None
+        self.audience = audience
+        self.cache_size = cache_size
+        self.negative_ttl = negative_ttl
+        self.leeway = leeway
+        self._aead = AESGCM(self.encryption_key) if self.encryption_key and AESGCM else None
+        # token hash -> (expires at, claims or None, error message)
+        self._cache: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]], str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    @property
+    def available(self) -> bool:
+        """False when tokens are encrypted but AES-GCM support is missing"""
+        return bool(self.signing_key) and (self.encryption_key is None or self._aead is not None)
+
+    def validate(self, token: str) -> Dict[str, Any]:
+        """Return the token claims or raise TokenError"""
+        key = token_hash(token)
+        now = time.time()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > now:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            if cached[1] is None:
+                self.rejected += 1
+                raise TokenError(cached[2])
+            return cached[1]
+        self.misses += 1
+        try:
+            claims = self.decode(token, now)
+        except TokenError as e:
+            self.rejected += 1
+            self._store(key, now + self.negative_ttl, None, str(e))
+            raise
+        self._store(key, float(claims["exp"]), claims, "")
+        return claims
+
+    def decode(self, token: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """Decrypt, verify and check the time and audience claims of a token"""
+        now = now if now is not None else time.time()
+        jwt = self._decrypt(token)
+        try:
+            header_part, payload_part, signature_part = jwt.split(".")
+            header = json.loads(_b64url_decode(header_part))
+            claims = json.loads(_b64url_decode(payload_part))
+            signature = _b64url_decode(signature_part)
+        except (ValueError, binascii.Error):
+            raise TokenError("Malformed token")
+        if not isinstance(header, dict) or header.get("alg") != "HS256" or not isinstance(claims, dict):
+            raise TokenError("Unsupported token algorithm")
+        expected = hmac.new(
+            self.signing_key, f"{header_part}.{payload_part}".encode("ascii"), hashlib.sha256
+        ).digest()
+        if not hmac.compare_digest(signature, expected):
+            raise TokenError("Signature verification failed")
+        if not isinstance(claims.get("exp"), (int, float)) or claims["exp"] + self.leeway <= now:
+            raise TokenError("Expired token")
+        if isinstance(claims.get("nbf"), (int, float)) and claims["nbf"] - self.leeway > now:
+            raise TokenError("Token not yet valid")
+        if self.audience and (claims.get("aud") != self.audience or claims.get("iss") != self.audience):
+            raise TokenError("Invalid token audience or issuer")
+        return claims
+
+    def claims_headers(self, token: str, claims: Dict[str, Any]) -> Dict[str, str]:
+        """Signed claims headers for Laravel, bound to this exact token"""
+        encoded = base64.b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        message = CLAIMS_SIGNATURE_PREFIX + encoded + b"." + token_hash(token).encode("ascii")
+        signature = hmac.new(self.signing_key, message, hashlib.sha256).hexdigest()
+        return {CLAIMS_HEADER: encoded.decode("ascii"), CLAIMS_SIGNATURE_HEADER: signature}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "encrypted_tokens": self.encryption_key is not None,
+            "cached_tokens": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+        }
+
+    def _decrypt(self, token: str) -> str:
+        try:
+            data = base64.b64decode(token, validate=False)
+        except (ValueError, binascii.Error):
+            raise TokenError("Malformed token")
+        if self.encryption_key is None:
+            return data.decode("utf-8", "replace")
+        if self._aead is None:
+            raise TokenError("Token decryption is not available")
+        if len(data) <= 32:
+            raise TokenError("Malformed token")
+        iv, tag, ciphertext = data[:16], data[16:32], data[32:]
+        try:
+            return self._aead.decrypt(iv, ciphertext + tag, None).decode("utf-8")
+        except Exception:
+            raise TokenError("Token decryption failed")
+
+    def _store(self, key: str, expires_at: float, claims: Optional[Dict[str, Any]], error: str) -> None:
+        self._cache[key] = (expires_at, claims, error)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+# Pseudo headers that expose validated claims to cache and coalescing keys,
+# e.g. PROXY_CACHE_VARY_HEADERS=x-sportteams-role to share entries per role
+SCOPE_HEADERS = {
+    "x-sportteams-role": "role",
+    "x-sportteams-user-id": "user_id",
+}
+
+
+class ClaimScope:
+    """Header-like view of a request where the scope headers come from validated claims only"""
+
+    def __init__(self, headers: Any, claims: Optional[Dict[str, Any]]):
+        self.headers = headers
+        self.claims = claims
+
+    def get(self, name: str, default: str = "") -> str:
+        claim = SCOPE_HEADERS.get(name.lower())
+        if claim is None:
+            return self.headers.get(name, default)
+        if self.claims is None:
+            return default
+        # SecurityMiddleware treats a token without role as a player
+        value = self.claims.get(claim, "player" if claim == "role" else None)
+        return default if value is None else str(value)
+
+
+def bearer_token(headers: Any) -> Optional[str]:
+    """The token from an Authorization: Bearer header, like Request::bearerToken()"""
+    authorization = headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return token.strip() or None
@@ -0,0 +1,242 @@
+"""
+Load balancing across several Laravel upstreams
+Each upstream is a Target that tracks its outstanding requests, an EWMA of
+its response latency and its consecutive failures. Balancers pick a target
+per request; targets that keep failing are ejected for a while (passive
+health checking) and are re-admitted once the ejection expires. A target
+may also carry a circuit breaker; targets whose circuit is open are skipped
+and when every circuit is open the request fails fast.
+"""
+
+import itertools
+import random
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from .breaker import CircuitBreaker, CircuitOpenError
+
+
+def origin_of(url: str) -> str:
+    """Return scheme://host:port for a URL, used as the per-host pool key"""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+class Target:
+    """One upstream Laravel server"""
+
+    def __init__(self, base_url: str, ewma_decay: float = 10.0, failure_penalty: float = 1.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        self.breaker = breaker
+        self.origin = origin_of(self.base_url)
+        self.ewma_decay = ewma_decay
+        self.failure_penalty = failure_penalty
+        self.outstanding = 0
+        self.ewma_latency = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejection_streak = 0
+        self.ejected_until = 0.0
+        self._last_sample = 0.0
+
+    def is_available(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.monotonic()) >= self.ejected_until
+
+    def begin(self) -> None:
+        self.outstanding += 1
+        self.requests += 1
+
+    def accepts_requests(self, now: Optional[float] = None) -> bool:
+        return self.breaker is None or self.breaker.can_attempt(now)
+
+    def cancel(self) -> None:
+        """A request was abandoned before it had an outcome"""
+        self.outstanding = max(0, self.outstanding - 1)
+        if self.breaker is not None:
+            self.breaker.release()
+
+    def end(self, latency: float, ok: bool) -> None:
+        self.outstanding = max(0, self.outstanding - 1)
+        # A failure that came back fast must not make the target look attractive
+        self.observe(latency if ok else max(latency, self.failure_penalty))
+        if self.breaker is not None:
+            self.breaker.record(ok, latency)
+        if ok:
+            self.consecutive_failures = 0
+            self.ejection_streak = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+
+    def observe(self, latency: float) -> None:
+        """Time-decayed EWMA: old samples lose half their weight every ewma_decay seconds"""
+        now = time.monotonic()
+        if not self._last_sample:
+            self.ewma_latency = latency
+        else:
+            weight = 0.5 ** ((now - self._last_sample) / self.ewma_decay)
+            self.ewma_latency = self.ewma_latency * weight + latency * (1 - weight)
+        self._last_sample = now
+
+    def eject(self, seconds: float) -> None:
+        self.ejections += 1
+        self.ejection_streak += 1
+        self.ejected_until = time.monotonic() + seconds
+
+    def stats(self) -> Dict[str, Any]:
+        remaining = self.ejected_until - time.monotonic()
+        circuit = self.breaker.stats() if self.breaker is not None else None
+        return {
+            "url": self.base_url,
+            "available": remaining <= 0,
+            "ejected_for_seconds": round(remaining, 1) if remaining > 0 else 0,
+            "outstanding": self.outstanding,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 2),
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "ejections": self.ejections,
+            "circuit": circuit,
+        }
+
+
+class Balancer:
+    """Base class: choose one of the available targets"""
+
+    name = "base"
+
+    def choose(self, targets: Sequence[Target]) -> Target:
+        raise NotImplementedError
+
+
+class RoundRobinBalancer(Balancer):
+    name = "round_robin"
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def choose(self, targets: Sequence[Target]) -> Target:
+        return targets[next(self._counter) % len(targets)]
+
+
+class LeastOutstandingBalancer(Balancer):
+    """Fewest requests in flight; ties are broken round robin"""
+
+    name = "least_outstanding"
+
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def choose(self, targets: Sequence[Target]) -> Target:
+        offset = next(self._counter)
+        rotated = [targets[(offset + i) % len(targets)] for i in range(len(targets))]
+        return min(rotated, key=lambda target: target.outstanding)
+
+
+class EwmaBalancer(Balancer):
+    """Latency-weighted: power of two choices on ewma_latency * (outstanding + 1)"""
+
+    name = "ewma"
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self._random = rng or random.Random()
+
+    def choose(self, targets: Sequence[Target]) -> Target:
+        if len(targets) == 1:
+            return targets[0]
+        first, second = self._random.sample(list(targets), 2)
+        return min(first, second, key=self._cost)
+
+    @staticmethod
+    def _cost(target: Target) -> float:
+        # Targets without samples yet are tried first
+        return target.ewma_latency * (target.outstanding + 1)
+
+
+BALANCERS = {
+    RoundRobinBalancer.name: RoundRobinBalancer,
+    LeastOutstandingBalancer.name: LeastOutstandingBalancer,
+    EwmaBalancer.name: EwmaBalancer,
+}
+
+
+def make_balancer(name: str) -> Balancer:
+    """Build a balancer by name (round_robin, least_outstanding, ewma)"""
+    try:
+        return BALANCERS[name.strip().lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown balancer {name!r}, expected one of {', '.join(BALANCERS)}")
+
+
+class TargetGroup:
+    """The pool of upstream targets with passive health ejection"""
+
+    def __init__(self, base_urls: Iterable[str], balancer: Optional[Balancer] = None,
+                 eject_after_failures: int = 5, eject_seconds: float = 10.0,
+                 max_eject_seconds: float = 120.0,
+                 breaker_factory: Optional[Callable[[], CircuitBreaker]] = None):
+        self.targets: List[Target] = [
+            Target(url, breaker=breaker_factory() if breaker_factory else None)
+            for url in base_urls
+        ]
+        if not self.targets:
+            raise ValueError("At least one upstream URL is required")
+        self.balancer = balancer or RoundRobinBalancer()
+        self.eject_after_failures = eject_after_failures
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+
+    @property
+    def primary(self) -> Target:
+        return self.targets[0]
+
+    def available(self, exclude: Iterable[Target] = ()) -> List[Target]:
+        now = time.monotonic()
+        excluded = set(map(id, exclude))
+        return [t for t in self.targets if id(t) not in excluded and t.is_available(now)]
+
+    def choose(self, exclude: Iterable[Target] = ()) -> Optional[Target]:
+        """Pick a target; when all are ejected the one that comes back first is used
+
+        Raises CircuitOpenError when every remaining target has an open circuit.
+        """
+        now = time.monotonic()
+        excluded = list(exclude)
+        remaining = [t for t in self.targets if t not in excluded]
+        if not remaining:
+            return None
+        accepting = [t for t in remaining if t.accepts_requests(now)]
+        if not accepting:
+            for target in remaining:
+                target.breaker.rejected += 1
+            raise CircuitOpenError(min(t.breaker.retry_after(now) for t in remaining))
+        candidates = [t for t in accepting if t.is_available(now)]
+        if candidates:
+            target = self.balancer.choose(candidates)
+        else:
+            target = min(accepting, key=lambda t: t.ejected_until)
+        if target.breaker is not None:
+            target.breaker.acquire()
+        return target
+
+    def record(self, target: Target, latency: float, ok: bool) -> None:
+        target.end(latency, ok)
+        if ok or not self.eject_after_failures or not target.is_available():
+            return
+        if target.consecutive_failures >= self.eject_after_failures:
+            # Back off exponentially while the target keeps failing after re-admission
+            seconds = self.eject_seconds * 2 ** target.ejection_streak
+            target.eject(min(seconds, self.max_eject_seconds))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "balancer": self.balancer.name,
+            "eject_after_failures": self.eject_after_failures,
+            "eject_seconds": self.eject_seconds,
+            "targets": [target.stats() for target in self.targets],
+        }
@@ -0,0 +1,209 @@
+"""
+Batch endpoint: several API calls in one round trip
+Each sub-request is turned into its own ASGI scope, using the caller's
+headers (and therefore the same bearer token), and is dispatched through the
+normal proxy path. Rate limits, edge auth, caching and coalescing apply to
+each item exactly as if it had been sent separately. Items run concurrently
+up to a fixed parallelism; results come back in request order, and an item
+that fails is reported with status 502 without failing the others.
+
+Laravel accepts a token only once a minute, so sub-requests carry the batch
+ID (scope key BATCH_SCOPE_KEY) into the edge-validated claims that are
+signed for Laravel, which accepts all sub-requests of one batch as one use.
+Without edge validation, only the first item would get through.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from starlette.types import Scope
+
+logger = logging.getLogger("sportteams.proxy.batch")
+
+BATCH_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE"})
+
+# ASGI scope key holding the batch ID of a sub-request
+BATCH_SCOPE_KEY = "sportteams.batch"
+
+# Caller headers that describe the batch body itself, not the sub-requests
+_CALLER_SKIP = frozenset({b"content-length", b"content-type", b"accept-encoding", b"transfer-encoding"})
+# Sub-requests always use the caller's credentials
+_ITEM_SKIP = frozenset({"authorization", "cookie", "host", "content-length", "transfer-encoding"})
+
+Dispatch = Callable[[Scope, Callable[[], Awaitable[dict]]], Awaitable[Tuple[int, List[Tuple[bytes, bytes]], bytes]]]
+
+
+class BatchError(ValueError):
+    """Malformed batch payload (answered with 400)"""
+
+
+class BatchItem:
+    """One validated sub-request"""
+
+    __slots__ = ("id", "method", "path", "query", "headers", "body")
+
+    def __init__(self, id: str, method: str, path: str, query: str,
+                 headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.id = id
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+
+def parse_batch(payload: Any, prefix: str = "/api/v1", max_items: int = 20) -> List[BatchItem]:
+    """Validate {"requests": [{"id", "method", "path", "query", "headers", "body"}, ...]}
+
+    Relative paths ("/auth/me") are resolved against `prefix`; only API paths
+    can be batched.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("requests"), list):
+        raise BatchError("Body must be an object with a 'requests' array")
+    requests = payload["requests"]
+    if not requests:
+        raise BatchError("'requests' must not be empty")
+    if len(requests) > max_items:
+        raise BatchError(f"At most {max_items} requests per batch")
+    items = []
+    for index, spec in enumerate(requests):
+        if not isinstance(spec, dict) or not isinstance(spec.get("path"), str):
+            raise BatchError(f"Request {index} needs a 'path'")
+        method = str(spec.get("method", "GET")).upper()
+        if method not in BATCH_METHODS:
+            raise BatchError(f"Request {index}: method {method} cannot be batched")
+        path, _, query = spec["path"].partition("?")
+        if not path.startswith("/api/"):
+            path = prefix.rstrip("/") + "/" + path.lstrip("/")
+        if path.rstrip("/") == prefix.rstrip("/") + "/batch":
+            raise BatchError(f"Request {index}: batches cannot be nested")
+        if isinstance(spec.get("query"), dict):
+            extra = urlencode(spec["query"], doseq=True)
+            query = f"{query}&{extra}" if query else extra
+        headers = [
+            (str(name).lower().encode("latin-1"), str(value).encode("latin-1"))
+            for name, value in (spec.get("headers") or {}).items()
+            if str(name).lower() not in _ITEM_SKIP
+        ]
+        body = b""
+        if spec.get("body") is not None and method in ("POST", "PUT", "PATCH"):
+            body = json.dumps(spec["body"]).encode("utf-8")
+            headers = [(name, value) for name, value in headers if name != b"content-type"]
+            headers.append((b"content-type", b"application/json"))
+        if body:
+            headers.append((b"content-length", str(len(body)).encode("ascii")))
+        items.append(BatchItem(str(spec.get("id", index)), method, path, query, headers, body))
+    return items
+
+
+def sub_scope(scope: Scope, item: BatchItem, batch_id: Optional[str] = None) -> Scope:
+    """ASGI scope for a sub-request, with the caller's connection and headers"""
+    item_names = {name for name, _ in item.headers}
+    headers = [
+        (name, value) for name, value in scope["headers"]
+        if name not in _CALLER_SKIP and name not in item_names
+    ]
+    headers.extend(item.headers)
+    # Bodies are embedded in the batch document, so they must arrive unencoded
+    headers.append((b"accept-encoding", b"identity"))
+    return {
+        **scope,
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "method": item.method,
+        "path": item.path,
+        "raw_path": item.path.encode("latin-1"),
+        "query_string": item.query.encode("latin-1"),
+        "headers": headers,
+        BATCH_SCOPE_KEY: batch_id,
+    }
+
+
+def decode_body(headers: List[Tuple[bytes, bytes]], body: bytes) -> Any:
+    """JSON bodies are embedded as JSON, anything else as text"""
+    content_type = b""
+    for name, value in headers:
+        if name == b"content-type":
+            content_type = value.lower()
+    if not body:
+        return None
+    if b"json" in content_type:
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode("utf-8", "replace")
+
+
+class BatchRunner:
+    """Run batch items through `dispatch` with bounded concurrency"""
+
+    def __init__(self, dispatch: Dispatch, concurrency: int = 6):
+        self.dispatch = dispatch
+        self.concurrency = max(1, concurrency)
+        self.batches = 0
+        self.items = 0
+
+    async def run(self, scope: Scope, items: List[BatchItem]) -> List[Dict[str, Any]]:
+        self.batches += 1
+        self.items += len(items)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        batch_id = uuid.uuid4().hex
+
+        async def run_one(item: BatchItem) -> Dict[str, Any]:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    status_code, headers, body = await self.dispatch(
+                        sub_scope(scope, item, batch_id), _receiver(item.body))
+                except Exception as e:
+                    logger.exception(f"Batch item {item.id} ({item.method} {item.path}) failed")
+                    status_code, headers = 502, [(b"content-type", b"application/json")]
+                    body = json.dumps({"error": f"Sub-request failed: {type(e).__name__}"}).encode("utf-8")
+                return {
+                    "id": item.id,
+                    "status": status_code,
+                    "body": decode_body(headers, body),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                }
+
+        return list(await asyncio.gather(*(run_one(item) for item in items)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"batches": self.batches, "items": self.items, "concurrency": self.concurrency}
+
+
+def _receiver(body: bytes) -> Callable[[], Awaitable[dict]]:
+    """ASGI receive for a sub-request: the body once, then wait like an idle client"""
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive() -> dict:
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    return receive
+
+
+async def capture(app: Callable, scope: Scope, receive: Callable[[], Awaitable[dict]]
+                  ) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """Call an ASGI app and collect its response in memory"""
+    status_code: Optional[int] = None
+    headers: List[Tuple[bytes, bytes]] = []
+    chunks: List[bytes] = []
+
+    async def send(message: dict) -> None:
+        nonlocal status_code, headers
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status_code or 500, headers, b"".join(chunks)
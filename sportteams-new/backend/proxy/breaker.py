@@ -0,0 +1,154 @@
+"""
+Circuit breaker for an upstream Laravel server
+closed     requests flow; outcomes are counted in a rolling time window and
+           the circuit opens when the error rate or the slow-call rate
+           crosses its threshold
+open       requests fail fast without touching the upstream until
+           open_seconds have passed
+half_open  a few trial requests probe the upstream; if they all succeed
+           the circuit closes again, any failure opens it again
+"""
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when no upstream accepts requests because every circuit is open"""
+
+    def __init__(self, retry_after: float = 0.0):
+        super().__init__("Circuit breaker is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker with error-rate and latency thresholds"""
+
+    def __init__(self, error_rate: float = 0.5, slow_call_seconds: float = 5.0,
+                 slow_call_rate: float = 0.8, min_requests: int = 10,
+                 window_seconds: int = 10, open_seconds: float = 15.0,
+                 half_open_requests: int = 3):
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.min_requests = min_requests
+        self.window_seconds = max(1, int(window_seconds))
+        self.open_seconds = open_seconds
+        self.half_open_requests = max(1, half_open_requests)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trials_started = 0
+        self._trials_passed = 0
+        # One [second, calls, errors, slow] bucket per second of the window
+        self._buckets: Deque[List[int]] = deque()
+
+    def retry_after(self, now: Optional[float] = None) -> float:
+        """Seconds until an open circuit lets a trial request through"""
+        if self.state != OPEN:
+            return 0.0
+        now = now if now is not None else time.monotonic()
+        return max(0.0, self.opened_at + self.open_seconds - now)
+
+    def can_attempt(self, now: Optional[float] = None) -> bool:
+        """Whether a request could be sent now (does not change state)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.retry_after(now) <= 0
+        return self._trials_started < self.half_open_requests
+
+    def acquire(self) -> bool:
+        """Claim permission for one request; moves an expired open circuit to half-open"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self.rejected += 1
+                return False
+            self._half_open()
+        if self.state == HALF_OPEN:
+            if self._trials_started >= self.half_open_requests:
+                self.rejected += 1
+                return False
+            self._trials_started += 1
+        return True
+
+    def release(self) -> None:
+        """Give back a permission whose request was abandoned without an outcome"""
+        if self.state == HALF_OPEN and self._trials_started > self._trials_passed:
+            self._trials_started -= 1
+
+    def record(self, ok: bool, latency: float) -> None:
+        """Record the outcome of a request that acquire() let through"""
+        slow = latency >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            if not ok or slow:
+                self._open()
+                return
+            self._trials_passed += 1
+            if self._trials_passed >= self.half_open_requests:
+                self._close()
+            return
+        if self.state == OPEN:
+            return
+        bucket = self._bucket()
+        bucket[1] += 1
+        bucket[2] += 0 if ok else 1
+        bucket[3] += 1 if slow else 0
+        calls, errors, slow_calls = self._totals()
+        if calls < self.min_requests:
+            return
+        if errors / calls >= self.error_rate or slow_calls / calls >= self.slow_call_rate:
+            self._open()
+
+    def stats(self) -> Dict[str, Any]:
+        calls, errors, slow_calls = self._totals()
+        return {
+            "state": self.state,
+            "retry_after_seconds": round(self.retry_after(), 1),
+            "window_calls": calls,
+            "window_errors": errors,
+            "window_slow_calls": slow_calls,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+    def _bucket(self) -> List[int]:
+        second = int(time.monotonic())
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0, 0])
+        self._expire(second)
+        return self._buckets[-1]
+
+    def _expire(self, second: int) -> None:
+        while self._buckets and self._buckets[0][0] <= second - self.window_seconds:
+            self._buckets.popleft()
+
+    def _totals(self):
+        self._expire(int(time.monotonic()))
+        calls = errors = slow_calls = 0
+        for _, bucket_calls, bucket_errors, bucket_slow in self._buckets:
+            calls += bucket_calls
+            errors += bucket_errors
+            slow_calls += bucket_slow
+        return calls, errors, slow_calls
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._buckets.clear()
+
+    def _half_open(self) -> None:
+        self.state = HALF_OPEN
+        self._trials_started = 0
+        self._trials_passed = 0
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._buckets.clear()
@@ -0,0 +1,164 @@
+"""
+In-memory response cache for read-mostly GET endpoints
+Entries are keyed on method, path, normalised query string and a
+configurable set of vary headers. Every route has its own TTL and the
+cache is bounded by the total size of the stored bodies, evicting the
+least recently used entries first. Entries can carry invalidation tags
+(see invalidation.py) and are dropped once one of those tags has changed.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from .invalidation import Tags, TagVersions
+
+CacheKey = Tuple[str, str, Tuple[Tuple[str, str], ...], Tuple[str, ...]]
+
+# Per-entry bookkeeping on top of the body, so tiny bodies still count
+ENTRY_OVERHEAD_BYTES = 256
+
+
+def request_key(method: str, path: str, query: str, headers: Any,
+                vary_headers: Iterable[str]) -> CacheKey:
+    """Key for a request; headers is any mapping with case-insensitive get()"""
+    params = tuple(sorted(parse_qsl(query, keep_blank_values=True)))
+    vary = tuple(headers.get(name, "") for name in vary_headers)
+    return (method.upper(), path.rstrip("/") or "/", params, vary)
+
+
+class CacheEntry:
+    """A stored upstream response"""
+
+    __slots__ = ("status_code", "headers", "body", "stored_at", "expires_at", "size", "route", "tags", "versions")
+
+    def __init__(self, status_code: int, headers: List[Tuple[bytes, bytes]], body: bytes,
+                 ttl: float, route: str = "", tags: Tags = (), versions: Tuple[int, ...] = ()):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+        self.size = len(body) + sum(len(name) + len(value) for name, value in headers) + ENTRY_OVERHEAD_BYTES
+        self.route = route
+        self.tags = tags
+        self.versions = versions
+
+    @property
+    def age(self) -> int:
+        return int(time.monotonic() - self.stored_at)
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.monotonic()) < self.expires_at
+
+
+class ResponseCache:
+    """Bounded TTL/LRU cache of upstream responses"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int = 1024 * 1024,
+                 vary_headers: Iterable[str] = ("authorization",), tag_versions: Optional[TagVersions] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.vary_headers = tuple(header.lower() for header in vary_headers)
+        self.tag_versions = tag_versions
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, method: str, path: str, query: str, headers: Any) -> CacheKey:
+        """Build the cache key from the request and the configured vary headers"""
+        return request_key(method, path, query, headers, self.vary_headers)
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if not entry.is_fresh():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        if entry.tags and not self._is_current(entry.tags, entry.versions):
+            self._remove(key)
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: CacheKey, status_code: int, headers: List[Tuple[bytes, bytes]],
+            body: bytes, ttl: float, route: str = "", tags: Tags = (),
+            versions: Tuple[int, ...] = ()) -> Optional[CacheEntry]:
+        """Store a response, returns None when it is too large, the TTL is not positive
+        or its tags changed after `versions` was taken (the body may predate a write)"""
+        if ttl <= 0 or len(body) > self.max_entry_bytes:
+            return None
+        if tags and not self._is_current(tags, versions):
+            self.invalidations += 1
+            return None
+        entry = CacheEntry(status_code, headers, body, ttl, route, tags, versions)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self.stores += 1
+        self._evict()
+        return entry if key in self._entries else None
+
+    def invalidate(self, key: CacheKey) -> bool:
+        if key in self._entries:
+            self._remove(key)
+            return True
+        return False
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "max_entry_bytes": self.max_entry_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "vary_headers": list(self.vary_headers),
+        }
+
+    def _is_current(self, tags: Tags, versions: Tuple[int, ...]) -> bool:
+        return self.tag_versions is None or self.tag_versions.is_current(tags, versions)
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+    def _evict(self) -> None:
+        # Expired entries go first, then least recently used ones
+        if self.bytes <= self.max_bytes:
+            return
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if not entry.is_fresh(now)]:
+            self._remove(key)
+            self.expirations += 1
+        while self.bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
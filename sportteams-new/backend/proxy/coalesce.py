@@ -0,0 +1,54 @@
+"""
+Single-flight coalescing of identical concurrent upstream calls
+The first caller for a key starts the upstream call as its own task; every
+caller that arrives while it is running awaits the same task and gets the
+same result. The task is shielded, so a leader whose client disconnects
+does not cancel the call for everybody else.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.leaders = 0
+        self.collapsed = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run call once per key; returns (result, shared) where shared means it was collapsed"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.collapsed += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), shared
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.collapsed
+        return {
+            "in_flight": self.in_flight,
+            "upstream_calls": self.leaders,
+            "collapsed_requests": self.collapsed,
+            "collapse_ratio": round(self.collapsed / total, 4) if total else 0.0,
+            "errors": self.errors,
+        }
+
+    def _finish(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception so a call nobody awaits anymore is not reported as lost
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
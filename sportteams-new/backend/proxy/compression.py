@@ -0,0 +1,160 @@
+"""
+Accept-Encoding negotiated response compression (brotli and gzip)
+Only identity-encoded upstream bodies are compressed, so a response that
+Laravel already encoded is never encoded twice. Compression is limited to
+textual content types and bodies above a minimum size; streamed bodies are
+compressed chunk by chunk with a flush after every chunk, so the first byte
+still goes out early.
+
+Brotli needs the optional `brotli` package; without it only gzip is offered.
+"""
+
+import zlib
+from typing import AsyncIterator, Dict, Iterable, Optional, Sequence
+
+from starlette.responses import Response, StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+DEFAULT_CONTENT_TYPES = (
+    "application/json",
+    "application/problem+json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+UNCOMPRESSIBLE_STATUS_CODES = frozenset({204, 206, 304})
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    codings: Dict[str, float] = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+def negotiate(header: str, available: Sequence[str]) -> Optional[str]:
+    """Pick the coding with the highest q-value; ties go to the order of `available`"""
+    codings = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = codings.get(coding, codings.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class _Encoder:
+    """Incremental encoder for one response body"""
+
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int):
+        self.coding = coding
+        if coding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.coding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.coding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+    def whole(self, data: bytes) -> bytes:
+        if self.coding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH)
+
+
+class ResponseCompressor:
+    """Compress proxy responses according to the client's Accept-Encoding"""
+
+    def __init__(self, min_size: int = 1024, content_types: Iterable[str] = DEFAULT_CONTENT_TYPES,
+                 gzip_level: int = 6, brotli_quality: int = 4):
+        self.min_size = min_size
+        self.content_types = tuple(content_type.lower() for content_type in content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+        self.compressed = {coding: 0 for coding in self.encodings}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def coding_for(self, method: str, accept_encoding: str, response: Response) -> Optional[str]:
+        """The coding to apply to this response, or None to send it as-is"""
+        if method == "HEAD" or response.status_code in UNCOMPRESSIBLE_STATUS_CODES:
+            return None
+        headers = response.headers
+        if headers.get("content-encoding", "identity").lower() != "identity":
+            return None
+        if "no-transform" in headers.get("cache-control", "").lower():
+            return None
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if not content_type or not any(content_type.startswith(allowed) for allowed in self.content_types):
+            return None
+        length = headers.get("content-length")
+        if length is not None and length.isdigit() and int(length) < self.min_size:
+            return None
+        return negotiate(accept_encoding, self.encodings)
+
+    def apply(self, method: str, accept_encoding: str, response: Response) -> Response:
+        """Compress the response in place when negotiation allows it"""
+        coding = self.coding_for(method, accept_encoding, response)
+        if coding is None:
+            return response
+        encoder = _Encoder(coding, self.gzip_level, self.brotli_quality)
+        if isinstance(response, StreamingResponse):
+            response.body_iterator = self._stream(encoder, response.body_iterator)
+            del response.headers["content-length"]
+        else:
+            body = response.body
+            if len(body) < self.min_size:
+                return response
+            response.body = encoder.whole(body)
+            response.headers["content-length"] = str(len(response.body))
+            self.bytes_in += len(body)
+            self.bytes_out += len(response.body)
+        response.headers["content-encoding"] = coding
+        response.headers.add_vary_header("Accept-Encoding")
+        self.compressed[coding] += 1
+        return response
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "encodings": list(self.encodings),
+            "compressed_responses": dict(self.compressed),
+            "buffered_bytes_in": self.bytes_in,
+            "buffered_bytes_out": self.bytes_out,
+            "min_size": self.min_size,
+        }
+
+    async def _stream(self, encoder: _Encoder, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            data = encoder.chunk(chunk)
+            if data:
+                yield data
+        tail = encoder.finish()
+        if tail:
+            yield tail
@@ -0,0 +1,67 @@
+"""
+Header filtering between the client, the proxy and Laravel
+Hop-by-hop headers describe a single connection and must not be forwarded
+(RFC 9110 section 7.6.1); everything else passes through untouched,
+including repeated headers such as Set-Cookie.
+"""
+
+from typing import Iterable, List, Tuple
+
+import httpx
+
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+})
+
+# Headers only the proxy may set on requests to Laravel (see proxy/auth.py)
+TRUSTED_PROXY_HEADERS = frozenset({
+    "x-sportteams-claims",
+    "x-sportteams-claims-signature",
+    "x-sportteams-submitted-at",
+})
+
+# The upstream host is set by httpx from the target URL, and trusted headers
+# sent by a client are never passed on
+REQUEST_SKIP_HEADERS = HOP_BY_HOP_HEADERS | TRUSTED_PROXY_HEADERS | {"host"}
+
+
+# ASGI and h11 header names are bytes; comparing against precomputed byte
+# sets avoids decoding every header of every request
+_REQUEST_SKIP = frozenset(name.encode("latin-1") for name in REQUEST_SKIP_HEADERS)
+_RESPONSE_SKIP = frozenset(name.encode("latin-1") for name in HOP_BY_HOP_HEADERS)
+
+
+def _connection_tokens(raw: Iterable[Tuple[bytes, bytes]]) -> frozenset:
+    # Headers named in Connection are hop-by-hop for this message as well
+    tokens = set()
+    for name, value in raw:
+        if name.lower() == b"connection":
+            tokens.update(token.strip().lower() for token in value.split(b","))
+    return frozenset(tokens)
+
+
+def request_headers(raw: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Headers to send upstream for the raw (lowercase) headers of an ASGI request"""
+    skip = _REQUEST_SKIP
+    for name, _ in raw:
+        if name == b"connection":
+            skip = skip | _connection_tokens(raw)
+            break
+    return [(name, value) for name, value in raw if name not in skip]
+
+
+def response_headers(headers: httpx.Headers) -> List[Tuple[bytes, bytes]]:
+    """Raw headers to send back to the client for an upstream httpx response"""
+    raw = [(name.lower(), value) for name, value in headers.raw]
+    skip = _RESPONSE_SKIP
+    if "connection" in headers:
+        skip = skip | _connection_tokens(raw)
+    return [(name, value) for name, value in raw if name not in skip]
@@ -0,0 +1,116 @@
+"""
+Background health prober for the Laravel upstreams
+A single task probes every upstream on an interval and keeps the last
+status, latency and error in memory, so /health answers from that snapshot
+instead of sending a request (and a DB table count) to Laravel per probe.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from .balancer import Target
+from .pool import UpstreamPool
+
+
+class ProbeResult:
+    """Last known health of one upstream"""
+
+    __slots__ = ("url", "healthy", "status_code", "latency", "error", "checked_at", "last_healthy_at")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy: Optional[bool] = None
+        self.status_code: Optional[int] = None
+        self.latency: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.last_healthy_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        if self.healthy is None:
+            status = "unknown"
+        else:
+            status = "healthy" if self.healthy else "unavailable"
+        return {
+            "url": self.url,
+            "status": status,
+            "status_code": self.status_code,
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "last_error": self.error,
+            "checked_at": self.checked_at,
+            "last_healthy_at": self.last_healthy_at,
+        }
+
+
+class HealthProber:
+    """Probe every upstream target periodically and cache the results"""
+
+    def __init__(self, pool: UpstreamPool, path: str = "/api/v1/test",
+                 interval: float = 10.0, timeout: float = 5.0):
+        self.pool = pool
+        self.path = path
+        self.interval = interval
+        self.timeout = timeout
+        self.results: Dict[str, ProbeResult] = {
+            target.base_url: ProbeResult(target.base_url) for target in pool.targets.targets
+        }
+        self.probes = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def healthy(self) -> bool:
+        return any(result.healthy for result in self.results.values())
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def probe_all(self) -> List[ProbeResult]:
+        """Probe every upstream now (used by the loop and by /health?deep=1)"""
+        return list(await asyncio.gather(*[self.probe(target) for target in self.pool.targets.targets]))
+
+    async def probe(self, target: Target) -> ProbeResult:
+        result = self.results[target.base_url]
+        started = time.monotonic()
+        try:
+            response = await self.pool.client.get(f"{target.base_url}{self.path}", timeout=self.timeout)
+            result.status_code = response.status_code
+            result.healthy = response.status_code == 200
+            result.error = None if result.healthy else f"HTTP {response.status_code}"
+        except Exception as e:
+            result.status_code = None
+            result.healthy = False
+            result.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        result.latency = time.monotonic() - started
+        result.checked_at = time.time()
+        if result.healthy:
+            result.last_healthy_at = result.checked_at
+            # A passing active probe re-admits a passively ejected target early
+            target.ejected_until = 0.0
+        self.probes += 1
+        return result
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [result.as_dict() for result in self.results.values()]
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.probe_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Never let one bad probe round stop the prober
+                pass
+            await asyncio.sleep(self.interval)
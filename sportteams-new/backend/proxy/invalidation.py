@@ -0,0 +1,126 @@
+"""
+Tag-based invalidation of cached responses after successful writes
+Cached GET routes carry tags such as "template:{id}" or "forms:active", and
+every mutating route lists the tags it makes stale. When Laravel answers a
+mutation with anything but a 4xx, the version of those tags is bumped.
+
+A cache entry records its tags' versions from the moment its fetch started.
+Once any of them has moved, the entry counts as a miss, so admins see their
+own change at once. A read that raced the write is never stored either.
+
+Versions live in a shared memory array of hashed slots created before the
+supervisor forks, so a write handled by one worker is seen by all of them.
+A hash collision only invalidates more than needed. Laravel can name extra
+tags in an `X-Cache-Invalidate` response header.
+"""
+
+import multiprocessing
+import re
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .routes import RouteTable
+
+INVALIDATE_HEADER = "x-cache-invalidate"
+
+Tags = Tuple[str, ...]
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def expand_tags(patterns: Iterable[str], params: Dict[str, str]) -> Tags:
+    """Fill route parameters into tag patterns: template:{id} -> template:12"""
+    return tuple(_PLACEHOLDER.sub(lambda found: params.get(found.group(1), found.group(0)), pattern)
+                 for pattern in patterns)
+
+
+class TagVersions:
+    """Version counters per tag, shared between forked workers"""
+
+    def __init__(self, slots: int = 4096):
+        self.slots = max(1, slots)
+        self._array = multiprocessing.get_context("fork").Array("Q", self.slots)
+        self._versions = self._array.get_obj()
+
+    def slot(self, tag: str) -> int:
+        # crc32 rather than hash(), which is salted per interpreter
+        return zlib.crc32(tag.encode("utf-8")) % self.slots
+
+    def snapshot(self, tags: Tags) -> Tuple[int, ...]:
+        return tuple(self._versions[self.slot(tag)] for tag in tags)
+
+    def is_current(self, tags: Tags, snapshot: Tuple[int, ...]) -> bool:
+        return self.snapshot(tags) == snapshot
+
+    def bump(self, tags: Iterable[str]) -> None:
+        slots = {self.slot(tag) for tag in tags}
+        if not slots:
+            return
+        with self._array.get_lock():
+            for slot in slots:
+                self._versions[slot] += 1
+
+
+class CacheTags:
+    """Tags of cached routes and the tags each mutating route invalidates"""
+
+    def __init__(self, tags: RouteTable, invalidations: Dict[str, RouteTable],
+                 versions: Optional[TagVersions] = None):
+        self.tags = tags
+        self.invalidations = invalidations
+        self.versions = versions or TagVersions()
+        self.invalidated = 0
+        self.by_route: Dict[str, int] = {}
+
+    @classmethod
+    def parse(cls, tag_spec: str, invalidation_spec: str, slots: int = 4096) -> "CacheTags":
+        """Build from the env var formats
+
+        tag_spec:          "/api/v1/forms/templates/{id}=template:{id} forms:templates,..."
+        invalidation_spec: "PUT /api/v1/forms/templates/{id}=template:{id} forms:active,..."
+        """
+        invalidations: Dict[str, RouteTable] = {}
+        for item in invalidation_spec.split(","):
+            if "=" not in item:
+                continue
+            route, patterns = item.rsplit("=", 1)
+            method, _, template = route.strip().partition(" ")
+            if template.strip():
+                invalidations.setdefault(method.upper(), RouteTable()).add(template.strip(), patterns.split())
+        return cls(RouteTable.parse(tag_spec, cast=str.split), invalidations, TagVersions(slots))
+
+    def tags_for(self, path: str) -> Tags:
+        """Tags of a cached GET path"""
+        match = self.tags.match(path)
+        return expand_tags(match.value, match.params) if match else ()
+
+    def snapshot(self, tags: Tags) -> Tuple[int, ...]:
+        return self.versions.snapshot(tags)
+
+    def invalidate(self, method: str, path: str, status_code: int, header: Optional[str] = None) -> Tags:
+        """Bump the tags a mutation made stale; a 4xx changed nothing"""
+        if 400 <= status_code < 500:
+            return ()
+        table = self.invalidations.get(method)
+        match = table.match(path) if table is not None else None
+        tags: List[str] = list(expand_tags(match.value, match.params)) if match else []
+        if header:
+            tags.extend(tag.strip() for tag in header.split(",") if tag.strip())
+        if not tags:
+            return ()
+        self.versions.bump(tags)
+        self.invalidated += 1
+        route = f"{method} {match.template}" if match else f"{method} {INVALIDATE_HEADER}"
+        self.by_route[route] = self.by_route.get(route, 0) + 1
+        return tuple(tags)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tagged_routes": self.tags.templates(),
+            "invalidating_routes": {
+                method: table.templates() for method, table in self.invalidations.items()
+            },
+            "invalidations": self.invalidated,
+            "invalidations_by_route": dict(self.by_route),
+            "slots": self.versions.slots,
+        }
@@ -0,0 +1,455 @@
+"""
+Durable write journal for form submissions
+When Laravel cannot take a submission, the proxy appends it to a local SQLite
+journal and answers 202 with a tracking ID. A replayer sends the journaled
+requests to Laravel in their original order once the backend is healthy.
+
+Appends from concurrent requests are written in one transaction, so they
+share a single fsync (group commit). Replays carry the tracking ID as their
+Idempotency-Key, so a replay that is repeated after a crash or a lost
+response creates no second record. Several supervisor workers can share the
+journal; a lease row makes exactly one of them the replayer at a time.
+
+Tracking IDs are scoped to the submitter (see scoped_id): the same client
+Idempotency-Key from two users names two entries, and reusing a key for a
+different request raises JournalConflict instead of dropping it.
+
+An entry ends up either `delivered` (2xx) or `failed` (a 4xx other than 408
+and 429, e.g. a validation error or an expired token), and the reason is
+kept for the status view; its request headers are erased at that point.
+Anything else is retried with backoff up to `max_attempts` times and then
+fails as well. Order is kept per submitter: a later entry waits behind an
+older pending entry of the same submitter only, so one stuck submission
+does not hold up everybody else's.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("sportteams.proxy.journal")
+
+# Original submission time (unix seconds) sent with replays
+SUBMITTED_AT_HEADER = "x-sportteams-submitted-at"
+
+PENDING = "pending"
+DELIVERED = "delivered"
+FAILED = "failed"
+
+# Request headers kept for the replay; cookies and everything else are not
+# stored, and the kept ones are erased once an entry is delivered or failed
+REPLAY_HEADERS = frozenset({
+    b"accept", b"accept-language", b"authorization", b"content-type", b"idempotency-key", b"user-agent",
+    b"x-forwarded-for",
+})
+
+# 4xx answers that may succeed later and are retried like 5xx
+RETRYABLE_CLIENT_ERRORS = frozenset({408, 429})
+
+
+class JournalConflict(Exception):
+    """The tracking ID is already journaled for a different request"""
+
+
+def scoped_id(submitter: str, key: str) -> str:
+    """Tracking ID for a client Idempotency-Key, private to one submitter"""
+    return hashlib.sha256(f"{submitter}\0{key}".encode("utf-8")).hexdigest()[:32]
+
+
+def request_digest(method: str, path: str, query: str, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method} {path}?{query}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    query TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    response_status INTEGER,
+    completed_at REAL,
+    submitter TEXT NOT NULL DEFAULT '',
+    digest TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS lease (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Columns added after the first release; older journals get them on open
+_ADDED_COLUMNS = {
+    "submitter": "TEXT NOT NULL DEFAULT ''",
+    "digest": "TEXT NOT NULL DEFAULT ''",
+}
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS entries_status ON entries (status, seq);
+CREATE INDEX IF NOT EXISTS entries_submitter ON entries (submitter, status, seq);
+"""
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+
+class JournalEntry:
+    """One journaled request"""
+
+    __slots__ = ("seq", "id", "created_at", "method", "path", "query", "headers", "body", "attempts", "submitter")
+
+    def __init__(self, seq: int, id: str, created_at: float, method: str, path: str, query: str,
+                 headers: RawHeaders, body: bytes, attempts: int, submitter: str = ""):
+        self.seq = seq
+        self.id = id
+        self.created_at = created_at
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.attempts = attempts
+        self.submitter = submitter
+
+
+# Sends an entry to Laravel; returns the status code and a short error text
+Deliver = Callable[[JournalEntry], Awaitable[Tuple[int, str]]]
+
+
+class WriteJournal:
+    """Append-only SQLite journal with an ordered, idempotent replayer"""
+
+    def __init__(self, path: str, retention: float = 7 * 86400, lease_seconds: float = 60.0,
+                 poll_interval: float = 1.0, backoff: float = 1.0, max_backoff: float = 60.0,
+                 max_attempts: int = 10):
+        self.path = path
+        self.retention = retention
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max(1, max_attempts)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Opened lazily: neither threads nor SQLite connections survive a fork
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._batch: List[Tuple[tuple, "asyncio.Future[Tuple[str, Optional[bool]]]"]] = []
+        self._flushing = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._pruned_at = 0.0
+        self.appended = 0
+        self.duplicates = 0
+        self.commits = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.conflicts = 0
+
+    # -- appending
+
+    async def append(self, method: str, path: str, query: str, headers: RawHeaders, body: bytes,
+                     id: Optional[str] = None, submitter: str = "") -> Tuple[str, bool]:
+        """Journal a request durably; returns (tracking id, False if `id` was already journaled)
+
+        Raises JournalConflict when `id` is journaled for another submitter or
+        another request.
+        """
+        record = (
+            id or uuid.uuid4().hex, time.time(), method, path, query,
+            json.dumps([[name.decode("latin-1"), value.decode("latin-1")]
+                        for name, value in headers if name in REPLAY_HEADERS]), body,
+            submitter, request_digest(method, path, query, body),
+        )
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append((record, future))
+        if not self._flushing:
+            self._flushing = True
+            asyncio.ensure_future(self._flush())
+        tracking_id, created = await future
+        if created is None:
+            raise JournalConflict(f"Tracking ID {tracking_id} is already used for a different submission")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return tracking_id, created
+
+    async def _flush(self) -> None:
+        # Appends that arrive while a commit is running go into the next one
+        try:
+            while self._batch:
+                batch, self._batch = self._batch, []
+                try:
+                    results = await self._run(self._insert, [record for record, _ in batch])
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self._flushing = False
+
+    def _insert(self, records: List[tuple]) -> List[Tuple[str, Optional[bool]]]:
+        # created is None for a conflicting duplicate
+        db = self._db()
+        results: List[Tuple[str, Optional[bool]]] = []
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for record in records:
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO entries "
+                    "(id, created_at, method, path, query, headers, body, submitter, digest) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", record)
+                if cursor.rowcount == 1:
+                    results.append((record[0], True))
+                    continue
+                stored = db.execute("SELECT submitter, digest FROM entries WHERE id = ?", (record[0],)).fetchone()
+                results.append((record[0], False if stored == (record[7], record[8]) else None))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self.commits += 1
+        self.appended += sum(1 for _, created in results if created)
+        self.duplicates += sum(1 for _, created in results if created is False)
+        self.conflicts += sum(1 for _, created in results if created is None)
+        return results
+
+    # -- status
+
+    async def has_pending(self, submitter: str = "") -> bool:
+        """True while `submitter` has entries waiting, which a new submission must not overtake"""
+        return await self._run(lambda: self._db().execute(
+            "SELECT 1 FROM entries WHERE submitter = ? AND status = ? LIMIT 1",
+            (submitter, PENDING)).fetchone() is not None)
+
+    async def status(self, id: str, submitter: str = "") -> Optional[Dict[str, Any]]:
+        """State of one entry (no headers or body); None unless it belongs to `submitter`"""
+        return await self._run(self._status, id, submitter)
+
+    def _status(self, id: str, submitter: str) -> Optional[Dict[str, Any]]:
+        db = self._db()
+        row = db.execute(
+            "SELECT seq, status, created_at, attempts, next_attempt_at, last_error, response_status, completed_at "
+            "FROM entries WHERE id = ? AND submitter = ?", (id, submitter)).fetchone()
+        if row is None:
+            return None
+        seq, status, created_at, attempts, next_attempt_at, last_error, response_status, completed_at = row
+        entry = {
+            "tracking_id": id,
+            "status": status,
+            "created_at": created_at,
+            "attempts": attempts,
+            "response_status": response_status,
+            "error": last_error,
+            "completed_at": completed_at,
+        }
+        if status == PENDING:
+            entry["queue_position"] = db.execute(
+                "SELECT COUNT(*) FROM entries WHERE submitter = ? AND status = ? AND seq < ?",
+                (submitter, PENDING, seq)).fetchone()[0]
+            entry["next_attempt_at"] = next_attempt_at or None
+        return entry
+
+    async def stats(self) -> Dict[str, Any]:
+        return await self._run(self._stats)
+
+    def _stats(self) -> Dict[str, Any]:
+        db = self._db()
+        counts = {PENDING: 0, DELIVERED: 0, FAILED: 0}
+        counts.update(db.execute("SELECT status, COUNT(*) FROM entries GROUP BY status").fetchall())
+        oldest = db.execute("SELECT MIN(created_at) FROM entries WHERE status = ?", (PENDING,)).fetchone()[0]
+        lease = db.execute("SELECT owner, expires_at FROM lease WHERE id = 1").fetchone()
+        return {
+            "path": self.path,
+            "entries": counts,
+            "oldest_pending_age": round(time.time() - oldest, 3) if oldest else None,
+            "replayer": lease[0] if lease and lease[1] > time.time() else None,
+            "this_worker": self.owner,
+            "appended": self.appended,
+            "duplicates": self.duplicates,
+            "group_commits": self.commits,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retries": self.retries,
+            "conflicts": self.conflicts,
+            "max_attempts": self.max_attempts,
+        }
+
+    # -- replaying
+
+    def start(self, deliver: Deliver, ready: Callable[[], bool]) -> None:
+        """Start the background replayer (call from the running event loop)"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._replay_loop(deliver, ready))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            await self._run(self._release_lease)
+            await self._run(self._close)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _replay_loop(self, deliver: Deliver, ready: Callable[[], bool]) -> None:
+        while True:
+            try:
+                delay = await self.replay(deliver, ready)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Journal replay failed")
+                delay = self.poll_interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def replay(self, deliver: Deliver, ready: Callable[[], bool]) -> float:
+        """Send due entries in order while this worker holds the lease; returns seconds until the next try"""
+        while True:
+            if not ready() or not await self._run(self._acquire_lease):
+                return self.poll_interval
+            entry = await self._run(self._head)
+            if entry is None:
+                await self._run(self._prune)
+                return self.poll_interval
+            if isinstance(entry, float):
+                return entry
+            try:
+                status_code, error = await deliver(entry)
+            except Exception as e:
+                status_code, error = 0, f"{type(e).__name__}: {e}"
+            if 200 <= status_code < 300:
+                await self._run(self._complete, entry, DELIVERED, status_code, None)
+                self.delivered += 1
+            elif 400 <= status_code < 500 and status_code not in RETRYABLE_CLIENT_ERRORS:
+                await self._run(self._complete, entry, FAILED, status_code, error)
+                self.failed += 1
+                logger.warning(f"Journal entry {entry.id} rejected by Laravel ({status_code}): {error}")
+            elif entry.attempts + 1 >= self.max_attempts:
+                await self._run(self._complete, entry, FAILED, status_code or None,
+                                f"Gave up after {entry.attempts + 1} attempts: {error}")
+                self.failed += 1
+                logger.error(f"Journal entry {entry.id} failed {entry.attempts + 1} times, giving up: {error}")
+            else:
+                # The entry waits alone; other submitters' entries go on
+                delay = min(self.max_backoff, self.backoff * 2 ** entry.attempts)
+                await self._run(self._retry_later, entry, status_code or None, error, delay)
+                self.retries += 1
+
+    def _acquire_lease(self) -> bool:
+        db = self._db()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT INTO lease (id, owner, expires_at) VALUES (1, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE lease.owner = excluded.owner OR lease.expires_at < ?",
+                (self.owner, now + self.lease_seconds, now))
+            owner = db.execute("SELECT owner FROM lease WHERE id = 1").fetchone()[0]
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return owner == self.owner
+
+    def _release_lease(self) -> None:
+        self._db().execute("DELETE FROM lease WHERE id = 1 AND owner = ?", (self.owner,))
+
+    def _head(self) -> "Optional[JournalEntry | float]":
+        """The oldest due entry that is first in its submitter's queue, or the seconds until one is due"""
+        db = self._db()
+        now = time.time()
+        # Only the oldest pending entry of each submitter may be sent
+        heads = ("FROM entries e WHERE e.status = ? AND NOT EXISTS ("
+                 "SELECT 1 FROM entries p WHERE p.submitter = e.submitter AND p.status = ? AND p.seq < e.seq)")
+        row = db.execute(
+            "SELECT e.seq, e.id, e.created_at, e.method, e.path, e.query, e.headers, e.body, e.attempts, e.submitter "
+            f"{heads} AND e.next_attempt_at <= ? ORDER BY e.seq LIMIT 1", (PENDING, PENDING, now)).fetchone()
+        if row is None:
+            next_attempt_at = db.execute(f"SELECT MIN(e.next_attempt_at) {heads}", (PENDING, PENDING)).fetchone()[0]
+            return None if next_attempt_at is None else max(0.0, next_attempt_at - now)
+        seq, id, created_at, method, path, query, headers, body, attempts, submitter = row
+        return JournalEntry(
+            seq, id, created_at, method, path, query,
+            [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(headers)],
+            body, attempts, submitter,
+        )
+
+    def _complete(self, entry: JournalEntry, status: str, status_code: int, error: Optional[str]) -> None:
+        # The bearer token is not needed after the last attempt, so it is not kept for the retention
+        self._db().execute(
+            "UPDATE entries SET status = ?, attempts = attempts + 1, response_status = ?, last_error = ?, "
+            "completed_at = ?, headers = '[]' WHERE seq = ?", (status, status_code, error, time.time(), entry.seq))
+
+    def _retry_later(self, entry: JournalEntry, status_code: Optional[int], error: str, delay: float) -> None:
+        self._db().execute(
+            "UPDATE entries SET attempts = attempts + 1, response_status = ?, last_error = ?, "
+            "next_attempt_at = ? WHERE seq = ?", (status_code, error, time.time() + delay, entry.seq))
+
+    def _prune(self) -> None:
+        # Finished entries are kept for the status view until the retention has passed
+        now = time.time()
+        if now - self._pruned_at < 60:
+            return
+        self._pruned_at = now
+        self._db().execute("DELETE FROM entries WHERE status != ? AND completed_at < ?",
+                           (PENDING, now - self.retention))
+
+    # -- database access, serialised on one thread
+
+    async def _run(self, function: Callable[..., Any], *args: Any) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5.0)
+            # WAL with synchronous=FULL: every commit is fsynced before it is acknowledged
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.executescript(_SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(entries)")}
+            for name, definition in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    connection.execute(f"ALTER TABLE entries ADD COLUMN {name} {definition}")
+            connection.executescript(_INDEXES)
+            self._connection = connection
+        return self._connection
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,388 @@
+"""
+Prometheus metrics for the proxy, without extra dependencies
+Counters, gauges and histograms with labels, rendered in the Prometheus
+text exposition format (version 0.0.4). Collectors can add samples that are
+computed at scrape time, e.g. cache and pool statistics.
+
+Every supervisor worker counts for itself. A MetricsSpool shares the
+workers' samples through a directory, so whichever worker answers a scrape
+reports all of them, each with a `worker` label; without it counters would
+seem to jump between the values of different workers.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("sportteams.proxy.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608, 33554432)
+
+# Methods reported as themselves; anything else a client sends is "OTHER",
+# so arbitrary method names cannot grow the label set
+METHOD_LABELS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+# (labels, value) pairs produced by a collector for one metric family
+Samples = List[Tuple[Dict[str, Any], float]]
+
+# (name, type, help, [(sample name, labels, value), ...]) of one metric family
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, Any], float]]]
+
+
+def method_label(method: str) -> str:
+    """The request method as a bounded metric label"""
+    return method if method in METHOD_LABELS else "OTHER"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    """A metric family with a fixed set of label names"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any, **kwargs: Any):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        return self.labels() if not self.labelnames else None
+
+    def collect(self) -> Family:
+        samples = []
+        for key, child in sorted(self._children.items()):
+            samples.extend(self._child_samples(dict(zip(self.labelnames, key)), child))
+        return self.name, self.type, self.documentation, samples
+
+    def _child_samples(self, labels: Dict[str, Any], child) -> List[Tuple[str, Dict[str, Any], float]]:
+        return [(self.name, labels, child.value)]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bucket) for bucket in buckets)) + (math.inf,)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def _child_samples(self, labels: Dict[str, Any], child) -> List[Tuple[str, Dict[str, Any], float]]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(child.bounds, child.counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        samples.append((f"{self.name}_sum", labels, child.sum))
+        samples.append((f"{self.name}_count", labels, child.count))
+        return samples
+
+
+class Registry:
+    """Holds metric families and scrape-time collectors"""
+
+    def __init__(self, namespace: str = ""):
+        self.namespace = namespace
+        # Added to every sample, e.g. {"worker": "2"}
+        self.const_labels: Dict[str, str] = {}
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self._name(name), documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self._name(name), documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self._name(name), documentation, labelnames, buckets))
+
+    def collector(self, collect: Callable[[], Iterable[Tuple[str, str, str, Samples]]]):
+        """Register fn() -> [(name, type, help, [(labels, value), ...]), ...]; usable as decorator"""
+        self._collectors.append(collect)
+        return collect
+
+    def collect(self) -> List[Family]:
+        families = [metric.collect() for metric in self._metrics]
+        for collect in self._collectors:
+            for name, metric_type, documentation, samples in collect():
+                full_name = self._name(name)
+                families.append((full_name, metric_type, documentation,
+                                 [(full_name, labels, float(value)) for labels, value in samples]))
+        if self.const_labels:
+            families = [
+                (name, metric_type, documentation,
+                 [(sample, {**self.const_labels, **labels}, value) for sample, labels, value in samples])
+                for name, metric_type, documentation, samples in families
+            ]
+        return families
+
+    def render(self) -> str:
+        return render_families(self.collect())
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+class ProxyMetrics:
+    """The metric families recorded for every proxied request"""
+
+    def __init__(self, registry: Registry):
+        self.registry = registry
+        labels = ("method", "route")
+        self.requests = registry.counter(
+            "requests_total", "Proxied requests by method, route template and status code",
+            labels + ("status",))
+        self.duration = registry.histogram(
+            "request_duration_seconds", "Time until the response headers were ready", labels)
+        self.upstream_duration = registry.histogram(
+            "upstream_duration_seconds", "Time spent waiting for the Laravel upstream", labels)
+        self.overhead = registry.histogram(
+            "overhead_seconds", "Time spent in the proxy itself (total minus upstream wait)", labels)
+        self.in_flight = registry.gauge(
+            "in_flight_requests", "Requests currently being proxied")
+        self.request_size = registry.histogram(
+            "request_size_bytes", "Request body size", labels, buckets=SIZE_BUCKETS)
+        self.response_size = registry.histogram(
+            "response_size_bytes", "Response body size sent to the client", labels, buckets=SIZE_BUCKETS)
+
+    def observe(self, method: str, route: str, status: int, duration: float, upstream: float,
+                request_bytes: int) -> None:
+        """Record everything known when the response headers are ready"""
+        self.requests.labels(method, route, status).inc()
+        self.duration.labels(method, route).observe(duration)
+        if upstream:
+            self.upstream_duration.labels(method, route).observe(upstream)
+        self.overhead.labels(method, route).observe(max(0.0, duration - upstream))
+        self.request_size.labels(method, route).observe(request_bytes)
+
+
+def render_families(families: Iterable[Family]) -> str:
+    """Text exposition of metric families; families with the same name are merged"""
+    merged: Dict[str, Family] = {}
+    for name, metric_type, documentation, samples in families:
+        if name in merged:
+            merged[name][3].extend(samples)
+        else:
+            merged[name] = (name, metric_type, documentation, list(samples))
+    lines: List[str] = []
+    for name, metric_type, documentation, samples in merged.values():
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for sample, labels, value in samples:
+            lines.append(f"{sample}{_format_labels(labels)} {_format_value(float(value))}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsSpool:
+    """Share one worker's samples with the other workers through a directory
+
+    Each worker writes its samples to `directory/<pid>.json` every `interval`
+    seconds and removes the file when it stops; render() reports the live
+    samples of this worker plus the last written ones of every other worker
+    that is still running.
+    """
+
+    def __init__(self, registry: Registry, directory: str, worker: str, interval: float = 1.0):
+        self.registry = registry
+        self.directory = directory
+        self.worker = worker
+        self.interval = interval
+        self.path = os.path.join(directory, f"{os.getpid()}.json")
+        self.started_at = time.time()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self) -> None:
+        """Label this worker's samples and start writing them (call from the running event loop)"""
+        self.registry.const_labels["worker"] = self.worker
+        os.makedirs(self.directory, exist_ok=True)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._write_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def _write_loop(self) -> None:
+        while True:
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {self.path}: {e}")
+            await asyncio.sleep(self.interval)
+
+    def write(self) -> None:
+        snapshot = {"worker": self.worker, "pid": os.getpid(), "started_at": self.started_at,
+                    "families": self.registry.collect()}
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(temporary, self.path)
+
+    def render(self) -> str:
+        families = self.registry.collect()
+        # A worker being replaced and its replacement share a worker ID; the newer one is reported
+        others: Dict[str, Dict[str, Any]] = {}
+        for snapshot in self._read_others():
+            worker = snapshot["worker"]
+            if worker != self.worker and snapshot["started_at"] > others.get(worker, {}).get("started_at", 0):
+                others[worker] = snapshot
+        for snapshot in others.values():
+            families.extend(tuple(family) for family in snapshot["families"])
+        return render_families(families)
+
+    def _read_others(self) -> Iterable[Dict[str, Any]]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith(".json") or name == os.path.basename(self.path):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if _running(snapshot.get("pid")):
+                yield snapshot
+            else:
+                # Left behind by a worker that was killed
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _running(pid: Any) -> bool:
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,234 @@
+"""
+Shared upstream HTTP client for the Laravel proxy
+One pooled httpx.AsyncClient lives for the whole lifetime of the app, so
+proxied requests reuse warm keep-alive connections instead of paying for a
+new TCP connect and a new pool on every call. Requests are spread over one
+or more Laravel upstreams by a TargetGroup.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Union
+
+import httpx
+
+from .balancer import Balancer, Target, TargetGroup
+from .breaker import CircuitBreaker
+from .retry import RetryPolicy
+
+# Responses that mean the upstream itself is unhealthy, not the request
+UNHEALTHY_STATUS_CODES = frozenset({502, 503, 504})
+
+
+class BufferedResponse(NamedTuple):
+    """An upstream response read completely into memory (raw, still encoded bytes)"""
+    status_code: int
+    headers: httpx.Headers
+    body: bytes
+
+
+class UpstreamPool:
+    """Long-lived, tuned httpx client shared by every proxied request"""
+
+    def __init__(
+        self,
+        base_urls: Union[str, Iterable[str]],
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
+        keepalive_expiry: float = 30.0,
+        max_connections_per_host: Optional[int] = None,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        pool_timeout: float = 10.0,
+        balancer: Optional[Balancer] = None,
+        eject_after_failures: int = 5,
+        eject_seconds: float = 10.0,
+        breaker_factory: Optional[Callable[[], CircuitBreaker]] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        if isinstance(base_urls, str):
+            base_urls = [base_urls]
+        self.targets = TargetGroup(
+            base_urls,
+            balancer=balancer,
+            eject_after_failures=eject_after_failures,
+            eject_seconds=eject_seconds,
+            breaker_factory=breaker_factory,
+        )
+        self.retry_policy = retry_policy
+        # Requests are built against the primary upstream and retargeted on send
+        self.base_url = self.targets.primary.base_url
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # Each upstream host gets its own mounted transport, which gives it an
+        # independent connection pool capped at the per-host limit
+        per_host = max_connections_per_host or max_connections
+        self.host_limits = httpx.Limits(
+            max_connections=per_host,
+            max_keepalive_connections=(
+                min(per_host, max_keepalive_connections)
+                if per_host and max_keepalive_connections else max_keepalive_connections
+            ),
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout, pool=pool_timeout)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._transports: Dict[str, httpx.AsyncHTTPTransport] = {}
+        self.started_at: Optional[float] = None
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("Upstream pool is not started")
+        return self._client
+
+    def url_for(self, path: str, query: str = "") -> str:
+        """Build the upstream URL for a proxied path"""
+        url = f"{self.base_url}{path}"
+        return f"{url}?{query}" if query else url
+
+    async def start(self) -> None:
+        """Open the shared client (called on app startup)"""
+        if self._client is not None:
+            return
+        self._transports = {
+            target.origin: httpx.AsyncHTTPTransport(limits=self.host_limits)
+            for target in self.targets.targets
+        }
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=self.limits,
+            mounts={f"{origin}/": transport for origin, transport in self._transports.items()},
+        )
+        self.started_at = time.time()
+
+    async def close(self) -> None:
+        """Close the shared client and every pooled connection (called on shutdown)"""
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+        self._transports = {}
+
+    def target_of(self, request: httpx.Request) -> Optional[Target]:
+        """The upstream a request is currently pointed at"""
+        url = str(request.url)
+        for target in self.targets.targets:
+            if url.startswith(target.base_url):
+                return target
+        return None
+
+    def retarget(self, request: httpx.Request, target: Target) -> None:
+        """Point a request built with url_for at another upstream"""
+        url = str(request.url)
+        for current in self.targets.targets:
+            if url.startswith(current.base_url):
+                if current is not target:
+                    request.url = httpx.URL(target.base_url + url[len(current.base_url):])
+                    request.headers["host"] = request.url.netloc.decode("ascii")
+                return
+
+    async def send(self, request: httpx.Request, stream: bool = False,
+                   route: Optional[str] = None) -> httpx.Response:
+        """Send a request, with retries and hedging for idempotent requests
+
+        `route` is the route template used for retry budgets and hedge delays.
+        """
+        if self.retry_policy is not None and self.retry_policy.applies(request):
+            return await self.retry_policy.send(self, request, route, stream)
+        return await self.send_once(request, stream=stream)
+
+    async def send_once(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        """Send a request through the shared pool to the target chosen by the balancer
+
+        Connection failures are retried on another target, because the request
+        never reached an upstream; anything else is returned or raised as-is.
+        Raises CircuitOpenError when every upstream circuit is open.
+        """
+        tried = []
+        while True:
+            target = self.targets.choose(exclude=tried)
+            if target is None and tried:
+                raise last_error
+            tried.append(target)
+            try:
+                return await self.send_to(target, request, stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as error:
+                last_error = error
+
+    async def send_to(self, target: Target, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        """Send a request to one specific upstream target"""
+        self.retarget(request, target)
+        self.requests_total += 1
+        self.in_flight += 1
+        target.begin()
+        started = time.monotonic()
+        ok = False
+        cancelled = False
+        try:
+            response = await self.client.send(request, stream=stream, follow_redirects=True)
+            ok = response.status_code not in UNHEALTHY_STATUS_CODES
+            return response
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except httpx.HTTPError:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            if cancelled:
+                target.cancel()
+            else:
+                self.targets.record(target, time.monotonic() - started, ok)
+
+    async def fetch(self, request: httpx.Request, route: Optional[str] = None) -> BufferedResponse:
+        """Send a request and read the raw body completely"""
+        response = await self.send(request, stream=True, route=route)
+        try:
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        return BufferedResponse(response.status_code, response.headers, body)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the pool for the stats endpoint"""
+        hosts = {}
+        for origin, transport in self._transports.items():
+            hosts[origin] = self._transport_stats(transport)
+        return {
+            "started": self._client is not None,
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.started_at else 0,
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "in_flight": self.in_flight,
+            "limits": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry,
+                "max_connections_per_host": self.host_limits.max_connections,
+            },
+            "hosts": hosts,
+            "upstreams": self.targets.stats(),
+            "retries": self.retry_policy.stats() if self.retry_policy is not None else None,
+        }
+
+    @staticmethod
+    def _transport_stats(transport: httpx.AsyncHTTPTransport) -> Dict[str, int]:
+        # httpx does not expose pool state publicly; read the httpcore pool defensively
+        pool = getattr(transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for conn in connections if conn.is_idle())
+        closed = sum(1 for conn in connections if conn.is_closed())
+        return {
+            "connections": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle - closed,
+            "pending_requests": len(getattr(pool, "_requests", []) or []),
+        }
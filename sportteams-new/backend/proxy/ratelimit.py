@@ -0,0 +1,159 @@
+"""
+In-process token-bucket rate limiting per client IP and path
+Same limits as SecurityMiddleware::enforceRateLimit is meant to apply
+(login 5/min, refresh 10/min, 30/min by default). Laravel itself only ever
+applied the default, to the routes of its `security` group: its per-path
+table never matched, since path() has no leading slash, and login and
+refresh are outside the group. The proxy enforces the login and refresh
+limits against password guessing; routes in `exempt` are not limited.
+
+Limits are enforced in memory and atomically within the event loop, before
+the request reaches Laravel. Every bucket holds `limit` tokens and refills
+at limit/period tokens per second. Buckets are per worker process, so with
+N supervisor workers a client can get up to N times the limit.
+
+Behind a load balancer or ingress every request comes from the same peer;
+`client_address` then takes the client from X-Forwarded-For.
+"""
+
+import ipaddress
+import math
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from .routes import RouteTable
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed on (client, path)"""
+
+    def __init__(self, limits: Optional[RouteTable] = None, default_limit: int = 30,
+                 period: float = 60.0, max_keys: int = 100000, exempt: Iterable[str] = ()):
+        self.limits = limits or RouteTable()
+        self.exempt = RouteTable((template, True) for template in exempt)
+        self.default_limit = default_limit
+        self.period = period
+        self.max_keys = max_keys
+        # (client, path) -> [tokens, last refill time]
+        self._buckets: Dict[Tuple[str, str], list] = {}
+        self._checks_since_sweep = 0
+        self.allowed = 0
+        self.limited = 0
+
+    def applies_to(self, path: str) -> bool:
+        return self.exempt.match(path) is None
+
+    def limit_for(self, path: str) -> int:
+        route = self.limits.match(path)
+        return int(route.value) if route is not None else self.default_limit
+
+    def check(self, client: str, path: str, now: Optional[float] = None) -> RateLimitResult:
+        """Take one token for this client and path"""
+        now = now if now is not None else time.monotonic()
+        limit = self.limit_for(path)
+        rate = limit / self.period
+        key = (client, path)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._maybe_sweep(now)
+            bucket = self._buckets[key] = [float(limit), now]
+        else:
+            bucket[0] = min(float(limit), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            self.allowed += 1
+            return RateLimitResult(True, limit, int(bucket[0]), 0.0)
+        self.limited += 1
+        retry_after = (1.0 - bucket[0]) / rate if rate > 0 else self.period
+        return RateLimitResult(False, limit, 0, retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buckets": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "default_limit": self.default_limit,
+            "period_seconds": self.period,
+            "limits": {template: self.limits.match(template).value for template in self.limits.templates()},
+            "exempt": self.exempt.templates(),
+            "scope": "per worker",
+        }
+
+    def _maybe_sweep(self, now: float) -> None:
+        # Full buckets behave exactly like missing ones, so they can be dropped
+        self._checks_since_sweep += 1
+        if len(self._buckets) < self.max_keys and self._checks_since_sweep < 10000:
+            return
+        self._checks_since_sweep = 0
+        for key, (tokens, updated) in list(self._buckets.items()):
+            limit = self.limit_for(key[1])
+            if tokens + (now - updated) * limit / self.period >= limit:
+                del self._buckets[key]
+        # Still too many active clients: drop the ones seen longest ago
+        if len(self._buckets) >= self.max_keys:
+            oldest = sorted(self._buckets.items(), key=lambda item: item[1][1])
+            for key, _ in oldest[:len(self._buckets) - self.max_keys + 1]:
+                del self._buckets[key]
+
+
+def parse_networks(specs: Iterable[str]) -> List[Network]:
+    """Networks from "10.0.0.0/8"-style strings; a bare address is a /32 or /128"""
+    return [ipaddress.ip_network(spec.strip(), strict=False) for spec in specs if spec.strip()]
+
+
+def client_address(peer: Optional[str], forwarded_for: str, trusted: List[Network],
+                   trust_all: bool = False) -> str:
+    """The client a request came from
+
+    When the peer is a trusted proxy, X-Forwarded-For is walked from the
+    right, since each proxy appends the address it saw, and the first
+    address that is not itself a trusted proxy is the client. Addresses
+    further left were sent by the client and may be forged. With
+    `trust_all` every peer is trusted and the leftmost address is used.
+    """
+    if not peer:
+        return "unknown"
+    if not forwarded_for:
+        return peer
+    if trust_all:
+        return forwarded_for.split(",")[0].strip() or peer
+    if not _is_trusted(peer, trusted):
+        return peer
+    for address in reversed(forwarded_for.split(",")):
+        address = address.strip()
+        if not _is_address(address):
+            break
+        if not _is_trusted(address, trusted):
+            return address
+    return peer
+
+
+def _is_address(address: str) -> bool:
+    try:
+        ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_trusted(address: str, trusted: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After is a whole number of seconds"""
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,286 @@
+"""
+Retry and hedging policy for idempotent upstream requests
+A failed attempt (transport error or 502/503/504) is retried after a full
+jitter backoff. With hedging enabled, a second copy of a slow request goes to
+another upstream once the first has been pending for the route's recent p95
+latency. The first usable reply wins and the other is cancelled.
+
+Laravel accepts an access token only once a minute
+(TokenService::performSecurityChecks, also for the proxy's signed claims),
+so a second copy of a request with an Authorization header is answered 401
+"Token reuse detected" once the first copy got through. Such requests are
+therefore only retried after errors that prove the first copy never reached
+Laravel (connect errors and pool timeouts) and are never hedged, unless
+`authenticated` is set for a backend without that check. When copies race,
+a 401 only wins if no other copy answers.
+
+Every extra attempt, whether a retry or a hedge, is paid from a per-route
+retry budget. Each original request deposits `budget_ratio` tokens and a
+trickle of `budget_min_per_second` keeps low-traffic routes retryable. When
+Laravel is overloaded, retries therefore add at most about budget_ratio
+extra load instead of multiplying it.
+"""
+
+import asyncio
+import random
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+import httpx
+
+from .breaker import CircuitOpenError
+
+if TYPE_CHECKING:
+    from .pool import UpstreamPool
+
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+# The request was never sent, so not even its token was used
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RetryBudget:
+    """Token bucket of extra attempts for one route"""
+
+    __slots__ = ("ratio", "min_per_second", "capacity", "balance", "updated_at", "exhausted")
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, capacity: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self.balance = capacity
+        self.updated_at = time.monotonic()
+        self.exhausted = 0
+
+    def deposit(self) -> None:
+        """Called once per original request"""
+        self._refill()
+        self.balance = min(self.capacity, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take one token for a retry or hedge; False when the budget is spent"""
+        self._refill()
+        if self.balance < 1.0:
+            self.exhausted += 1
+            return False
+        self.balance -= 1.0
+        return True
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.balance = min(self.capacity, self.balance + (now - self.updated_at) * self.min_per_second)
+        self.updated_at = now
+
+
+class LatencyWindow:
+    """Recent upstream latencies of one route, for the hedge delay"""
+
+    __slots__ = ("samples", "size", "index", "count", "_quantiles")
+
+    def __init__(self, size: int = 256):
+        self.samples: List[float] = []
+        self.size = size
+        self.index = 0
+        self.count = 0
+        self._quantiles: Dict[float, float] = {}
+
+    def add(self, latency: float) -> None:
+        if len(self.samples) < self.size:
+            self.samples.append(latency)
+        else:
+            self.samples[self.index] = latency
+            self.index = (self.index + 1) % self.size
+        self.count += 1
+        # Sorting is amortised over 32 samples
+        if self.count % 32 == 0:
+            self._quantiles.clear()
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        value = self._quantiles.get(q)
+        if value is None:
+            ordered = sorted(self.samples)
+            value = ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            self._quantiles[q] = value
+        return value
+
+
+class RetryPolicy:
+    """Retries with backoff and optional hedging, bounded by per-route budgets"""
+
+    def __init__(self, methods: Iterable[str] = ("GET", "HEAD", "OPTIONS"), max_attempts: int = 2,
+                 backoff: float = 0.05, max_backoff: float = 1.0,
+                 retry_status_codes: Iterable[int] = RETRY_STATUS_CODES,
+                 budget_ratio: float = 0.1, budget_min_per_second: float = 1.0,
+                 hedge: bool = False, hedge_quantile: float = 0.95, hedge_min_delay: float = 0.02,
+                 hedge_min_samples: int = 20, authenticated: bool = False,
+                 rng: Optional[random.Random] = None):
+        self.methods = frozenset(method.upper() for method in methods)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_status_codes = frozenset(retry_status_codes)
+        self.budget_ratio = budget_ratio
+        self.budget_min_per_second = budget_min_per_second
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.authenticated = authenticated
+        self._random = rng or random.Random()
+        self._budgets: Dict[Optional[str], RetryBudget] = {}
+        self._latencies: Dict[Optional[str], LatencyWindow] = {}
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def applies(self, request: httpx.Request) -> bool:
+        """Only idempotent methods with a replayable body are retried"""
+        return request.method in self.methods and isinstance(request.stream, httpx.ByteStream)
+
+    def replayable(self, request: httpx.Request) -> bool:
+        """False when a second copy would reuse a bearer token that Laravel accepts only once"""
+        return self.authenticated or "authorization" not in request.headers
+
+    def budget(self, route: Optional[str]) -> RetryBudget:
+        budget = self._budgets.get(route)
+        if budget is None:
+            budget = self._budgets[route] = RetryBudget(self.budget_ratio, self.budget_min_per_second)
+        return budget
+
+    def hedge_delay(self, route: Optional[str]) -> Optional[float]:
+        """The route's recent p95, once there are enough samples to trust it"""
+        window = self._latencies.get(route)
+        if window is None or window.count < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, window.quantile(self.hedge_quantile))
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full jitter: uniform between 0 and the exponential backoff for this attempt"""
+        return self._random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    async def send(self, pool: "UpstreamPool", request: httpx.Request, route: Optional[str],
+                   stream: bool) -> httpx.Response:
+        budget = self.budget(route)
+        budget.deposit()
+        attempt = 1
+        while True:
+            started = time.monotonic()
+            try:
+                response = await self._attempt(pool, request, route, stream, budget)
+            except httpx.TransportError as e:
+                if (attempt >= self.max_attempts or not (isinstance(e, UNSENT_ERRORS) or self.replayable(request))
+                        or not budget.withdraw()):
+                    raise
+            else:
+                if (response.status_code not in self.retry_status_codes or attempt >= self.max_attempts
+                        or not self.replayable(request) or not budget.withdraw()):
+                    self._latency(route).add(time.monotonic() - started)
+                    return response
+                await response.aclose()
+            self.retries += 1
+            await asyncio.sleep(self.backoff_delay(attempt))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "methods": sorted(self.methods),
+            "max_attempts": self.max_attempts,
+            "retries": self.retries,
+            "hedging": self.hedge,
+            "authenticated": self.authenticated,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "routes": {
+                route or "unmatched": {
+                    "budget": round(budget.balance, 2),
+                    "budget_exhausted": budget.exhausted,
+                    "hedge_delay_ms": round(delay * 1000, 2) if (delay := self.hedge_delay(route)) else None,
+                }
+                for route, budget in self._budgets.items()
+            },
+        }
+
+    @property
+    def budget_exhausted(self) -> int:
+        return sum(budget.exhausted for budget in self._budgets.values())
+
+    def _latency(self, route: Optional[str]) -> LatencyWindow:
+        window = self._latencies.get(route)
+        if window is None:
+            window = self._latencies[route] = LatencyWindow()
+        return window
+
+    async def _attempt(self, pool: "UpstreamPool", request: httpx.Request, route: Optional[str],
+                       stream: bool, budget: RetryBudget) -> httpx.Response:
+        hedge = self.hedge and len(pool.targets.targets) > 1 and self.replayable(request)
+        delay = self.hedge_delay(route) if hedge else None
+        if delay is None:
+            return await pool.send_once(request, stream=stream)
+
+        primary = asyncio.ensure_future(pool.send_once(request, stream=stream))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            return primary.result()
+
+        # Still pending at p95: hedge on another upstream if the budget allows
+        first_target = pool.target_of(request)
+        try:
+            target = pool.targets.choose(exclude=[first_target] if first_target else [])
+        except CircuitOpenError:
+            target = None
+        if target is None or not budget.withdraw():
+            if target is not None and target.breaker is not None:
+                target.breaker.release()
+            return await primary
+        self.hedges += 1
+        hedged = httpx.Request(request.method, request.url, headers=request.headers.copy(), stream=request.stream)
+        secondary = asyncio.ensure_future(pool.send_to(target, hedged, stream=stream))
+        response = await _first_success([primary, secondary])
+        if secondary.done() and not secondary.cancelled() and secondary.exception() is None \
+                and secondary.result() is response:
+            self.hedge_wins += 1
+        return response
+
+
+async def _first_success(tasks: List["asyncio.Future[httpx.Response]"]) -> httpx.Response:
+    """First response without an exception; the other tasks are cancelled or closed
+
+    A 401 can be the second copy of a token Laravel already accepted, so it
+    is only returned when no other copy answers.
+    """
+    pending = set(tasks)
+    winner: Optional[httpx.Response] = None
+    unauthorized: Optional[httpx.Response] = None
+    error: Optional[BaseException] = None
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = error or task.exception()
+                elif winner is None and task.result().status_code != 401:
+                    winner = task.result()
+                elif winner is None and unauthorized is None:
+                    unauthorized = task.result()
+                else:
+                    await task.result().aclose()
+    finally:
+        for task in pending:
+            task.cancel()
+        # A task can finish between the last wait and its cancellation
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, httpx.Response):
+                await result.aclose()
+    if winner is None:
+        if unauthorized is not None:
+            return unauthorized
+        raise error
+    if unauthorized is not None:
+        await unauthorized.aclose()
+    return winner
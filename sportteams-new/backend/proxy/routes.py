@@ -0,0 +1,102 @@
+"""
+Route templates for per-route proxy policies
+Templates use the Laravel style placeholders from routes/api.php, e.g.
+/api/v1/forms/templates/{id}, and each one carries a policy value such as a
+cache TTL. Matching a request path returns the template, so it can also be
+used as a bounded label for metrics.
+"""
+
+import re
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+# The Laravel routes from routes/api.php, used to normalise paths into
+# bounded metric labels
+API_ROUTES = [
+    "/api/user",
+    "/api/v1/test",
+    "/api/v1/auth/login",
+    "/api/v1/auth/refresh",
+    "/api/v1/auth/me",
+    "/api/v1/auth/logout",
+    "/api/v1/team-admin/teams",
+    "/api/v1/team-admin/teams/{id}/players",
+    "/api/v1/team-admin/promote-to-player",
+    "/api/v1/team-admin/players",
+    "/api/v1/team-admin/players/{id}",
+    "/api/v1/team-admin/audit-log",
+    "/api/v1/forms/templates",
+    "/api/v1/forms/templates/{id}",
+    "/api/v1/forms/templates/{id}/toggle-active",
+    "/api/v1/forms/statistics",
+    "/api/v1/forms/active",
+    "/api/v1/forms/responses",
+    "/api/v1/forms/responses/export",
+    "/api/v1/forms/responses/{id}",
+]
+
+
+class RouteMatch(NamedTuple):
+    template: str
+    value: Any
+    params: Dict[str, str]
+
+
+def compile_template(template: str) -> "re.Pattern[str]":
+    """Turn /teams/{id}/players into a regex with one named group per placeholder"""
+    pattern = ""
+    position = 0
+    for placeholder in _PLACEHOLDER.finditer(template):
+        pattern += re.escape(template[position:placeholder.start()])
+        pattern += f"(?P<{placeholder.group(1)}>[^/]+)"
+        position = placeholder.end()
+    pattern += re.escape(template[position:])
+    return re.compile(f"^{pattern}/?$")
+
+
+class RouteTable:
+    """Ordered list of route templates, the first matching template wins"""
+
+    def __init__(self, routes: Iterable[Tuple[str, Any]] = ()):
+        self._routes: List[Tuple[str, "re.Pattern[str]", Any]] = []
+        self._exact: Dict[str, Tuple[str, Any]] = {}
+        for template, value in routes:
+            self.add(template, value)
+
+    def add(self, template: str, value: Any) -> None:
+        if _PLACEHOLDER.search(template):
+            self._routes.append((template, compile_template(template), value))
+        else:
+            self._exact.setdefault(template.rstrip("/") or "/", (template, value))
+
+    def match(self, path: str) -> Optional[RouteMatch]:
+        exact = self._exact.get(path.rstrip("/") or "/")
+        if exact is not None:
+            return RouteMatch(exact[0], exact[1], {})
+        for template, pattern, value in self._routes:
+            found = pattern.match(path)
+            if found:
+                return RouteMatch(template, value, found.groupdict())
+        return None
+
+    def templates(self) -> List[str]:
+        return [template for template, _ in self._exact.values()] + [
+            template for template, _, _ in self._routes
+        ]
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._routes)
+
+    @classmethod
+    def parse(cls, spec: str, cast: Callable[[str], Any] = float) -> "RouteTable":
+        """Build a table from "template=value,template=value" (the env var format)"""
+        table = cls()
+        for item in spec.split(","):
+            if "=" not in item:
+                continue
+            template, value = item.rsplit("=", 1)
+            template = template.strip()
+            if template:
+                table.add(template, cast(value.strip()))
+        return table
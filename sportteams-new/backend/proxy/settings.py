@@ -0,0 +1,62 @@
+"""
+Environment helpers for the proxy configuration
+Every tunable of the proxy is read from an environment variable so the same
+server.py can run in the preview, on a dev box and in production.
+"""
+
+import os
+from typing import List, Optional
+
+
+def env_str(name: str, default: str) -> str:
+    """Read a string setting, falling back to the default when unset or empty"""
+    value = os.environ.get(name)
+    return value if value else default
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting"""
+    value = os.environ.get(name)
+    try:
+        return int(value) if value else default
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting"""
+    value = os.environ.get(name)
+    try:
+        return float(value) if value else default
+    except ValueError:
+        return default
+
+
+def env_optional_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    """Read an integer setting where 0 or "none" means unlimited"""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    if value.lower() in ("none", "unlimited"):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        return default
+    return number if number > 0 else None
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting (1/true/yes/on)"""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_list(name: str, default: List[str]) -> List[str]:
+    """Read a comma separated list setting"""
+    value = os.environ.get(name)
+    if not value:
+        return list(default)
+    return [item.strip() for item in value.split(",") if item.strip()]
@@ -0,0 +1,214 @@
+"""
+Static hosting of the built React frontend (frontend/dist)
+The files are indexed in memory when the proxy starts, so a request costs
+one dict lookup and no filesystem calls before the file is sent. Files are
+sent with FileResponse, which uses the ASGI `pathsend` extension, and so
+sendfile, where the server offers it.
+
+Precompressed `.br` and `.gz` siblings are served in place of the original
+when the client accepts them. They can be written by `precompress` (or
+`python -m proxy.static <dist>`) after `vite build`. Hashed build assets
+(`assets/index-3f9a1c2b.js`) are cached as immutable for a year; everything
+else, index.html in particular, is revalidated with its ETag.
+
+Paths without a file extension that match no file get index.html, so client
+side routes such as /forms/12 can be reloaded.
+"""
+
+import gzip
+import mimetypes
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from .compression import DEFAULT_CONTENT_TYPES, brotli, negotiate
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Vite's default asset names: <name>-<8 character base64url hash>.<ext>
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+# Sibling suffix per content coding, in order of preference
+ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("application/javascript", ".mjs")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+mimetypes.add_type("image/svg+xml", ".svg")
+mimetypes.add_type("font/woff2", ".woff2")
+
+
+class StaticFile:
+    """One indexed file and its precompressed variants"""
+
+    __slots__ = ("path", "stat", "media_type", "cache_control", "etag", "variants")
+
+    def __init__(self, path: str, stat: os.stat_result, media_type: str, cache_control: str):
+        self.path = path
+        self.stat = stat
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        # coding -> (path, stat) of a sibling at least as new as the file
+        self.variants: Dict[str, Tuple[str, os.stat_result]] = {}
+
+
+class StaticSite:
+    """ASGI app serving a directory from an in-memory index"""
+
+    def __init__(self, root: str, index: str = "index.html", spa_fallback: bool = True,
+                 assets_prefix: str = "/assets/"):
+        self.root = os.path.abspath(root)
+        self.index_name = index
+        self.spa_fallback = spa_fallback
+        self.assets_prefix = assets_prefix
+        self.files: Dict[str, StaticFile] = {}
+        self.served: Dict[str, int] = {"identity": 0, "br": 0, "gzip": 0}
+        self.not_modified = 0
+        self.fallbacks = 0
+        self.not_found = 0
+        self.scan()
+
+    def scan(self) -> None:
+        """(Re)build the index; call again after a new build was deployed"""
+        files: Dict[str, StaticFile] = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith((".br", ".gz")):
+                    continue
+                path = os.path.join(directory, name)
+                url = "/" + os.path.relpath(path, self.root).replace(os.sep, "/")
+                stat = os.stat(path)
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                immutable = url.startswith(self.assets_prefix) and HASHED_NAME.search(name) is not None
+                entry = StaticFile(path, stat, media_type,
+                                   IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL)
+                for coding, suffix in ENCODING_SUFFIXES:
+                    try:
+                        sibling = os.stat(path + suffix)
+                    except FileNotFoundError:
+                        continue
+                    if sibling.st_mtime_ns >= stat.st_mtime_ns:
+                        entry.variants[coding] = (path + suffix, sibling)
+                files[url] = entry
+        self.files = files
+
+    @property
+    def index(self) -> Optional[StaticFile]:
+        return self.files.get("/" + self.index_name)
+
+    def lookup(self, path: str) -> Optional[StaticFile]:
+        """The file for a request path, index.html for client-side routes"""
+        entry = self.files.get(path)
+        if entry is None and path.endswith("/"):
+            entry = self.files.get(path + self.index_name)
+        if entry is None and self.spa_fallback and "." not in path.rsplit("/", 1)[-1]:
+            entry = self.index
+            if entry is not None:
+                self.fallbacks += 1
+        return entry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = self.response(scope["method"], scope["path"], scope["headers"])
+        await response(scope, receive, send)
+
+    def response(self, method: str, path: str, headers: Iterable[Tuple[bytes, bytes]]) -> Response:
+        if method not in ("GET", "HEAD"):
+            return PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        entry = self.lookup(path)
+        if entry is None:
+            self.not_found += 1
+            return PlainTextResponse("Not Found", status_code=404)
+
+        accept_encoding = if_none_match = ""
+        for name, value in headers:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+            elif name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+
+        coding = negotiate(accept_encoding, [c for c, _ in ENCODING_SUFFIXES if c in entry.variants]) \
+            if entry.variants else None
+        etag = entry.etag if coding is None else f'{entry.etag[:-1]}-{coding}"'
+        response_headers = {"cache-control": entry.cache_control, "etag": etag}
+        if entry.variants:
+            response_headers["vary"] = "Accept-Encoding"
+
+        if if_none_match and (if_none_match.strip() == "*" or etag in _etags(if_none_match)):
+            self.not_modified += 1
+            return Response(status_code=304, headers=response_headers)
+
+        self.served[coding or "identity"] += 1
+        if coding is None:
+            return FileResponse(entry.path, headers=response_headers, media_type=entry.media_type,
+                                stat_result=entry.stat)
+        path, stat = entry.variants[coding]
+        response_headers["content-encoding"] = coding
+        return FileResponse(path, headers=response_headers, media_type=entry.media_type,
+                            stat_result=stat)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "files": len(self.files),
+            "precompressed": {
+                coding: sum(1 for entry in self.files.values() if coding in entry.variants)
+                for coding, _ in ENCODING_SUFFIXES
+            },
+            "immutable": sum(1 for entry in self.files.values() if entry.cache_control == IMMUTABLE_CACHE_CONTROL),
+            "served": dict(self.served),
+            "not_modified": self.not_modified,
+            "spa_fallbacks": self.fallbacks,
+            "not_found": self.not_found,
+        }
+
+
+def _etags(header: str) -> List[str]:
+    """Entity tags of an If-None-Match header, weak ones compared as strong"""
+    return [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def precompress(root: str, min_size: int = 1024, content_types: Iterable[str] = DEFAULT_CONTENT_TYPES,
+                gzip_level: int = 9, brotli_quality: int = 11) -> int:
+    """Write missing or stale .gz (and, with brotli installed, .br) siblings; returns files written"""
+    content_types = tuple(content_types)
+    written = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith((".br", ".gz")):
+                continue
+            media_type = mimetypes.guess_type(name)[0] or ""
+            path = os.path.join(directory, name)
+            stat = os.stat(path)
+            if stat.st_size < min_size or not media_type.startswith(content_types):
+                continue
+            with open(path, "rb") as source:
+                data = source.read()
+            encoders = [(".gz", lambda raw: gzip.compress(raw, gzip_level, mtime=0))]
+            if brotli is not None:
+                encoders.append((".br", lambda raw: brotli.compress(raw, quality=brotli_quality)))
+            for suffix, encode in encoders:
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime_ns >= stat.st_mtime_ns:
+                    continue
+                encoded = encode(data)
+                # A variant that saves nothing is not worth the extra header
+                if len(encoded) >= len(data):
+                    continue
+                # Atomic, since several workers may start at once
+                temporary = f"{target}.{os.getpid()}.tmp"
+                with open(temporary, "wb") as out:
+                    out.write(encoded)
+                os.replace(temporary, target)
+                written += 1
+    return written
+
+
+if __name__ == "__main__":
+    for directory in sys.argv[1:] or ["../frontend/dist"]:
+        print(f"{directory}: {precompress(directory)} precompressed files written")
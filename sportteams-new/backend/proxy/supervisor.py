@@ -0,0 +1,232 @@
+"""
+Pre-fork supervisor for running the proxy on every core
+The supervisor binds the listening socket once and forks worker processes
+that all accept on it. Each worker is a regular uvicorn server running the
+full app, lifespan included.
+
+Signals sent to the supervisor:
+  SIGHUP          rolling restart; a replacement worker must be serving
+                  before the worker it replaces is asked to drain
+  SIGTERM/SIGINT  graceful stop; workers finish in-flight requests (up to
+                  graceful_timeout seconds) and then exit
+
+Workers are forked from the app the supervisor loaded, so SIGHUP recycles
+them (fresh memory, new connections) but does not load new code or
+settings; deploying those takes a supervisor restart. Re-importing the app
+per worker would lose the state created before the fork that the workers
+share, such as the cache tag versions.
+
+A worker that exits on its own is replaced. Restarts back off while workers
+keep dying right after they start. Each worker finds its slot number
+(0..workers-1) in the PROXY_WORKER environment variable; a replacement
+takes over the slot of the worker it replaces.
+
+Caches, coalescing, rate limits, breakers and admission slots are per
+worker, because each worker has its own process state. So are the
+/proxy/* and /debug/traces views: they describe the worker that answered.
+/metrics reports every worker, labelled by slot, through a MetricsSpool.
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import uvicorn
+
+logger = logging.getLogger("sportteams.proxy.supervisor")
+
+# Set in every worker to its slot number
+WORKER_ENV = "PROXY_WORKER"
+
+# Workers that die sooner than this after starting count as a crash loop
+MIN_WORKER_UPTIME = 5.0
+MAX_RESTART_DELAY = 30.0
+
+
+def current_worker() -> Optional[str]:
+    """Slot number of this worker process, None outside a supervisor"""
+    return os.environ.get(WORKER_ENV)
+
+
+def default_workers() -> int:
+    """One worker per core available to this process"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn server that reports when it is accepting connections"""
+
+    def __init__(self, config: uvicorn.Config, ready):
+        super().__init__(config)
+        self.ready = ready
+
+    async def startup(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            self.ready.set()
+
+
+class Worker:
+    """One forked worker process"""
+
+    def __init__(self, process: multiprocessing.Process, ready):
+        self.process = process
+        self.ready = ready
+        self.started_at = time.monotonic()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def stop(self, timeout: float) -> None:
+        """Ask the worker to drain, and kill it if it is still running after `timeout`"""
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning("Worker %s did not drain in %.0fs, killing it", self.pid, timeout)
+            self.process.kill()
+            self.process.join()
+
+
+class Supervisor:
+    """Run `app` in `workers` processes sharing one listening socket
+
+    `app` is either the ASGI app itself, which forked workers share without
+    importing it again, or an import string such as "server:app".
+    """
+
+    def __init__(self, app: Union[str, Any], host: str = "0.0.0.0", port: int = 8001,
+                 workers: Optional[int] = None, graceful_timeout: float = 30.0,
+                 ready_timeout: float = 30.0, **options: Any):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or default_workers()
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.options: Dict[str, Any] = options
+        self.socket: Optional[socket.socket] = None
+        self._context = multiprocessing.get_context("fork")
+        self._workers: List[Worker] = []
+        self._stopping = False
+        self._reload = False
+        self._restart_delay = 0.0
+
+    def run(self) -> None:
+        """Serve until SIGTERM or SIGINT"""
+        self.socket = self._bind()
+        logger.info("Supervisor %s listening on %s:%s with %s workers",
+                    os.getpid(), self.host, self.port, self.workers)
+        previous = {
+            sig: signal.signal(sig, self._handle_signal)
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+        }
+        try:
+            for index in range(self.workers):
+                self._workers.append(self._spawn(index))
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    self._rolling_restart()
+                self._reap()
+                time.sleep(0.5)
+        finally:
+            self._shutdown()
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            self.socket.close()
+
+    def _handle_signal(self, sig: int, frame: Any) -> None:
+        if sig == signal.SIGHUP:
+            logger.info("SIGHUP received, rolling restart of %s workers", len(self._workers))
+            self._reload = True
+        else:
+            logger.info("Signal %s received, draining workers", signal.Signals(sig).name)
+            self._stopping = True
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        # An explicit IPPROTO_TCP, inherited by accepted sockets, is what makes
+        # asyncio set TCP_NODELAY on them; without it every keep-alive
+        # response waits ~40 ms for a delayed ACK
+        sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.options.get("backlog", 2048))
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self, index: int) -> Worker:
+        ready = self._context.Event()
+        process = self._context.Process(target=self._serve, args=(index, ready), daemon=False)
+        process.start()
+        logger.info("Started worker %s", process.pid)
+        return Worker(process, ready)
+
+    def _serve(self, index: int, ready) -> None:
+        # Runs in the forked worker; uvicorn installs its own SIGTERM/SIGINT
+        # handlers, and reloads are the supervisor's business only
+        os.environ[WORKER_ENV] = str(index)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        config = uvicorn.Config(
+            self.app,
+            timeout_graceful_shutdown=self.graceful_timeout,
+            **self.options
+        )
+        _WorkerServer(config, ready).run(sockets=[self.socket])
+
+    def _reap(self) -> None:
+        """Replace workers that exited without being asked to"""
+        for index, worker in enumerate(self._workers):
+            if worker.process.is_alive() or self._stopping:
+                continue
+            uptime = time.monotonic() - worker.started_at
+            logger.error("Worker %s exited with code %s after %.1fs",
+                         worker.pid, worker.process.exitcode, uptime)
+            if uptime < MIN_WORKER_UPTIME:
+                self._restart_delay = min(MAX_RESTART_DELAY, max(0.5, self._restart_delay * 2))
+                time.sleep(self._restart_delay)
+            else:
+                self._restart_delay = 0.0
+            if not self._stopping:
+                self._workers[index] = self._spawn(index)
+
+    def _rolling_restart(self) -> None:
+        """Replace workers one at a time so capacity never drops below N-1"""
+        for index, old in enumerate(list(self._workers)):
+            if self._stopping:
+                return
+            new = self._spawn(index)
+            if not self._wait_ready(new):
+                logger.error("Replacement worker %s did not start, keeping worker %s", new.pid, old.pid)
+                new.stop(timeout=0)
+                return
+            self._workers[index] = new
+            old.stop(self.graceful_timeout + 5)
+            logger.info("Worker %s replaced by %s", old.pid, new.pid)
+
+    def _wait_ready(self, worker: Worker) -> bool:
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline and worker.process.is_alive():
+            if worker.ready.wait(0.2):
+                return True
+        return False
+
+    def _shutdown(self) -> None:
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        for worker in workers:
+            worker.stop(max(0.0, deadline - time.monotonic()))
+        logger.info("All workers stopped")
@@ -0,0 +1,235 @@
+"""
+Per-request tracing: W3C traceparent, Server-Timing and a span exporter
+Every proxied request gets a RequestTrace. Its trace ID continues an
+incoming `traceparent` or is generated here, and it is passed on to Laravel
+in a new `traceparent`.
+
+The trace collects spans for the phases of the request: edge auth,
+admission wait, the upstream call (split into connect, send and wait by
+httpcore trace events), the body transfer, and Laravel's own time taken
+from its `Server-Timing: app;dur=...` header.
+
+Every response carries a Server-Timing summary and the trace ID. Sampled
+traces are kept in a ring buffer for /debug/traces and can also be appended
+to a JSONL file.
+"""
+
+import json
+import os
+import random
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+TRACEPARENT_HEADER = "traceparent"
+TRACE_ID_HEADER = "x-trace-id"
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_SERVER_TIMING_APP = re.compile(r"(?:^|,)\s*app\s*;(?:[^,]*;)?\s*dur=([0-9.]+)")
+
+# httpcore trace events (without the .started/.complete suffix) and the span they become
+_HTTPCORE_SPANS = {
+    "connection.connect_tcp": "connect",
+    "connection.connect_unix_socket": "connect",
+    "connection.start_tls": "tls",
+    "http11.send_request_headers": "send",
+    "http11.send_request_body": "send",
+    "http11.receive_response_headers": "wait",
+    "http2.send_request_headers": "send",
+    "http2.send_request_body": "send",
+    "http2.receive_response_headers": "wait",
+}
+
+# Spans summarised in the Server-Timing header, in this order
+SERVER_TIMING_SPANS = ("auth", "admission", "upstream", "connect", "wait")
+
+current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("current_trace", default=None)
+
+
+def parse_traceparent(value: str) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent_span_id, sampled) from a traceparent header, None if invalid"""
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def laravel_duration(server_timing: str) -> Optional[float]:
+    """Seconds Laravel reported as `app;dur=<ms>` in its Server-Timing header"""
+    match = _SERVER_TIMING_APP.search(server_timing)
+    return float(match.group(1)) / 1000 if match else None
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "attributes")
+
+    def __init__(self, name: str, start: float, duration: float, attributes: Dict[str, Any]):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.attributes = attributes
+
+    def as_dict(self) -> Dict[str, Any]:
+        span = {"name": self.name, "start_ms": round(self.start * 1000, 3),
+                "duration_ms": round(self.duration * 1000, 3)}
+        if self.attributes:
+            span["attributes"] = self.attributes
+        return span
+
+
+class RequestTrace:
+    """Spans of one proxied request, relative to its start"""
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], sampled: bool, method: str, path: str):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.span_id = os.urandom(8).hex()
+        self.sampled = sampled
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Span] = []
+        self._open: Dict[str, float] = {}
+
+    def record(self, name: str, start: float, end: float, **attributes: Any) -> None:
+        """Add a span from perf_counter timestamps"""
+        self.spans.append(Span(name, start - self.started, end - start, attributes))
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started, time.perf_counter(), **attributes)
+
+    def total(self, name: str) -> float:
+        return sum(span.duration for span in self.spans if span.name == name)
+
+    def traceparent(self) -> str:
+        """traceparent for the upstream request, with this proxy span as parent"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    async def httpcore_hook(self, event: str, info: Dict[str, Any]) -> None:
+        """httpx `trace` request extension: turns connection events into spans"""
+        base, _, phase = event.rpartition(".")
+        name = _HTTPCORE_SPANS.get(base)
+        if name is None:
+            return
+        if phase == "started":
+            self._open[base] = time.perf_counter()
+        elif base in self._open:
+            self.record(name, self._open.pop(base), time.perf_counter())
+
+    def laravel(self, server_timing: Optional[str]) -> None:
+        """Record Laravel's own time from its Server-Timing header"""
+        duration = laravel_duration(server_timing) if server_timing else None
+        if duration is not None:
+            now = time.perf_counter()
+            self.record("laravel", now - duration, now)
+
+    def server_timing(self) -> str:
+        """Server-Timing value for the response headers (durations in ms)"""
+        entries = [f"proxy;dur={(time.perf_counter() - self.started) * 1000:.1f}"]
+        for name in SERVER_TIMING_SPANS:
+            if any(span.name == name for span in self.spans):
+                entries.append(f"{name};dur={self.total(name) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def finish(self, status_code: int, route: Optional[str]) -> None:
+        self.status_code = status_code
+        self.route = route
+        self.duration = time.perf_counter() - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "timestamp": self.started_at,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status_code,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "spans": [span.as_dict() for span in self.spans],
+        }
+
+
+class Tracer:
+    """Start request traces and export the sampled ones"""
+
+    def __init__(self, sample_rate: float = 0.1, buffer_size: int = 1000, path: Optional[str] = None,
+                 rng: Optional[random.Random] = None):
+        self.sample_rate = sample_rate
+        self.path = path
+        self._random = rng or random.Random()
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._file = open(path, "a", buffering=1, encoding="utf-8") if path else None
+        self.started = 0
+        self.exported = 0
+
+    def start(self, headers: List[Tuple[bytes, bytes]], method: str, path: str) -> RequestTrace:
+        """Trace for an incoming request; a sampled parent is always sampled"""
+        self.started += 1
+        parent = None
+        for name, value in headers:
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+            sampled = sampled or self._random.random() < self.sample_rate
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = self._random.random() < self.sample_rate
+        return RequestTrace(trace_id, parent_id, sampled, method, path)
+
+    def export(self, trace: RequestTrace) -> None:
+        if not trace.sampled:
+            return
+        self.exported += 1
+        record = trace.as_dict()
+        self._buffer.append(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def query(self, trace_id: Optional[str] = None, route: Optional[str] = None,
+              min_duration_ms: float = 0.0, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent sampled traces first"""
+        results = []
+        for record in reversed(self._buffer):
+            if trace_id and record["trace_id"] != trace_id:
+                continue
+            if route and record["route"] != route and record["path"] != route:
+                continue
+            if (record["duration_ms"] or 0.0) < min_duration_ms:
+                continue
+            results.append(record)
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "started": self.started,
+            "exported": self.exported,
+            "buffered": len(self._buffer),
+            "file": self.path,
+        }
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -50,7 +50,8 @@
             Route::get('/templates/{formTemplate}', [FormTemplateController::class, 'show']);
             Route::get('/active', [FormTemplateController::class, 'getActiveForms']);
             
-            // Form responses
+            // Form responses (the export route must precede responses/{response})
+            Route::get('/responses/export', [FormResponseController::class, 'export']);
             Route::apiResource('responses', FormResponseController::class);
         });
         
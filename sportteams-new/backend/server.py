@@ -4,76 +4,941 @@ Proxy server to redirect requests to Laravel backend
 This ensures the platform preview works correctly
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
 import uvicorn
+import argparse
+import base64
+import logging
 import os
+import time
+import uuid
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers as StarletteHeaders
 
-app = FastAPI(title="SportTeams Proxy", version="1.0.0")
+from proxy import (
+    AdmissionController,
+    AdmissionRejected,
+    API_ROUTES,
+    BatchError,
+    BATCH_CLAIM,
+    BATCH_SCOPE_KEY,
+    BatchRunner,
+    CacheTags,
+    ClaimScope,
+    ProxyApp,
+    CircuitBreaker,
+    CircuitOpenError,
+    HealthProber,
+    INVALIDATE_HEADER,
+    SUBMITTED_AT_CLAIM,
+    SUBMITTED_AT_HEADER,
+    ProxyMetrics,
+    MetricsSpool,
+    Registry,
+    ResponseCache,
+    ResponseCompressor,
+    RetryPolicy,
+    RouteTable,
+    SingleFlight,
+    StaticSite,
+    TRACE_ID_HEADER,
+    Tracer,
+    WriteJournal,
+    JournalConflict,
+    Supervisor,
+    TokenBucketLimiter,
+    TokenError,
+    TokenValidator,
+    bearer_token,
+    capture,
+    client_address,
+    current_trace,
+    current_worker,
+    retry_after_header,
+    scoped_id,
+    token_hash,
+    UpstreamPool,
+    make_balancer,
+    method_label,
+    parse_batch,
+    parse_networks,
+    precompress,
+    raw_response,
+    raw_streaming_response,
+    request_headers,
+    request_key,
+    response_headers,
+)
+from proxy.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from proxy.settings import env_bool, env_float, env_int, env_list, env_optional_int, env_str
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# Laravel backend URL; LARAVEL_BACKEND_URLS lists several workers to balance over
+LARAVEL_BACKEND_URL = env_str("LARAVEL_BACKEND_URL", "http://localhost:8002")
+LARAVEL_BACKEND_URLS = env_list("LARAVEL_BACKEND_URLS", [LARAVEL_BACKEND_URL])
+
+# Load balancing (round_robin, least_outstanding or ewma) and passive ejection
+# of upstreams that fail several times in a row
+PROXY_BALANCER = env_str("PROXY_BALANCER", "least_outstanding")
+PROXY_EJECT_AFTER_FAILURES = env_int("PROXY_EJECT_AFTER_FAILURES", 5)
+PROXY_EJECT_SECONDS = env_float("PROXY_EJECT_SECONDS", 10.0)
+
+# Per-upstream circuit breaker: open on error rate or slow-call rate within
+# the rolling window, fail fast while open, then probe with trial requests
+PROXY_BREAKER_ENABLED = env_bool("PROXY_BREAKER_ENABLED", True)
+PROXY_BREAKER_ERROR_RATE = env_float("PROXY_BREAKER_ERROR_RATE", 0.5)
+PROXY_BREAKER_SLOW_CALL_SECONDS = env_float("PROXY_BREAKER_SLOW_CALL_SECONDS", 5.0)
+PROXY_BREAKER_SLOW_CALL_RATE = env_float("PROXY_BREAKER_SLOW_CALL_RATE", 0.8)
+PROXY_BREAKER_MIN_REQUESTS = env_int("PROXY_BREAKER_MIN_REQUESTS", 10)
+PROXY_BREAKER_WINDOW_SECONDS = env_int("PROXY_BREAKER_WINDOW_SECONDS", 10)
+PROXY_BREAKER_OPEN_SECONDS = env_float("PROXY_BREAKER_OPEN_SECONDS", 15.0)
+PROXY_BREAKER_HALF_OPEN_REQUESTS = env_int("PROXY_BREAKER_HALF_OPEN_REQUESTS", 3)
+
+# Upstream connection pool tuning
+PROXY_MAX_CONNECTIONS = env_optional_int("PROXY_MAX_CONNECTIONS", 200)
+PROXY_MAX_KEEPALIVE_CONNECTIONS = env_optional_int("PROXY_MAX_KEEPALIVE_CONNECTIONS", 50)
+PROXY_MAX_CONNECTIONS_PER_HOST = env_optional_int("PROXY_MAX_CONNECTIONS_PER_HOST", 100)
+PROXY_KEEPALIVE_EXPIRY = env_float("PROXY_KEEPALIVE_EXPIRY", 30.0)
+PROXY_TIMEOUT = env_float("PROXY_TIMEOUT", 30.0)
+PROXY_CONNECT_TIMEOUT = env_float("PROXY_CONNECT_TIMEOUT", 5.0)
+PROXY_POOL_TIMEOUT = env_float("PROXY_POOL_TIMEOUT", 10.0)
+
+# Stream request and response bodies instead of buffering them in memory
+PROXY_STREAM_BODIES = env_bool("PROXY_STREAM_BODIES", True)
+
+# Response cache for read-mostly GET endpoints ("route template=ttl seconds")
+PROXY_CACHE_ENABLED = env_bool("PROXY_CACHE_ENABLED", True)
+PROXY_CACHE_ROUTES = env_str(
+    "PROXY_CACHE_ROUTES",
+    "/api/v1/forms/active=30,/api/v1/forms/templates=60,/api/v1/forms/templates/{id}=60,"
+    "/api/v1/team-admin/teams/{id}/players=30"
+)
+PROXY_CACHE_VARY_HEADERS = env_list(
+    "PROXY_CACHE_VARY_HEADERS",
+    ["authorization", "accept-language", "accept-encoding"]
+)
+PROXY_CACHE_MAX_BYTES = env_int("PROXY_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+PROXY_CACHE_MAX_ENTRY_BYTES = env_int("PROXY_CACHE_MAX_ENTRY_BYTES", 1024 * 1024)
+
+# Invalidation tags of cached routes ("route template=tag tag") and the tags a
+# successful write makes stale ("METHOD route template=tag tag"); {id} is
+# filled from the path. Writes without a known team bump every players list
+PROXY_CACHE_TAGS = env_str(
+    "PROXY_CACHE_TAGS",
+    "/api/v1/forms/active=forms:active,"
+    "/api/v1/forms/templates=forms:templates,"
+    "/api/v1/forms/templates/{id}=template:{id},"
+    "/api/v1/forms/statistics=forms:statistics,"
+    "/api/v1/team-admin/teams=teams,"
+    "/api/v1/team-admin/teams/{id}/players=team:{id}:players teams:players"
+)
+PROXY_CACHE_INVALIDATIONS = env_str(
+    "PROXY_CACHE_INVALIDATIONS",
+    "POST /api/v1/forms/templates=forms:templates forms:active forms:statistics,"
+    "PUT /api/v1/forms/templates/{id}=template:{id} forms:templates forms:active forms:statistics,"
+    "POST /api/v1/forms/templates/{id}/toggle-active=template:{id} forms:templates forms:active forms:statistics,"
+    "DELETE /api/v1/forms/templates/{id}=template:{id} forms:templates forms:active forms:statistics,"
+    "POST /api/v1/forms/responses=forms:statistics,"
+    "PUT /api/v1/forms/responses/{id}=forms:statistics,"
+    "PATCH /api/v1/forms/responses/{id}=forms:statistics,"
+    "DELETE /api/v1/forms/responses/{id}=forms:statistics,"
+    "POST /api/v1/team-admin/players=teams teams:players,"
+    "PUT /api/v1/team-admin/players/{id}=teams teams:players,"
+    "POST /api/v1/team-admin/promote-to-player=teams teams:players"
+)
+
+# Coalesce identical concurrent GETs on these routes into one upstream call;
+# requests only share a call when these headers (the auth scope) are equal
+PROXY_COALESCE_ENABLED = env_bool("PROXY_COALESCE_ENABLED", True)
+PROXY_COALESCE_ROUTES = env_list("PROXY_COALESCE_ROUTES", [
+    "/api/v1/auth/me",
+    "/api/v1/forms/active",
+    "/api/v1/forms/templates",
+    "/api/v1/forms/templates/{id}",
+    "/api/v1/forms/statistics",
+    "/api/v1/team-admin/teams",
+    "/api/v1/team-admin/teams/{id}/players",
+])
+PROXY_COALESCE_VARY_HEADERS = env_list(
+    "PROXY_COALESCE_VARY_HEADERS",
+    ["authorization", "cookie", "accept-language", "accept-encoding"]
 )
 
-# Laravel backend URL
-LARAVEL_BACKEND_URL = "http://localhost:8002"
+# Background health probing of the upstreams; /health serves the last result
+PROXY_HEALTH_PATH = env_str("PROXY_HEALTH_PATH", "/api/v1/test")
+PROXY_HEALTH_INTERVAL = env_float("PROXY_HEALTH_INTERVAL", 10.0)
+PROXY_HEALTH_TIMEOUT = env_float("PROXY_HEALTH_TIMEOUT", 5.0)
+
+# Edge token validation with the keys shared with Laravel (base64, as in .env)
+PROXY_EDGE_AUTH = env_bool("PROXY_EDGE_AUTH", True)
+JWT_SIGNING_KEY = base64.b64decode(env_str("JWT_SIGNING_KEY", ""))
+JWT_ENCRYPTION_KEY = base64.b64decode(env_str("JWT_ENCRYPTION_KEY", ""))
+JWT_AUDIENCE = env_str("APP_URL", "")
+PROXY_TOKEN_CACHE_SIZE = env_int("PROXY_TOKEN_CACHE_SIZE", 10000)
+
+# Rate limits per client IP and path ("path=requests per period"), per worker
+# process, matching SecurityMiddleware::enforceRateLimit; the exempt routes
+# are the public ones Laravel does not limit
+PROXY_RATE_LIMIT_ENABLED = env_bool("PROXY_RATE_LIMIT_ENABLED", True)
+PROXY_RATE_LIMITS = env_str(
+    "PROXY_RATE_LIMITS",
+    "/api/v1/auth/login=5,/api/v1/auth/refresh=10,/api/v1/players=100,"
+    "/api/v1/teams=100,/api/v1/evaluations=50"
+)
+PROXY_RATE_LIMIT_DEFAULT = env_int("PROXY_RATE_LIMIT_DEFAULT", 30)
+PROXY_RATE_LIMIT_PERIOD = env_float("PROXY_RATE_LIMIT_PERIOD", 60.0)
+PROXY_RATE_LIMIT_PREFIX = env_str("PROXY_RATE_LIMIT_PREFIX", "/api/")
+PROXY_RATE_LIMIT_EXEMPT = env_list("PROXY_RATE_LIMIT_EXEMPT", ["/api/user", "/api/v1/test"])
+# Peers whose X-Forwarded-For names the client (load balancers, ingress);
+# PROXY_TRUST_FORWARDED_FOR trusts every peer
+PROXY_TRUSTED_PROXIES = env_list("PROXY_TRUSTED_PROXIES", [
+    "127.0.0.0/8", "::1", "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "fc00::/7",
+])
+PROXY_TRUST_FORWARDED_FOR = env_bool("PROXY_TRUST_FORWARDED_FOR", False)
+
+# Negotiated gzip/brotli compression of textual responses
+PROXY_COMPRESSION_ENABLED = env_bool("PROXY_COMPRESSION_ENABLED", True)
+PROXY_COMPRESSION_MIN_SIZE = env_int("PROXY_COMPRESSION_MIN_SIZE", 1024)
+PROXY_COMPRESSION_TYPES = env_list("PROXY_COMPRESSION_TYPES", [
+    "application/json", "application/problem+json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml", "text/",
+])
+PROXY_GZIP_LEVEL = env_int("PROXY_GZIP_LEVEL", 6)
+PROXY_BROTLI_QUALITY = env_int("PROXY_BROTLI_QUALITY", 4)
+
+# Listening address and production worker processes (default: one per core);
+# workers get PROXY_GRACEFUL_TIMEOUT seconds to finish requests on shutdown
+PROXY_HOST = env_str("PROXY_HOST", "0.0.0.0")
+PROXY_PORT = env_int("PROXY_PORT", 8001)
+PROXY_WORKERS = env_optional_int("PROXY_WORKERS")
+PROXY_GRACEFUL_TIMEOUT = env_float("PROXY_GRACEFUL_TIMEOUT", 30.0)
+# Where supervised workers share their metrics, so /metrics reports all of them
+PROXY_METRICS_DIR = env_str(
+    "PROXY_METRICS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage", "app", f"proxy-metrics-{PROXY_PORT}"))
+PROXY_METRICS_SPOOL_INTERVAL = env_float("PROXY_METRICS_SPOOL_INTERVAL", 1.0)
+
+# Retries for idempotent requests (full jitter backoff, per-route budgets) and
+# optional hedging to another upstream at the route's recent p95 latency
+PROXY_RETRY_ENABLED = env_bool("PROXY_RETRY_ENABLED", True)
+PROXY_RETRY_METHODS = env_list("PROXY_RETRY_METHODS", ["GET", "HEAD", "OPTIONS"])
+PROXY_RETRY_MAX_ATTEMPTS = env_int("PROXY_RETRY_MAX_ATTEMPTS", 2)
+PROXY_RETRY_BACKOFF = env_float("PROXY_RETRY_BACKOFF", 0.05)
+PROXY_RETRY_MAX_BACKOFF = env_float("PROXY_RETRY_MAX_BACKOFF", 1.0)
+PROXY_RETRY_BUDGET_RATIO = env_float("PROXY_RETRY_BUDGET_RATIO", 0.1)
+PROXY_RETRY_BUDGET_MIN_PER_SECOND = env_float("PROXY_RETRY_BUDGET_MIN_PER_SECOND", 1.0)
+PROXY_HEDGE_ENABLED = env_bool("PROXY_HEDGE_ENABLED", False)
+PROXY_HEDGE_QUANTILE = env_float("PROXY_HEDGE_QUANTILE", 0.95)
+PROXY_HEDGE_MIN_DELAY = env_float("PROXY_HEDGE_MIN_DELAY", 0.02)
+# Laravel rejects a reused access token, so requests with one are only retried
+# when they never reached it, and never hedged; enable for backends without that check
+PROXY_RETRY_AUTHENTICATED = env_bool("PROXY_RETRY_AUTHENTICATED", False)
+
+# Admission control: concurrent Laravel calls, bounded priority queue and the
+# priority class per route (critical, high, normal, low; default normal)
+PROXY_ADMISSION_ENABLED = env_bool("PROXY_ADMISSION_ENABLED", True)
+PROXY_ADMISSION_LIMIT = env_int("PROXY_ADMISSION_LIMIT", 16)
+PROXY_ADMISSION_QUEUE_SIZE = env_int("PROXY_ADMISSION_QUEUE_SIZE", 64)
+PROXY_ADMISSION_QUEUE_TIMEOUT = env_float("PROXY_ADMISSION_QUEUE_TIMEOUT", 5.0)
+PROXY_PRIORITY_CLASSES = env_str(
+    "PROXY_PRIORITY_CLASSES",
+    "/api/v1/test=critical,/api/v1/auth/login=critical,/api/v1/auth/refresh=critical,"
+    "/api/v1/auth/me=high,/api/v1/auth/logout=high,"
+    "/api/v1/forms/statistics=low,/api/v1/forms/responses=low,/api/v1/forms/responses/export=low"
+)
+
+# Tracing: Server-Timing on every response, sampled traces kept for
+# /debug/traces and optionally appended to a JSONL file
+PROXY_TRACING_ENABLED = env_bool("PROXY_TRACING_ENABLED", True)
+PROXY_TRACE_SAMPLE_RATE = env_float("PROXY_TRACE_SAMPLE_RATE", 0.1)
+PROXY_TRACE_BUFFER = env_int("PROXY_TRACE_BUFFER", 1000)
+PROXY_TRACE_FILE = env_str("PROXY_TRACE_FILE", "")
+PROXY_SERVER_TIMING = env_bool("PROXY_SERVER_TIMING", True)
+
+# Batch endpoint: sub-requests per call and how many run concurrently
+PROXY_BATCH_PATH = env_str("PROXY_BATCH_PATH", "/api/v1/batch")
+PROXY_BATCH_MAX_REQUESTS = env_int("PROXY_BATCH_MAX_REQUESTS", 20)
+PROXY_BATCH_CONCURRENCY = env_int("PROXY_BATCH_CONCURRENCY", 6)
+
+# Built React frontend served by the proxy; with it, only PROXY_UPSTREAM_PREFIXES
+# reach Laravel. Missing .gz/.br siblings are written at startup unless disabled
+PROXY_STATIC_ROOT = env_str(
+    "PROXY_STATIC_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend", "dist"))
+PROXY_STATIC_ENABLED = env_bool("PROXY_STATIC_ENABLED", True)
+PROXY_STATIC_PRECOMPRESS = env_bool("PROXY_STATIC_PRECOMPRESS", True)
+PROXY_STATIC_SPA_FALLBACK = env_bool("PROXY_STATIC_SPA_FALLBACK", True)
+PROXY_UPSTREAM_PREFIXES = env_list("PROXY_UPSTREAM_PREFIXES", ["/api/"])
+
+# Durable journal for form submissions: "off", "fallback" (journal when Laravel
+# is unreachable or answers 502-504, or older entries are still queued) or
+# "always" (answer every submission with 202 and replay in the background)
+PROXY_JOURNAL_MODE = env_str("PROXY_JOURNAL_MODE", "off")
+PROXY_JOURNAL_PATH = env_str(
+    "PROXY_JOURNAL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage", "app", "proxy-journal.sqlite3"))
+PROXY_JOURNAL_ROUTES = env_list("PROXY_JOURNAL_ROUTES", ["/api/v1/forms/responses"])
+PROXY_JOURNAL_RETENTION = env_float("PROXY_JOURNAL_RETENTION", 7 * 86400)
+PROXY_JOURNAL_MAX_BODY = env_int("PROXY_JOURNAL_MAX_BODY", 1024 * 1024)
+# Replays that keep failing with 5xx or transport errors give up after this many tries
+PROXY_JOURNAL_MAX_ATTEMPTS = env_int("PROXY_JOURNAL_MAX_ATTEMPTS", 10)
+
+# Laravel routes outside SecurityMiddleware, never validated at the edge
+PUBLIC_API_ROUTES = {"/api/user", "/api/v1/test", "/api/v1/auth/login", "/api/v1/auth/refresh"}
+
+# Paths answered by the proxy itself instead of Laravel
+LOCAL_PATHS = {"/health", "/metrics", "/proxy/pool", "/proxy/cache", "/proxy/coalescing", "/proxy/auth",
+               "/proxy/ratelimit", "/proxy/compression", "/proxy/admission", "/debug/traces",
+               "/proxy/static", "/proxy/journal", PROXY_BATCH_PATH}
+
+logger = logging.getLogger("sportteams.proxy")
+
+def make_circuit_breaker() -> CircuitBreaker:
+    """One breaker per upstream target"""
+    return CircuitBreaker(
+        error_rate=PROXY_BREAKER_ERROR_RATE,
+        slow_call_seconds=PROXY_BREAKER_SLOW_CALL_SECONDS,
+        slow_call_rate=PROXY_BREAKER_SLOW_CALL_RATE,
+        min_requests=PROXY_BREAKER_MIN_REQUESTS,
+        window_seconds=PROXY_BREAKER_WINDOW_SECONDS,
+        open_seconds=PROXY_BREAKER_OPEN_SECONDS,
+        half_open_requests=PROXY_BREAKER_HALF_OPEN_REQUESTS,
+    )
+
+upstream = UpstreamPool(
+    LARAVEL_BACKEND_URLS,
+    max_connections=PROXY_MAX_CONNECTIONS,
+    max_keepalive_connections=PROXY_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=PROXY_KEEPALIVE_EXPIRY,
+    max_connections_per_host=PROXY_MAX_CONNECTIONS_PER_HOST,
+    timeout=PROXY_TIMEOUT,
+    connect_timeout=PROXY_CONNECT_TIMEOUT,
+    pool_timeout=PROXY_POOL_TIMEOUT,
+    balancer=make_balancer(PROXY_BALANCER),
+    eject_after_failures=PROXY_EJECT_AFTER_FAILURES,
+    eject_seconds=PROXY_EJECT_SECONDS,
+    breaker_factory=make_circuit_breaker if PROXY_BREAKER_ENABLED else None,
+    retry_policy=RetryPolicy(
+        methods=PROXY_RETRY_METHODS,
+        max_attempts=PROXY_RETRY_MAX_ATTEMPTS,
+        backoff=PROXY_RETRY_BACKOFF,
+        max_backoff=PROXY_RETRY_MAX_BACKOFF,
+        budget_ratio=PROXY_RETRY_BUDGET_RATIO,
+        budget_min_per_second=PROXY_RETRY_BUDGET_MIN_PER_SECOND,
+        hedge=PROXY_HEDGE_ENABLED,
+        hedge_quantile=PROXY_HEDGE_QUANTILE,
+        hedge_min_delay=PROXY_HEDGE_MIN_DELAY,
+        authenticated=PROXY_RETRY_AUTHENTICATED,
+    ) if PROXY_RETRY_ENABLED else None,
+)
+
+cache_routes = RouteTable.parse(PROXY_CACHE_ROUTES) if PROXY_CACHE_ENABLED else RouteTable()
+# Created before the supervisor forks, so tag versions are shared by all workers
+cache_tags = CacheTags.parse(PROXY_CACHE_TAGS, PROXY_CACHE_INVALIDATIONS)
+response_cache = ResponseCache(
+    max_bytes=PROXY_CACHE_MAX_BYTES,
+    max_entry_bytes=PROXY_CACHE_MAX_ENTRY_BYTES,
+    vary_headers=PROXY_CACHE_VARY_HEADERS,
+    tag_versions=cache_tags.versions,
+)
+
+coalesce_routes = RouteTable(
+    (template, True) for template in (PROXY_COALESCE_ROUTES if PROXY_COALESCE_ENABLED else [])
+)
+single_flight = SingleFlight()
+
+health_prober = HealthProber(
+    upstream,
+    path=PROXY_HEALTH_PATH,
+    interval=PROXY_HEALTH_INTERVAL,
+    timeout=PROXY_HEALTH_TIMEOUT,
+)
+
+journal = WriteJournal(
+    PROXY_JOURNAL_PATH,
+    retention=PROXY_JOURNAL_RETENTION,
+    max_attempts=PROXY_JOURNAL_MAX_ATTEMPTS,
+) if PROXY_JOURNAL_MODE in ("fallback", "always") else None
+journal_routes = RouteTable((template, True) for template in PROXY_JOURNAL_ROUTES)
+
+token_validator = None
+if PROXY_EDGE_AUTH and JWT_SIGNING_KEY:
+    token_validator = TokenValidator(
+        JWT_SIGNING_KEY,
+        encryption_key=JWT_ENCRYPTION_KEY,
+        audience=JWT_AUDIENCE or None,
+        cache_size=PROXY_TOKEN_CACHE_SIZE,
+    )
+    if not token_validator.available:
+        logger.warning("Edge token validation disabled: install 'cryptography' to decrypt tokens")
+        token_validator = None
+
+rate_limiter = TokenBucketLimiter(
+    RouteTable.parse(PROXY_RATE_LIMITS, cast=int),
+    default_limit=PROXY_RATE_LIMIT_DEFAULT,
+    period=PROXY_RATE_LIMIT_PERIOD,
+    exempt=PROXY_RATE_LIMIT_EXEMPT,
+) if PROXY_RATE_LIMIT_ENABLED else None
+trusted_proxies = parse_networks(PROXY_TRUSTED_PROXIES)
+
+compressor = ResponseCompressor(
+    min_size=PROXY_COMPRESSION_MIN_SIZE,
+    content_types=PROXY_COMPRESSION_TYPES,
+    gzip_level=PROXY_GZIP_LEVEL,
+    brotli_quality=PROXY_BROTLI_QUALITY,
+) if PROXY_COMPRESSION_ENABLED else None
+
+# Batch items go through the same path as individual requests
+batch_runner = BatchRunner(
+    lambda scope, receive: capture(proxy_app, scope, receive),
+    concurrency=PROXY_BATCH_CONCURRENCY,
+)
+
+def load_static_site():
+    """StaticSite for PROXY_STATIC_ROOT, None when disabled or not built yet"""
+    if not PROXY_STATIC_ENABLED or not os.path.isfile(os.path.join(PROXY_STATIC_ROOT, "index.html")):
+        return None
+    if PROXY_STATIC_PRECOMPRESS:
+        try:
+            precompress(PROXY_STATIC_ROOT, min_size=PROXY_COMPRESSION_MIN_SIZE, content_types=PROXY_COMPRESSION_TYPES)
+        except OSError as e:
+            logger.warning(f"Could not precompress {PROXY_STATIC_ROOT}: {e}")
+    return StaticSite(PROXY_STATIC_ROOT, spa_fallback=PROXY_STATIC_SPA_FALLBACK)
+
+static_site = load_static_site()
+
+# Metric labels use route templates so cardinality stays bounded
+route_labels = RouteTable((template, template) for template in API_ROUTES)
+metrics = Registry("sportteams_proxy")
+proxy_metrics = ProxyMetrics(metrics)
+# Set in lifespan when running under the supervisor
+metrics_spool = None
+admission_wait = metrics.histogram(
+    "admission_wait_seconds", "Time spent queued by admission control", ("priority",))
+
+priority_classes = RouteTable.parse(PROXY_PRIORITY_CLASSES, cast=str)
+tracer = Tracer(
+    sample_rate=PROXY_TRACE_SAMPLE_RATE,
+    buffer_size=PROXY_TRACE_BUFFER,
+    path=PROXY_TRACE_FILE or None,
+) if PROXY_TRACING_ENABLED else None
+
+def record_span(name: str, started: float, **attributes):
+    """Add a span that ends now to the current request's trace"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.record(name, started, time.perf_counter(), **attributes)
+
+def observe_admission_wait(priority: str, seconds: float):
+    admission_wait.labels(priority).observe(seconds)
+    if seconds:
+        record_span("admission", time.perf_counter() - seconds, priority=priority)
+
+admission = AdmissionController(
+    limit=PROXY_ADMISSION_LIMIT,
+    queue_size=PROXY_ADMISSION_QUEUE_SIZE,
+    queue_timeout=PROXY_ADMISSION_QUEUE_TIMEOUT,
+    observe_wait=observe_admission_wait,
+) if PROXY_ADMISSION_ENABLED else None
+
+@metrics.collector
+def collect_component_metrics():
+    """Scrape-time samples from the pool, cache, coalescing and health state"""
+    pool = upstream.stats()
+    targets = pool["upstreams"]["targets"]
+    cache = response_cache.stats()
+    flights = single_flight.stats()
+    health = {result["url"]: result for result in health_prober.snapshot()}
+    yield ("upstream_requests_total", "counter", "Requests sent to Laravel upstreams",
+           [({"upstream": t["url"]}, t["requests"]) for t in targets])
+    yield ("upstream_failures_total", "counter", "Failed requests per Laravel upstream",
+           [({"upstream": t["url"]}, t["failures"]) for t in targets])
+    yield ("upstream_outstanding_requests", "gauge", "Requests in flight per Laravel upstream",
+           [({"upstream": t["url"]}, t["outstanding"]) for t in targets])
+    yield ("upstream_available", "gauge", "1 unless the upstream is passively ejected",
+           [({"upstream": t["url"]}, int(t["available"])) for t in targets])
+    yield ("upstream_circuit_open", "gauge", "1 while the upstream circuit breaker is open",
+           [({"upstream": t["url"]}, int((t["circuit"] or {}).get("state") == "open")) for t in targets])
+    yield ("upstream_healthy", "gauge", "Result of the last background health probe",
+           [({"upstream": url}, int(result["status"] == "healthy")) for url, result in health.items()])
+    retries = pool["retries"]
+    if retries is not None:
+        yield ("upstream_retries_total", "counter", "Upstream attempts repeated by the retry policy",
+               [({}, retries["retries"])])
+        yield ("upstream_hedges_total", "counter", "Hedged second requests sent to another upstream",
+               [({}, retries["hedges"])])
+        yield ("upstream_hedge_wins_total", "counter", "Hedged requests that answered first",
+               [({}, retries["hedge_wins"])])
+        yield ("upstream_retry_budget_exhausted_total", "counter", "Retries or hedges refused by the budget",
+               [({}, upstream.retry_policy.budget_exhausted)])
+    yield ("pool_connections", "gauge", "Pooled upstream connections by state",
+           [({"host": host, "state": state}, stats[state])
+            for host, stats in pool["hosts"].items() for state in ("idle", "active")])
+    yield ("cache_hits_total", "counter", "Response cache hits", [({}, cache["hits"])])
+    yield ("cache_misses_total", "counter", "Response cache misses", [({}, cache["misses"])])
+    yield ("cache_evictions_total", "counter", "Response cache LRU evictions", [({}, cache["evictions"])])
+    yield ("cache_bytes", "gauge", "Bytes held by the response cache", [({}, cache["bytes"])])
+    yield ("cache_entries", "gauge", "Entries in the response cache", [({}, cache["entries"])])
+    yield ("cache_invalidations_total", "counter", "Cached responses dropped or not stored after a write",
+           [({}, cache["invalidations"])])
+    yield ("cache_tag_invalidations_total", "counter", "Writes that invalidated cache tags",
+           [({}, cache_tags.invalidated)])
+    if token_validator is not None:
+        auth = token_validator.stats()
+        yield ("edge_auth_cache_hits_total", "counter", "Token validations answered from the cache",
+               [({}, auth["hits"])])
+        yield ("edge_auth_rejected_total", "counter", "Requests rejected with 401 at the edge",
+               [({}, auth["rejected"])])
+    if rate_limiter is not None:
+        yield ("rate_limited_total", "counter", "Requests rejected with 429 by the rate limiter",
+               [({}, rate_limiter.limited)])
+    if journal is not None:
+        yield ("journal_appended_total", "counter", "Submissions written to the write journal",
+               [({}, journal.appended)])
+        yield ("journal_replayed_total", "counter", "Journaled submissions replayed to Laravel",
+               [({"result": "delivered"}, journal.delivered), ({"result": "failed"}, journal.failed)])
+        yield ("journal_retries_total", "counter", "Journal replays that will be tried again",
+               [({}, journal.retries)])
+    yield ("batch_requests_total", "counter", "Batch calls handled by the proxy", [({}, batch_runner.batches)])
+    yield ("batch_items_total", "counter", "Sub-requests run from batch calls", [({}, batch_runner.items)])
+    if admission is not None:
+        yield ("admission_in_flight", "gauge", "Laravel calls holding an admission slot",
+               [({}, admission.in_flight)])
+        yield ("admission_queue_depth", "gauge", "Calls waiting for an admission slot",
+               [({"priority": priority}, depth) for priority, depth in admission.queue_depths().items()])
+        yield ("admission_rejected_total", "counter", "Calls shed with 503 by admission control",
+               [({"reason": reason}, count) for reason, count in admission.rejected.items()])
+    yield ("coalesced_requests_total", "counter", "Requests served by another request's upstream call",
+           [({}, flights["collapsed_requests"])])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared upstream client on startup and drain it on shutdown"""
+    global metrics_spool
+    if current_worker() is not None:
+        metrics_spool = MetricsSpool(metrics, PROXY_METRICS_DIR, current_worker(),
+                                     interval=PROXY_METRICS_SPOOL_INTERVAL)
+        metrics_spool.start()
+    await upstream.start()
+    health_prober.start()
+    if journal is not None:
+        journal.start(deliver_journaled, lambda: health_prober.healthy)
+    try:
+        yield
+    finally:
+        if journal is not None:
+            await journal.stop()
+        await health_prober.stop()
+        await upstream.close()
+        if tracer is not None:
+            tracer.close()
+        if metrics_spool is not None:
+            await metrics_spool.stop()
+
+
+# FastAPI serves only the proxy's own endpoints (LOCAL_PATHS)
+api = FastAPI(title="SportTeams Proxy", version="1.0.0", lifespan=lifespan)
+
+def buffered_response(status_code: int, headers, body: bytes, extra=()) -> Response:
+    """Build a response from a fully read upstream body"""
+    return raw_response(
+        status_code,
+        [*headers, *((name.encode("latin-1"), value.encode("latin-1")) for name, value in extra)],
+        body
+    )
+
+def cached_response(entry, status: str = "HIT") -> Response:
+    """Build a response from a cache entry"""
+    return buffered_response(
+        entry.status_code, entry.headers, entry.body,
+        extra=[("age", str(entry.age)), ("x-proxy-cache", status)]
+    )
+
+def is_cacheable(status_code: int, headers: httpx.Headers) -> bool:
+    """Only plain successful responses that upstream allows to be stored"""
+    if status_code != 200 or "set-cookie" in headers:
+        return False
+    return "no-store" not in headers.get("cache-control", "").lower()
+
+async def fetch_shared(upstream_request: httpx.Request, cache_key, cache_route, route_template=None,
+                       tags=(), versions=()):
+    """Fetch a GET completely; the result may be shared between coalesced callers"""
+    result = await upstream.fetch(upstream_request, route=route_template)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.laravel(result.headers.get("server-timing"))
+    # content-length is recomputed by every Response built from the body
+    headers = [
+        (name, value) for name, value in response_headers(result.headers)
+        if name != b"content-length"
+    ]
+    if cache_key is not None and is_cacheable(result.status_code, result.headers):
+        response_cache.put(
+            cache_key, result.status_code, headers, result.body,
+            ttl=cache_route.value, route=cache_route.template, tags=tags, versions=versions
+        )
+    return result.status_code, headers, result.body
+
+def upstream_headers(headers, token=None, claims=None):
+    """Filtered client headers plus the signed claims and the trace context for Laravel"""
+    if claims is not None:
+        headers.extend(
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in token_validator.claims_headers(token, claims).items()
+        )
+    # The trace continues in Laravel with this proxy request as parent span
+    trace = current_trace.get()
+    if trace is not None:
+        headers = [(name, value) for name, value in headers if name != b"traceparent"]
+        headers.append((b"traceparent", trace.traceparent().encode("ascii")))
+    return headers
+
+def priority_for(path: str) -> str:
+    """Admission priority class of a path"""
+    priority_class = priority_classes.match(path) if admission is not None else None
+    return priority_class.value if priority_class else "normal"
+
+def journal_submitter(headers, claims=None) -> str:
+    """Owner of journal entries: the token's user, else a hash of the token ("" without one)"""
+    token = bearer_token(headers)
+    if claims is None and token and token_validator is not None:
+        try:
+            claims = token_validator.validate(token)
+        except TokenError:
+            return ""
+    if claims is not None and claims.get("user_id") is not None:
+        return f"user:{claims['user_id']}"
+    return f"token:{token_hash(token)}" if token else ""
+
+async def journaled(request: Request, path: str, query: str, token=None, claims=None) -> Response:
+    """Send a submission to Laravel, or journal it and answer 202 when it cannot take it now"""
+    # Refuse a declared oversized body before buffering it; chunked bodies are checked once read
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > PROXY_JOURNAL_MAX_BODY:
+        return JSONResponse(status_code=413, content={"error": "Submission is too large"})
+    body = await request.body()
+    if len(body) > PROXY_JOURNAL_MAX_BODY:
+        return JSONResponse(status_code=413, content={"error": "Submission is too large"})
+    # The tracking ID doubles as Idempotency-Key, so a submission that reached
+    # Laravel before a timeout is not stored twice by its replay. A client key
+    # only names an entry together with the submitter, like in Laravel
+    submitter = journal_submitter(request.headers, claims)
+    client_key = request.headers.get("idempotency-key", "")
+    if submitter and 0 < len(client_key) <= 64 and client_key.isprintable():
+        tracking_id = scoped_id(submitter, client_key)
+    else:
+        tracking_id = uuid.uuid4().hex
+    headers = [
+        (name, value) for name, value in request_headers(request.scope["headers"])
+        if name != b"idempotency-key"
+    ]
+    headers.append((b"idempotency-key", tracking_id.encode("latin-1")))
+    route = route_labels.match(path)
+    
+    # Queued submissions go first, so a new one never overtakes them
+    if PROXY_JOURNAL_MODE == "fallback" and not await journal.has_pending(submitter):
+        upstream_request = upstream.client.build_request(
+            method=request.method,
+            url=upstream.url_for(path, query),
+            headers=upstream_headers(list(headers), token, claims),
+            content=body
+        )
+        try:
+            result = await admitted(priority_for(path),
+                                   lambda: upstream.fetch(upstream_request, route=route and route.template))
+        except (httpx.TransportError, CircuitOpenError, AdmissionRejected) as e:
+            logger.warning(f"Journaling submission {tracking_id}: {type(e).__name__}")
+        else:
+            if result.status_code not in (502, 503, 504):
+                cache_tags.invalidate(request.method, path, result.status_code, result.headers.get(INVALIDATE_HEADER))
+                return raw_response(result.status_code, response_headers(result.headers), result.body)
+            logger.warning(f"Journaling submission {tracking_id}: Laravel answered {result.status_code}")
+    
+    try:
+        tracking_id, _ = await journal.append(request.method, path, query, headers, body,
+                                              id=tracking_id, submitter=submitter)
+    except JournalConflict:
+        return JSONResponse(status_code=422,
+                            content={"error": "Idempotency-Key was already used for a different submission"})
+    status_url = f"/proxy/journal?id={tracking_id}"
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "accepted",
+            "message": "Submission saved and will be sent to the server shortly",
+            "tracking_id": tracking_id,
+            "status_url": status_url
+        },
+        headers={"Location": status_url}
+    )
+
+async def deliver_journaled(entry):
+    """Replay one journaled submission (called by the journal's replayer)"""
+    headers = [(name, value) for name, value in entry.headers if name != SUBMITTED_AT_HEADER.encode("latin-1")]
+    headers.append((SUBMITTED_AT_HEADER.encode("latin-1"), str(int(entry.created_at)).encode("ascii")))
+    # Claims are signed again for the replay; an expired token is rejected by Laravel
+    token = bearer_token(StarletteHeaders(raw=entry.headers))
+    claims = None
+    if token_validator is not None and token:
+        try:
+            claims = token_validator.validate(token)
+        except TokenError:
+            pass
+    if claims is not None:
+        claims = {**claims, SUBMITTED_AT_CLAIM: int(entry.created_at)}
+    upstream_request = upstream.client.build_request(
+        method=entry.method,
+        url=upstream.url_for(entry.path, entry.query),
+        headers=upstream_headers(headers, token, claims),
+        content=entry.body
+    )
+    route = route_labels.match(entry.path)
+    result = await upstream.fetch(upstream_request, route=route and route.template)
+    if result.status_code < 400:
+        cache_tags.invalidate(entry.method, entry.path, result.status_code, result.headers.get(INVALIDATE_HEADER))
+    return result.status_code, "" if result.status_code < 400 else result.body[:500].decode("utf-8", "replace")
+
+def admitted(priority: str, call):
+    """Run an upstream call (a zero-argument factory) under admission control when it is enabled"""
+    if admission is None:
+        return call()
+    return admission.run(priority, call)
+
+async def timed(timing: dict, awaitable):
+    """Await an upstream call and add its duration to the request timing"""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timing["upstream"] += time.perf_counter() - started
+        record_span("upstream", started)
+
+def client_ip(request: Request) -> str:
+    """Client address used for rate limiting"""
+    return client_address(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for", ""),
+        trusted_proxies,
+        trust_all=PROXY_TRUST_FORWARDED_FOR
+    )
+
+async def counted_body(chunks, on_complete):
+    """Pass a streamed body through and report its size once it is sent"""
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        on_complete(size)
+
+async def proxy_request(request: Request) -> Response:
+    """Proxy one request to Laravel backend (called by ProxyApp, not FastAPI)"""
+    started = time.perf_counter()
+    route = route_labels.match(request.scope["path"])
+    labels = (method_label(request.method), route.template if route else "unmatched")
+    timing = {"upstream": 0.0}
+    trace = None
+    if tracer is not None:
+        trace = tracer.start(request.scope["headers"], request.method, request.scope["path"])
+    context = current_trace.set(trace)
+    proxy_metrics.in_flight.inc()
+    try:
+        response = await forward(request, timing, route)
+    except BaseException:
+        proxy_metrics.in_flight.dec()
+        raise
+    finally:
+        current_trace.reset(context)
+    
+    proxy_metrics.observe(
+        *labels,
+        status=response.status_code,
+        duration=time.perf_counter() - started,
+        upstream=timing["upstream"],
+        request_bytes=int(request.headers.get("content-length") or 0)
+    )
+    
+    if trace is not None:
+        if PROXY_SERVER_TIMING:
+            response.headers.append("server-timing", trace.server_timing())
+        response.headers.append(TRACE_ID_HEADER, trace.trace_id)
+    
+    if compressor is not None:
+        response = compressor.apply(request.method, request.headers.get("accept-encoding", ""), response)
+    
+    headers_ready = time.perf_counter()
+    
+    def finish(size: int):
+        proxy_metrics.response_size.labels(*labels).observe(size)
+        proxy_metrics.in_flight.dec()
+        if trace is not None:
+            trace.record("body", headers_ready, time.perf_counter(), bytes=size)
+            trace.finish(response.status_code, labels[1])
+            tracer.export(trace)
+    
+    if isinstance(response, StreamingResponse):
+        response.body_iterator = counted_body(response.body_iterator, finish)
+    else:
+        finish(len(response.body))
+    return response
 
-@app.middleware("http")
-async def proxy_requests(request: Request, call_next):
-    """Proxy all requests to Laravel backend"""
+async def forward(request: Request, timing: dict, route=None) -> Response:
+    """Forward one request to Laravel and build the client response"""
+    # The raw scope is used instead of request.url, which would build and
+    # parse a full URL for every request
+    path = request.scope["path"]
+    query = request.scope["query_string"].decode("latin-1")
     try:
-        # Skip health check endpoint
-        if request.url.path == "/health":
-            return await call_next(request)
+        # Per IP and path token buckets answer 429 before Laravel is involved
+        if (rate_limiter is not None and path.startswith(PROXY_RATE_LIMIT_PREFIX)
+                and rate_limiter.applies_to(path)):
+            limited = rate_limiter.check(client_ip(request), path)
+            if not limited.allowed:
+                return JSONResponse(
+                    status_code=429,
+                    content={"message": "Rate limit exceeded. Please try again later."},
+                    headers={
+                        "Retry-After": retry_after_header(limited.retry_after),
+                        "X-RateLimit-Limit": str(limited.limit),
+                        "X-RateLimit-Remaining": "0"
+                    }
+                )
+        
+        # Reject missing, invalid and expired tokens at the edge for routes
+        # behind SecurityMiddleware; valid claims are passed on to Laravel
+        claims = None
+        token = None
+        if (token_validator is not None and route is not None and request.method != "OPTIONS"
+                and route.template not in PUBLIC_API_ROUTES):
+            token = bearer_token(request.headers)
+            if not token:
+                return JSONResponse(status_code=401, content={"error": "Missing authorization token"})
+            auth_started = time.perf_counter()
+            try:
+                claims = token_validator.validate(token)
+            except TokenError:
+                return JSONResponse(status_code=401, content={"error": "Invalid or expired token"})
+            finally:
+                record_span("auth", auth_started)
+            # Batch sub-requests share one use of the token in Laravel
+            if request.scope.get(BATCH_SCOPE_KEY):
+                claims = {**claims, BATCH_CLAIM: request.scope[BATCH_SCOPE_KEY]}
+        scope = ClaimScope(request.headers, claims)
+        
+        # Form submissions can be journaled and acknowledged with 202
+        if journal is not None and request.method == "POST" and journal_routes.match(path) is not None:
+            return await journaled(request, path, query, token, claims)
+        
+        # Serve read-mostly GET endpoints from the response cache
+        cache_key = None
+        cache_route = cache_routes.match(path) if request.method == "GET" else None
+        if cache_route is not None:
+            cache_key = response_cache.key(request.method, path, query, scope)
+            if "no-cache" not in request.headers.get("cache-control", ""):
+                entry = response_cache.get(cache_key)
+                if entry is not None:
+                    return cached_response(entry)
         
         # Prepare the proxied request
-        url = f"{LARAVEL_BACKEND_URL}{request.url.path}"
-        if request.url.query:
-            url = f"{url}?{request.url.query}"
+        url = upstream.url_for(path, query)
         
-        # Forward request headers
-        headers = dict(request.headers)
-        # Remove host header to avoid conflicts
-        headers.pop("host", None)
+        # Forward request headers (hop-by-hop and host headers are dropped)
+        headers = upstream_headers(request_headers(request.scope["headers"]), token, claims)
         
-        # Get request body if present
+        # Request body is streamed into httpx when its length is known; chunked
+        # uploads are buffered because php artisan serve cannot read them
         body = None
         if request.method in ["POST", "PUT", "PATCH"]:
-            body = await request.body()
+            if PROXY_STREAM_BODIES and "content-length" in request.headers:
+                body = request.stream()
+            else:
+                body = await request.body()
+        
+        route_template = route.template if route else None
+        priority = priority_for(path)
+        trace = current_trace.get()
         
-        # Make the proxied request
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.request(
-                method=request.method,
-                url=url,
-                headers=headers,
-                content=body,
-                follow_redirects=True
+        upstream_request = upstream.client.build_request(
+            method=request.method,
+            url=url,
+            headers=headers,
+            content=body
+        )
+        if trace is not None:
+            upstream_request.extensions["trace"] = trace.httpcore_hook
+        
+        # Cached and coalesced routes are read completely; identical concurrent
+        # requests share one upstream call and the result is fanned out
+        coalesce_route = coalesce_routes.match(path) if request.method == "GET" else None
+        if cache_route is not None or coalesce_route is not None:
+            # Tag versions from before the fetch: a write that lands meanwhile
+            # keeps the result out of the cache and out of later flights
+            tags = cache_tags.tags_for(path)
+            versions = cache_tags.snapshot(tags)
+            fetch = lambda: admitted(priority, lambda: fetch_shared(
+                upstream_request, cache_key, cache_route, route_template, tags, versions))
+            shared = False
+            if coalesce_route is not None:
+                flight_key = (request_key(request.method, path, query, scope, PROXY_COALESCE_VARY_HEADERS), versions)
+                (status_code, raw_headers, content), shared = await timed(timing, single_flight.do(flight_key, fetch))
+            else:
+                status_code, raw_headers, content = await timed(timing, fetch())
+            extra = [("x-proxy-coalesced", "1")] if shared else []
+            if cache_key is not None:
+                extra.append(("x-proxy-cache", "MISS"))
+            return buffered_response(status_code, raw_headers, content, extra=extra)
+        
+        # Make the proxied request over the shared connection pool
+        response = await admitted(priority, lambda: timed(
+            timing, upstream.send(upstream_request, stream=True, route=route_template)))
+        if trace is not None:
+            trace.laravel(response.headers.get("server-timing"))
+        
+        # Successful writes make the cached reads they affect stale
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            cache_tags.invalidate(request.method, path, response.status_code,
+                                  response.headers.get(INVALIDATE_HEADER))
+        
+        # Pass the upstream bytes through as-is, so content-encoding and
+        # content-length stay valid for the client
+        if PROXY_STREAM_BODIES:
+            return raw_streaming_response(
+                response.status_code,
+                response_headers(response.headers),
+                response.aiter_raw(),
+                background=BackgroundTask(response.aclose)
             )
         
+        try:
+            content = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+        
         # Return the response
-        return Response(
-            content=response.content,
-            status_code=response.status_code,
-            headers=dict(response.headers),
-            media_type=response.headers.get("content-type")
-        )
+        return raw_response(response.status_code, response_headers(response.headers), content)
         
-    except httpx.ConnectError:
+    except AdmissionRejected as e:
+        # Shed instead of queueing without bound while Laravel is saturated
+        return JSONResponse(
+            status_code=503,
+            content={"status": "error", "message": "Server is busy, please try again shortly"},
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
+    except (httpx.ConnectError, CircuitOpenError) as e:
+        # An open circuit fails fast with the same body as an unreachable backend
+        retry_after = getattr(e, "retry_after", 0)
         return JSONResponse(
             status_code=503,
             content={
                 "status": "error",
                 "message": "Laravel backend is not available",
                 "laravel_url": LARAVEL_BACKEND_URL
-            }
+            },
+            headers={"Retry-After": str(max(1, round(retry_after)))} if retry_after else None
         )
     except Exception as e:
         return JSONResponse(
@@ -84,29 +949,160 @@ async def proxy_requests(request: Request, call_next):
             }
         )
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    try:
-        # Check if Laravel backend is accessible
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{LARAVEL_BACKEND_URL}/api/v1/test")
-            laravel_healthy = response.status_code == 200
-    except:
-        laravel_healthy = False
+@api.get("/health")
+async def health_check(deep: bool = False):
+    """Health check endpoint, served from the background prober unless ?deep=1"""
+    if deep:
+        await health_prober.probe_all()
+    laravel_healthy = health_prober.healthy
     
     return {
         "status": "healthy" if laravel_healthy else "partial",
         "proxy": "running",
         "laravel_backend": "healthy" if laravel_healthy else "unavailable",
-        "laravel_url": LARAVEL_BACKEND_URL
+        "laravel_url": LARAVEL_BACKEND_URL,
+        "upstreams": health_prober.snapshot()
     }
 
+@api.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics of every worker"""
+    content = metrics_spool.render() if metrics_spool is not None else metrics.render()
+    return Response(content=content, media_type=METRICS_CONTENT_TYPE)
+
+@api.get("/proxy/auth")
+async def auth_stats():
+    """Edge token validation statistics"""
+    if token_validator is None:
+        return {"enabled": False}
+    return {"enabled": True, **token_validator.stats()}
+
+@api.get("/proxy/ratelimit")
+async def rate_limit_stats():
+    """Rate limiter statistics"""
+    if rate_limiter is None:
+        return {"enabled": False}
+    return {"enabled": True, **rate_limiter.stats()}
+
+@api.get("/proxy/compression")
+async def compression_stats():
+    """Response compression statistics"""
+    if compressor is None:
+        return {"enabled": False}
+    return {"enabled": True, **compressor.stats()}
+
+@api.post(PROXY_BATCH_PATH)
+async def batch(request: Request):
+    """Run several API calls with the caller's credentials in one round trip"""
+    try:
+        payload = await request.json()
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "Body must be valid JSON"})
+    try:
+        items = parse_batch(payload, prefix=PROXY_BATCH_PATH.rsplit("/", 1)[0], max_items=PROXY_BATCH_MAX_REQUESTS)
+    except BatchError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    # Laravel takes a raw token only once, so sub-requests need the edge-validated claims
+    if token_validator is None and bearer_token(request.headers):
+        return JSONResponse(status_code=503,
+                            content={"error": "Batching authenticated calls needs edge token validation"})
+    
+    return JSONResponse(content={"responses": await batch_runner.run(request.scope, items)})
+
+@api.get("/proxy/admission")
+async def admission_stats():
+    """Admission control statistics"""
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.stats(), "classes": priority_classes.templates()}
+
+@api.get("/debug/traces")
+async def debug_traces(trace_id: str = "", route: str = "", min_duration_ms: float = 0.0, limit: int = 50):
+    """Recent sampled request traces, newest first"""
+    if tracer is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        **tracer.stats(),
+        "traces": tracer.query(trace_id=trace_id, route=route, min_duration_ms=min_duration_ms, limit=limit)
+    }
+
+@api.get("/proxy/static")
+async def static_stats():
+    """Frontend static file statistics"""
+    if static_site is None:
+        return {"enabled": False, "root": PROXY_STATIC_ROOT}
+    return {"enabled": True, **static_site.stats()}
+
+@api.get("/proxy/journal")
+async def journal_status(request: Request, id: str = ""):
+    """Write journal statistics, or the state of one of the caller's journaled submissions"""
+    if journal is None:
+        return {"enabled": False}
+    if id:
+        entry = await journal.status(id, journal_submitter(request.headers))
+        if entry is None:
+            return JSONResponse(status_code=404, content={"error": "Unknown tracking ID"})
+        return entry
+    return {"enabled": True, "mode": PROXY_JOURNAL_MODE, **await journal.stats()}
+
+@api.get("/proxy/pool")
+async def pool_stats():
+    """Upstream connection pool statistics"""
+    return upstream.stats()
+
+@api.get("/proxy/cache")
+async def cache_stats():
+    """Response cache statistics"""
+    return {
+        **response_cache.stats(),
+        "routes": cache_routes.templates(),
+        "tags": cache_tags.stats()
+    }
+
+@api.get("/proxy/coalescing")
+async def coalescing_stats():
+    """Single-flight request coalescing statistics"""
+    return {
+        **single_flight.stats(),
+        "routes": coalesce_routes.templates()
+    }
+
+# Proxied paths bypass FastAPI entirely; CORS applies to both. Everything
+# outside the upstream prefixes is the frontend when it has been built
+proxy_app = ProxyApp(proxy_request, api, local_paths=LOCAL_PATHS,
+                     static=static_site, upstream_prefixes=PROXY_UPSTREAM_PREFIXES)
+app = CORSMiddleware(
+    proxy_app,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "server:app",
-        host="0.0.0.0",
-        port=8001,
-        workers=1,
-        reload=True
-    )
\ No newline at end of file
+    # Production: supervised workers sharing one socket (see proxy/supervisor.py);
+    # --reload runs the single-process development server instead
+    parser = argparse.ArgumentParser(description="SportTeams proxy server")
+    parser.add_argument("--reload", action="store_true", help="development mode, restart on code changes")
+    parser.add_argument("--workers", type=int, default=PROXY_WORKERS, help="worker processes (default: cores)")
+    args = parser.parse_args()
+    
+    if args.reload:
+        uvicorn.run(
+            "server:app",
+            host=PROXY_HOST,
+            port=PROXY_PORT,
+            workers=1,
+            reload=True
+        )
+    else:
+        logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+        logging.getLogger("sportteams").setLevel(logging.INFO)
+        Supervisor(
+            app,
+            host=PROXY_HOST,
+            port=PROXY_PORT,
+            workers=args.workers,
+            graceful_timeout=PROXY_GRACEFUL_TIMEOUT
+        ).run()
@@ -0,0 +1,32 @@
+"""
+Shared fixtures for the proxy tests (run with `python -m pytest tests/proxy`)
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+class Clock:
+    """Stand-in for time.monotonic() that only moves when told to"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen monotonic clock for code that reads time.monotonic() (not for asyncio tests)"""
+    fake = Clock()
+    monkeypatch.setattr(time, "monotonic", fake)
+    return fake
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from proxy.admission import AdmissionController, AdmissionRejected
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_calls_within_the_limit_are_admitted_at_once():
+    async def scenario():
+        admission = AdmissionController(limit=2, queue_size=0)
+        await admission.acquire("low")
+        await admission.acquire("low")
+        assert admission.in_flight == 2
+        assert admission.admitted == 2
+
+    run(scenario())
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    async def scenario():
+        admission = AdmissionController(limit=1, queue_size=10)
+        await admission.acquire("normal")
+        order = []
+
+        async def call(name, priority):
+            await admission.run(priority, lambda: asyncio.sleep(0, result=order.append(name)))
+
+        tasks = [asyncio.create_task(call(name, priority)) for name, priority in
+                 (("low", "low"), ("normal-1", "normal"), ("critical", "critical"), ("normal-2", "normal"))]
+        await settle()
+        assert admission.queue_depths() == {"critical": 1, "high": 0, "normal": 2, "low": 1}
+        admission.release()
+        await asyncio.gather(*tasks)
+        assert order == ["critical", "normal-1", "normal-2", "low"]
+        assert admission.in_flight == 0
+
+    run(scenario())
+
+
+def test_full_queue_displaces_the_newest_lower_class_waiter():
+    async def scenario():
+        admission = AdmissionController(limit=1, queue_size=2)
+        await admission.acquire("normal")
+        older = asyncio.create_task(admission.acquire("low"))
+        newer = asyncio.create_task(admission.acquire("low"))
+        await settle()
+        urgent = asyncio.create_task(admission.acquire("critical"))
+        await settle()
+        with pytest.raises(AdmissionRejected) as shed:
+            await newer
+        assert shed.value.reason == "displaced"
+        admission.release()
+        await urgent
+        assert not older.done()
+        assert admission.rejected["displaced"] == 1
+        older.cancel()
+
+    run(scenario())
+
+
+def test_full_queue_rejects_a_call_without_lower_class_waiters():
+    async def scenario():
+        admission = AdmissionController(limit=1, queue_size=1)
+        await admission.acquire("normal")
+        waiting = asyncio.create_task(admission.acquire("high"))
+        await settle()
+        started = []
+        with pytest.raises(AdmissionRejected) as shed:
+            await admission.run("high", lambda: asyncio.sleep(0, result=started.append(True)))
+        assert shed.value.reason == "queue_full"
+        assert shed.value.retry_after >= 1.0
+        assert started == []
+        waiting.cancel()
+
+    run(scenario())
+
+
+def test_waiting_longer_than_queue_timeout_is_rejected():
+    async def scenario():
+        admission = AdmissionController(limit=1, queue_size=1, queue_timeout=0.01)
+        await admission.acquire("normal")
+        with pytest.raises(AdmissionRejected) as shed:
+            await admission.acquire("critical")
+        assert shed.value.reason == "timeout"
+        assert admission.queued == 0
+        admission.release()
+        assert admission.in_flight == 0
+
+    run(scenario())
+
+
+def test_cancelled_waiter_is_skipped_on_release():
+    async def scenario():
+        admission = AdmissionController(limit=1, queue_size=2)
+        await admission.acquire("normal")
+        cancelled = asyncio.create_task(admission.acquire("high"))
+        waiting = asyncio.create_task(admission.acquire("low"))
+        await settle()
+        cancelled.cancel()
+        await settle()
+        assert admission.queued == 1
+        admission.release()
+        await waiting
+        assert admission.in_flight == 1
+
+    run(scenario())
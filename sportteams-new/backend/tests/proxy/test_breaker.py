@@ -0,0 +1,96 @@
+from proxy.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def breaker(**kwargs):
+    options = dict(error_rate=0.5, slow_call_seconds=1.0, slow_call_rate=0.8, min_requests=4,
+                   window_seconds=10, open_seconds=15.0, half_open_requests=2)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def trip(circuit):
+    for _ in range(circuit.min_requests):
+        assert circuit.acquire()
+        circuit.record(False, 0.1)
+
+
+def test_stays_closed_below_min_requests(clock):
+    circuit = breaker()
+    for _ in range(3):
+        circuit.acquire()
+        circuit.record(False, 0.1)
+    assert circuit.state == CLOSED
+
+
+def test_opens_on_error_rate(clock):
+    circuit = breaker()
+    for ok in (True, True, False, False):
+        circuit.acquire()
+        circuit.record(ok, 0.1)
+    assert circuit.state == OPEN
+    assert circuit.times_opened == 1
+
+
+def test_opens_on_slow_call_rate(clock):
+    circuit = breaker()
+    for _ in range(4):
+        circuit.acquire()
+        circuit.record(True, 2.0)
+    assert circuit.state == OPEN
+
+
+def test_outcomes_outside_the_window_are_forgotten(clock):
+    circuit = breaker()
+    for _ in range(3):
+        circuit.acquire()
+        circuit.record(False, 0.1)
+    clock.advance(10)
+    circuit.acquire()
+    circuit.record(False, 0.1)
+    assert circuit.state == CLOSED
+    assert circuit.stats()["window_calls"] == 1
+
+
+def test_open_circuit_fails_fast_until_open_seconds_pass(clock):
+    circuit = breaker()
+    trip(circuit)
+    assert not circuit.acquire()
+    assert circuit.rejected == 1
+    assert circuit.retry_after() == 15.0
+    clock.advance(15)
+    assert circuit.can_attempt()
+    assert circuit.acquire()
+    assert circuit.state == HALF_OPEN
+
+
+def test_half_open_limits_trials_and_closes_when_they_pass(clock):
+    circuit = breaker()
+    trip(circuit)
+    clock.advance(15)
+    assert circuit.acquire() and circuit.acquire()
+    assert not circuit.acquire()
+    circuit.record(True, 0.1)
+    assert circuit.state == HALF_OPEN
+    circuit.record(True, 0.1)
+    assert circuit.state == CLOSED
+    assert circuit.stats()["window_calls"] == 0
+
+
+def test_failed_or_slow_trial_opens_again(clock):
+    for ok, latency in ((False, 0.1), (True, 2.0)):
+        circuit = breaker()
+        trip(circuit)
+        clock.advance(15)
+        circuit.acquire()
+        circuit.record(ok, latency)
+        assert circuit.state == OPEN
+        assert circuit.times_opened == 2
+
+
+def test_released_trial_frees_its_slot(clock):
+    circuit = breaker()
+    trip(circuit)
+    clock.advance(15)
+    assert circuit.acquire() and circuit.acquire()
+    circuit.release()
+    assert circuit.acquire()
@@ -0,0 +1,88 @@
+from proxy.cache import ENTRY_OVERHEAD_BYTES, ResponseCache, request_key
+from proxy.invalidation import TagVersions
+
+BODY = b"x" * 100
+ENTRY_SIZE = len(BODY) + ENTRY_OVERHEAD_BYTES
+
+
+def store(cache, path, ttl=60, body=BODY, **kwargs):
+    key = cache.key("GET", path, "", {})
+    return key, cache.put(key, 200, [], body, ttl, **kwargs)
+
+
+def test_key_normalises_query_and_trailing_slash():
+    headers = {"authorization": "Bearer a"}
+    assert request_key("get", "/api/v1/teams/", "b=2&a=1", headers, ("authorization",)) == \
+        request_key("GET", "/api/v1/teams", "a=1&b=2", headers, ("authorization",))
+    assert request_key("GET", "/api/v1/teams", "", headers, ("authorization",)) != \
+        request_key("GET", "/api/v1/teams", "", {"authorization": "Bearer b"}, ("authorization",))
+
+
+def test_entry_expires_after_its_ttl(clock):
+    cache = ResponseCache()
+    key, _ = store(cache, "/a", ttl=10)
+    clock.advance(9.9)
+    assert cache.get(key) is not None
+    clock.advance(0.1)
+    assert cache.get(key) is None
+    assert cache.expirations == 1
+    assert len(cache) == 0 and cache.bytes == 0
+
+
+def test_non_positive_ttl_and_oversized_bodies_are_not_stored():
+    cache = ResponseCache(max_entry_bytes=50)
+    assert store(cache, "/a", ttl=0)[1] is None
+    assert store(cache, "/b", body=b"x" * 51)[1] is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_bytes=ENTRY_SIZE * 2)
+    first, _ = store(cache, "/first")
+    second, _ = store(cache, "/second")
+    assert cache.get(first) is not None  # /second is now the least recently used
+    third, _ = store(cache, "/third")
+    assert cache.get(second) is None
+    assert cache.get(first) is not None and cache.get(third) is not None
+    assert cache.evictions == 1
+    assert cache.bytes == ENTRY_SIZE * 2
+
+
+def test_expired_entries_are_evicted_before_fresh_ones(clock):
+    cache = ResponseCache(max_bytes=ENTRY_SIZE * 2)
+    stale, _ = store(cache, "/stale", ttl=5)
+    fresh, _ = store(cache, "/fresh", ttl=60)
+    cache.get(stale)
+    clock.advance(10)
+    store(cache, "/new")
+    assert cache.get(fresh) is not None
+    assert cache.evictions == 0 and cache.expirations == 1
+
+
+def test_replacing_an_entry_keeps_the_byte_count_right():
+    cache = ResponseCache()
+    store(cache, "/a")
+    store(cache, "/a", body=b"y" * 10)
+    assert len(cache) == 1
+    assert cache.bytes == 10 + ENTRY_OVERHEAD_BYTES
+
+
+def test_bumped_tag_turns_an_entry_into_a_miss():
+    versions = TagVersions(slots=64)
+    cache = ResponseCache(tag_versions=versions)
+    tags = ("template:1",)
+    key, _ = store(cache, "/api/v1/forms/templates/1", tags=tags, versions=versions.snapshot(tags))
+    assert cache.get(key) is not None
+    versions.bump(tags)
+    assert cache.get(key) is None
+    assert cache.invalidations == 1
+
+
+def test_response_read_before_a_write_is_not_stored():
+    versions = TagVersions(slots=64)
+    cache = ResponseCache(tag_versions=versions)
+    tags = ("forms:active",)
+    snapshot = versions.snapshot(tags)
+    versions.bump(tags)
+    assert store(cache, "/api/v1/forms/active", tags=tags, versions=snapshot)[1] is None
+    assert len(cache) == 0
@@ -0,0 +1,64 @@
+import multiprocessing
+
+from proxy.cache import ResponseCache
+from proxy.invalidation import CacheTags, TagVersions, expand_tags
+
+TAGS = "/api/v1/forms/templates/{id}=template:{id} forms:templates,/api/v1/forms/active=forms:active"
+INVALIDATIONS = "PUT /api/v1/forms/templates/{id}=template:{id} forms:active,POST /api/v1/forms/templates=forms:templates"
+
+
+def test_expand_tags_fills_route_parameters():
+    assert expand_tags(["template:{id}", "forms:{missing}"], {"id": "12"}) == ("template:12", "forms:{missing}")
+
+
+def test_parse_maps_routes_to_tags():
+    tags = CacheTags.parse(TAGS, INVALIDATIONS, slots=64)
+    assert tags.tags_for("/api/v1/forms/templates/7") == ("template:7", "forms:templates")
+    assert tags.tags_for("/api/v1/players") == ()
+
+
+def test_successful_write_bumps_its_tags_only():
+    tags = CacheTags.parse(TAGS, INVALIDATIONS, slots=64)
+    edited, other = tags.tags_for("/api/v1/forms/templates/7"), tags.tags_for("/api/v1/forms/templates/8")
+    before_edited, before_other = tags.snapshot(edited), tags.snapshot(other)
+    assert tags.invalidate("PUT", "/api/v1/forms/templates/7", 200) == ("template:7", "forms:active")
+    assert not tags.versions.is_current(edited, before_edited)
+    assert tags.versions.is_current(other, before_other)
+    assert tags.stats()["invalidations_by_route"] == {"PUT /api/v1/forms/templates/{id}": 1}
+
+
+def test_client_errors_change_nothing_but_server_errors_invalidate():
+    tags = CacheTags.parse(TAGS, INVALIDATIONS, slots=64)
+    active = ("forms:active",)
+    before = tags.snapshot(active)
+    assert tags.invalidate("PUT", "/api/v1/forms/templates/7", 422) == ()
+    assert tags.versions.is_current(active, before)
+    # A 5xx may have been applied before failing, so it still invalidates
+    tags.invalidate("PUT", "/api/v1/forms/templates/7", 502)
+    assert not tags.versions.is_current(active, before)
+
+
+def test_response_header_names_extra_tags():
+    tags = CacheTags.parse(TAGS, INVALIDATIONS, slots=64)
+    assert tags.invalidate("DELETE", "/api/v1/teams/3", 204, "forms:active, team:3") == ("forms:active", "team:3")
+    assert tags.stats()["invalidations_by_route"] == {"DELETE x-cache-invalidate": 1}
+
+
+def _bump_in_worker(versions, tags):
+    versions.bump(tags)
+
+
+def test_bump_in_one_worker_invalidates_the_cache_of_another():
+    versions = TagVersions(slots=64)
+    cache = ResponseCache(tag_versions=versions)
+    tags = ("template:7",)
+    key = cache.key("GET", "/api/v1/forms/templates/7", "", {})
+    cache.put(key, 200, [], b"{}", 60, tags=tags, versions=versions.snapshot(tags))
+
+    # Workers are forked after the versions are created, as the supervisor does
+    worker = multiprocessing.get_context("fork").Process(target=_bump_in_worker, args=(versions, tags))
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+    assert cache.get(key) is None
+    assert cache.invalidations == 1
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from proxy.journal import DELIVERED, FAILED, PENDING, JournalConflict, WriteJournal, scoped_id
+
+PATH = "/api/v1/forms/responses"
+HEADERS = [(b"authorization", b"Bearer token"), (b"content-type", b"application/json"), (b"cookie", b"session=1")]
+
+
+def body(value):
+    return json.dumps({"answer": value}).encode("utf-8")
+
+
+def journal_at(tmp_path, **kwargs):
+    return WriteJournal(str(tmp_path / "journal.sqlite"), backoff=0.0, **kwargs)
+
+
+def with_journal(tmp_path, scenario, **kwargs):
+    async def main():
+        journal = journal_at(tmp_path, **kwargs)
+        try:
+            return await scenario(journal)
+        finally:
+            await journal.stop()
+
+    return asyncio.run(main())
+
+
+class Upstream:
+    """Records deliveries and answers with a status per submitter (200 by default)"""
+
+    def __init__(self, statuses=None):
+        self.statuses = statuses or {}
+        self.delivered = []
+
+    async def __call__(self, entry):
+        self.delivered.append((entry.submitter, json.loads(entry.body)["answer"]))
+        status_code = self.statuses.get(entry.submitter, 200)
+        return status_code, "" if status_code < 400 else "upstream error"
+
+
+def ready():
+    return True
+
+
+# -- idempotency and scoping
+
+
+def test_scoped_id_is_private_to_the_submitter():
+    assert scoped_id("user:1", "abc") == scoped_id("user:1", "abc")
+    assert scoped_id("user:1", "abc") != scoped_id("user:2", "abc")
+
+
+def test_same_key_from_two_users_journals_two_entries(tmp_path):
+    async def scenario(journal):
+        first = await journal.append("POST", PATH, "", HEADERS, body(1), scoped_id("user:1", "abc"), "user:1")
+        second = await journal.append("POST", PATH, "", HEADERS, body(2), scoped_id("user:2", "abc"), "user:2")
+        assert first[1] and second[1] and first[0] != second[0]
+        assert (await journal.stats())["entries"][PENDING] == 2
+
+    with_journal(tmp_path, scenario)
+
+
+def test_resending_the_same_request_is_a_duplicate(tmp_path):
+    async def scenario(journal):
+        id = scoped_id("user:1", "abc")
+        assert await journal.append("POST", PATH, "", HEADERS, body(1), id, "user:1") == (id, True)
+        assert await journal.append("POST", PATH, "", HEADERS, body(1), id, "user:1") == (id, False)
+        assert journal.duplicates == 1
+
+    with_journal(tmp_path, scenario)
+
+
+def test_reusing_a_key_for_another_request_conflicts(tmp_path):
+    async def scenario(journal):
+        id = scoped_id("user:1", "abc")
+        await journal.append("POST", PATH, "", HEADERS, body(1), id, "user:1")
+        with pytest.raises(JournalConflict):
+            await journal.append("POST", PATH, "", HEADERS, body(2), id, "user:1")
+        # The same tracking ID claimed by another submitter conflicts as well
+        with pytest.raises(JournalConflict):
+            await journal.append("POST", PATH, "", HEADERS, body(1), id, "user:2")
+        assert journal.conflicts == 2
+        assert (await journal.stats())["entries"][PENDING] == 1
+
+    with_journal(tmp_path, scenario)
+
+
+def test_status_is_only_visible_to_the_submitter(tmp_path):
+    async def scenario(journal):
+        id, _ = await journal.append("POST", PATH, "", HEADERS, body(1), submitter="user:1")
+        assert (await journal.status(id, "user:1"))["status"] == PENDING
+        assert await journal.status(id, "user:2") is None
+        assert await journal.has_pending("user:1")
+        assert not await journal.has_pending("user:2")
+
+    with_journal(tmp_path, scenario)
+
+
+def test_concurrent_appends_share_one_commit(tmp_path):
+    async def scenario(journal):
+        await journal.stats()  # open the database outside the measured commits
+        await asyncio.gather(*(journal.append("POST", PATH, "", HEADERS, body(i), submitter="user:1")
+                               for i in range(10)))
+        assert journal.appended == 10
+        assert journal.commits == 1
+
+    with_journal(tmp_path, scenario)
+
+
+def test_journal_from_before_submitter_scoping_is_migrated(tmp_path):
+    old = sqlite3.connect(str(tmp_path / "journal.sqlite"))
+    old.execute("CREATE TABLE entries (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, "
+                "created_at REAL NOT NULL, method TEXT NOT NULL, path TEXT NOT NULL, query TEXT NOT NULL, "
+                "headers TEXT NOT NULL, body BLOB NOT NULL, status TEXT NOT NULL DEFAULT 'pending', "
+                "attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL DEFAULT 0, last_error TEXT, "
+                "response_status INTEGER, completed_at REAL)")
+    old.execute("INSERT INTO entries (id, created_at, method, path, query, headers, body) "
+                "VALUES ('legacy', 1, 'POST', ?, '', '[]', ?)", (PATH, body(0)))
+    old.commit()
+    old.close()
+    upstream = Upstream()
+
+    async def scenario(journal):
+        await journal.append("POST", PATH, "", HEADERS, body(1), submitter="user:1")
+        await journal.replay(upstream, ready)
+        assert upstream.delivered == [("", 0), ("user:1", 1)]
+
+    with_journal(tmp_path, scenario)
+
+
+# -- replaying
+
+
+def test_replay_delivers_in_order_and_erases_headers(tmp_path):
+    upstream = Upstream()
+
+    async def scenario(journal):
+        ids = [(await journal.append("POST", PATH, "", HEADERS, body(i), submitter="user:1"))[0] for i in range(3)]
+        await journal.replay(upstream, ready)
+        assert upstream.delivered == [("user:1", 0), ("user:1", 1), ("user:1", 2)]
+        status = await journal.status(ids[0], "user:1")
+        assert status["status"] == DELIVERED and status["response_status"] == 200
+
+    with_journal(tmp_path, scenario)
+    stored = sqlite3.connect(str(tmp_path / "journal.sqlite")).execute("SELECT headers FROM entries").fetchall()
+    assert stored == [("[]",)] * 3
+
+
+def test_cookies_are_not_journaled(tmp_path):
+    seen = []
+
+    async def deliver(entry):
+        seen.append(dict(entry.headers))
+        return 200, ""
+
+    async def scenario(journal):
+        await journal.append("POST", PATH, "", HEADERS, body(1), submitter="user:1")
+        await journal.replay(deliver, ready)
+
+    with_journal(tmp_path, scenario)
+    assert b"cookie" not in seen[0] and seen[0][b"authorization"] == b"Bearer token"
+
+
+def test_validation_error_fails_without_retrying(tmp_path):
+    upstream = Upstream({"user:1": 422})
+
+    async def scenario(journal):
+        id, _ = await journal.append("POST", PATH, "", HEADERS, body(1), submitter="user:1")
+        await journal.replay(upstream, ready)
+        status = await journal.status(id, "user:1")
+        assert status["status"] == FAILED and status["attempts"] == 1
+        assert journal.retries == 0
+
+    with_journal(tmp_path, scenario)
+
+
+def test_unavailable_upstream_is_retried_until_max_attempts(tmp_path):
+    upstream = Upstream({"user:1": 503})
+
+    async def scenario(journal):
+        id, _ = await journal.append("POST", PATH, "", HEADERS, body(1), submitter="user:1")
+        await journal.replay(upstream, ready)
+        status = await journal.status(id, "user:1")
+        assert status["status"] == FAILED
+        assert status["attempts"] == 3
+        assert status["error"].startswith("Gave up after 3 attempts")
+        assert len(upstream.delivered) == 3 and journal.retries == 2
+
+    with_journal(tmp_path, scenario, max_attempts=3)
+
+
+def test_stuck_submitter_does_not_block_others(tmp_path):
+    upstream = Upstream({"user:1": 503})
+
+    async def scenario(journal):
+        journal.backoff = 30.0
+        stuck, _ = await journal.append("POST", PATH, "", HEADERS, body("stuck"), submitter="user:1")
+        behind, _ = await journal.append("POST", PATH, "", HEADERS, body("behind"), submitter="user:1")
+        other, _ = await journal.append("POST", PATH, "", HEADERS, body("other"), submitter="user:2")
+        delay = await journal.replay(upstream, ready)
+        # user:1's second entry keeps waiting behind its first one; user:2 is not held up
+        assert upstream.delivered == [("user:1", "stuck"), ("user:2", "other")]
+        assert (await journal.status(other, "user:2"))["status"] == DELIVERED
+        assert (await journal.status(behind, "user:1"))["queue_position"] == 1
+        assert (await journal.status(stuck, "user:1"))["attempts"] == 1
+        assert 0 < delay <= 30.0
+
+    with_journal(tmp_path, scenario)
+
+
+def test_replay_waits_for_a_ready_upstream(tmp_path):
+    upstream = Upstream()
+
+    async def scenario(journal):
+        await journal.append("POST", PATH, "", HEADERS, body(1), submitter="user:1")
+        assert await journal.replay(upstream, lambda: False) == journal.poll_interval
+        assert upstream.delivered == []
+
+    with_journal(tmp_path, scenario)
+
+
+def test_only_the_lease_holder_replays(tmp_path):
+    upstream = Upstream()
+
+    async def scenario(journal):
+        other = journal_at(tmp_path)
+        try:
+            await journal.append("POST", PATH, "", HEADERS, body(1), submitter="user:1")
+            await journal.replay(Upstream({"user:1": 200}), ready)
+            await journal.append("POST", PATH, "", HEADERS, body(2), submitter="user:1")
+            await other.replay(upstream, ready)
+            assert upstream.delivered == []
+        finally:
+            await other.stop()
+
+    with_journal(tmp_path, scenario)